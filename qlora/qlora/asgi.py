@@ -8,9 +8,43 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import sys
+from pathlib import Path
 
 from django.core.asgi import get_asgi_application
 
+# модули пайплайна (llm_service, analyze_*) лежат в src/
+SRC_DIR = Path(__file__).resolve().parent.parent.parent / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'qlora.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    """
+    Django не обрабатывает lifespan, поэтому здесь поднимаем и гасим
+    LLM-сервис вместе с ASGI-сервером (uvicorn, daphne).
+    Модель прогревается на старте, а не на первом запросе пользователя.
+    """
+    if scope['type'] != 'lifespan':
+        return await django_application(scope, receive, send)
+
+    import asyncio
+    from llm_service import get_llm_service, shutdown_llm_service
+
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await asyncio.to_thread(get_llm_service().start, os.getenv('LLM_SERVICE_WARMUP') == '1')
+            except Exception as e:
+                await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.to_thread(shutdown_llm_service)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
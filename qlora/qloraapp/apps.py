@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class QloraappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qloraapp'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import jobs
+
+        # задачи умерших процессов сервера помечаются failed на первом запросе:
+        # во время инициализации приложения обращаться к базе нельзя
+        request_started.connect(jobs.recover_on_startup, dispatch_uid="qloraapp.jobs.recover_on_startup")
@@ -0,0 +1,220 @@
+"""
+Фоновые задачи веба вне обработки запросов.
+
+Вьюха только создаёт строку Job и сразу отвечает; задачу выполняет пул
+потоков веб-процесса (JOB_WORKERS). Поток запускает задачу в отдельном
+процессе (job_tasks.run_task, spawn), читает из него счётчики и переносит
+их в таблицу не чаще раза в PROGRESS_SAVE_INTERVAL — страница опрашивает
+статус, не трогая сам процесс.
+
+Отмена: вьюха ставит cancel_requested, поток передаёт его процессу задачи
+(тот останавливается на ближайшем progress), а если процесс не ответил за
+JOB_CANCEL_GRACE секунд (идёт LLM-этап) — завершает всю его группу процессов.
+
+Одновременно выполняется не больше одной задачи каждого вида: два сбора,
+дописывающих один ndjson, или два анализа над одними файлами ломают данные.
+Правило держит база (ограничение one_active_job_per_kind), а не блокировка
+в памяти — так оно действует и между процессами сервера. Задачи, чей
+веб-процесс умер (перезапуск сервера), помечаются как failed на первом
+запросе после старта (recover_on_startup) и при конфликте в submit.
+"""
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.db import DatabaseError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from job_tasks import TASKS, run_task
+from .models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_CANCEL_GRACE = float(os.getenv("JOB_CANCEL_GRACE", "30"))
+PROGRESS_SAVE_INTERVAL = 0.5
+POLL_INTERVAL = 0.5
+
+
+class JobConflict(Exception):
+    """Задача этого вида уже в очереди или выполняется."""
+
+    def __init__(self, job: Job):
+        super().__init__(f"Задача {job.kind} уже выполняется (#{job.pk})")
+        self.job = job
+
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_recovered = False
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _fail_if_orphan(job: Job) -> bool:
+    # задача процесса, которого больше нет: её уже никто не выполнит
+    if job.owner_pid == os.getpid() or _pid_alive(job.owner_pid):
+        return False
+    return bool(Job.objects.filter(pk=job.pk, status__in=Job.ACTIVE).update(
+        status=Job.FAILED, error="Процесс сервера, выполнявший задачу, завершился", finished_at=timezone.now()
+    ))
+
+
+def recover_orphans() -> int:
+    return sum(_fail_if_orphan(job) for job in Job.objects.filter(status__in=Job.ACTIVE))
+
+
+def recover_on_startup(**kwargs):
+    """Обработчик request_started (см. apps.py): один раз за жизнь процесса сервера."""
+    global _recovered
+    with _lock:
+        if _recovered:
+            return
+        _recovered = True
+    try:
+        recover_orphans()
+    except DatabaseError as e:
+        # таблицы задач ещё нет (не применены миграции) — страницы без задач должны работать
+        print(f"[WARN] Не удалось проверить задачи прошлых запусков: {e}")
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job-runner")
+        return _executor
+
+
+def _create_job(kind: str, params: dict, retry: bool = True) -> Job:
+    try:
+        with transaction.atomic():
+            return Job.objects.create(kind=kind, params=params, owner_pid=os.getpid())
+    except IntegrityError:
+        active = Job.objects.filter(kind=kind, status__in=Job.ACTIVE).first()
+        # активная задача успела завершиться или её процесс умер — пробуем ещё раз
+        if retry and (active is None or _fail_if_orphan(active)):
+            return _create_job(kind, params, retry=False)
+        if active is None:
+            raise
+        raise JobConflict(active)
+
+
+def submit(kind: str, raw_params: Optional[dict] = None, secrets: Optional[dict] = None) -> Job:
+    """
+    Ставит задачу в очередь и возвращает её строку.
+    KeyError — нет такой задачи, ValueError — неверные параметры, JobConflict — уже выполняется.
+    """
+    task = TASKS[kind]
+    params = task.clean(raw_params or {})
+    job = _create_job(kind, params)
+    _get_executor().submit(_run, job.pk, {**params, **(secrets or {})})
+    return job
+
+
+def cancel(job: Job) -> Job:
+    # из очереди снимаем сразу, выполняющейся задаче — флаг для потока-надзирателя
+    if not Job.objects.filter(pk=job.pk, status=Job.QUEUED).update(
+        status=Job.CANCELLED, cancel_requested=True, finished_at=timezone.now()
+    ):
+        Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(cancel_requested=True)
+    job.refresh_from_db()
+    return job
+
+
+# ---------- выполнение ----------
+
+def _run(job_id: int, params: dict):
+    try:
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now(), owner_pid=os.getpid()
+        )
+        if not claimed:
+            return  # отменена, пока ждала в очереди
+        status, payload = _supervise(Job.objects.get(pk=job_id), params)
+        fields = {"status": status, "finished_at": timezone.now()}
+        if status == Job.DONE:
+            fields["result"] = payload
+        elif status == Job.FAILED:
+            fields["error"] = payload or ""
+            last_line = (payload or "").strip().splitlines()[-1:] or [""]
+            print(f"[ERROR] Задача #{job_id}: {last_line[0]}")
+        Job.objects.filter(pk=job_id).update(**fields)
+    except Exception as e:
+        Job.objects.filter(pk=job_id).update(status=Job.FAILED, error=str(e), finished_at=timezone.now())
+    finally:
+        close_old_connections()
+
+
+def _terminate(proc: multiprocessing.Process):
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        proc.terminate()  # группа ещё не создана или нет killpg (Windows)
+    proc.join(5)
+    if proc.is_alive():
+        proc.kill()
+        proc.join()
+
+
+def _supervise(job: Job, params: dict):
+    """Запускает процесс задачи и ждёт его, перенося счётчики и отмену. Возвращает (статус, данные)."""
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    cancel_event = ctx.Event()
+    proc = ctx.Process(target=run_task, args=(job.kind, params, events, cancel_event), name=f"job-{job.pk}")
+    proc.start()
+
+    outcome = None
+    pending = None          # последний ещё не записанный progress
+    last_save = last_check = 0.0
+    cancel_at = None
+    while outcome is None:
+        try:
+            msg = events.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            msg = None
+            if not proc.is_alive():
+                # процесс вышел; последнее сообщение могло прийти чуть позже
+                try:
+                    msg = events.get(timeout=1.0)
+                except queue.Empty:
+                    outcome = (Job.FAILED, f"Процесс задачи завершился с кодом {proc.exitcode}")
+        if msg is not None:
+            if msg[0] == "progress":
+                pending = msg[1:]
+            else:
+                outcome = ({"done": Job.DONE, "cancelled": Job.CANCELLED, "failed": Job.FAILED}[msg[0]], msg[1])
+
+        now = time.monotonic()
+        if pending is not None and (outcome is not None or now - last_save >= PROGRESS_SAVE_INTERVAL):
+            done, total, message = pending
+            Job.objects.filter(pk=job.pk).update(progress_done=done, progress_total=total, message=message[:255])
+            pending, last_save = None, now
+        if outcome is None and cancel_at is None and now - last_check >= POLL_INTERVAL:
+            last_check = now
+            if Job.objects.filter(pk=job.pk, cancel_requested=True).exists():
+                cancel_event.set()
+                cancel_at = now
+        if outcome is None and cancel_at is not None and now - cancel_at > JOB_CANCEL_GRACE:
+            print(f"[WARN] Задача #{job.pk} не остановилась за {JOB_CANCEL_GRACE:.0f} s — завершаем процесс")
+            _terminate(proc)
+            outcome = (Job.CANCELLED, None)
+
+    proc.join(5)
+    if proc.is_alive():
+        _terminate(proc)
+    return outcome
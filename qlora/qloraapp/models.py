@@ -1,3 +1,75 @@
 from django.db import models
 
-# Create your models here.
+
+class Job(models.Model):
+    """Фоновая задача (сбор, обработка, анализ) — выполняет qloraapp.jobs."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    STATUS_CHOICES = [
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Готово"),
+        (FAILED, "Ошибка"),
+        (CANCELLED, "Отменена"),
+    ]
+    ACTIVE = (QUEUED, RUNNING)
+
+    kind = models.CharField(max_length=32)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    params = models.JSONField(default=dict, blank=True)
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    # процесс веб-сервера, который выполняет задачу: после его смерти задача помечается failed
+    owner_pid = models.IntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["kind", "status"])]
+        constraints = [
+            # не больше одной задачи каждого вида в очереди или в работе (статусы — Job.ACTIVE)
+            models.UniqueConstraint(
+                fields=["kind"],
+                condition=models.Q(status__in=["queued", "running"]),
+                name="one_active_job_per_kind",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE
+
+    def to_dict(self):
+        total = self.progress_total
+        return {
+            "id": self.pk,
+            "kind": self.kind,
+            "status": self.status,
+            "status_display": self.get_status_display(),
+            "params": self.params,
+            "progress": {
+                "done": self.progress_done,
+                "total": total,
+                "percent": round(100 * self.progress_done / total, 1) if total else None,
+                "message": self.message,
+            },
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,79 @@
+// Фоновые задачи: запуск, список с прогрессом и отмена.
+// Пока есть активные задачи, список опрашивается раз в пару секунд.
+(function () {
+    const root = document.getElementById("jobs");
+    const list = document.getElementById("job-list");
+    const errorBox = document.getElementById("job-error");
+    if (!root || !list) {
+        return;
+    }
+
+    const csrf = root.querySelector("input[name=csrfmiddlewaretoken]").value;
+    const ACTIVE = ["queued", "running"];
+    const POLL_MS = 2000;
+    let timer = null;
+
+    function el(tag, text, className) {
+        const node = document.createElement(tag);
+        if (text !== undefined) node.textContent = text;
+        if (className) node.className = className;
+        return node;
+    }
+
+    async function post(url) {
+        const response = await fetch(url, { method: "POST", headers: { "X-CSRFToken": csrf } });
+        return response.json();
+    }
+
+    function renderJob(job) {
+        const item = el("li", undefined, "job-item");
+        const head = el("div", undefined, "job-head");
+        head.appendChild(el("span", `#${job.id} ${job.kind} — ${job.status_display}`));
+        if (ACTIVE.includes(job.status) && !job.cancel_requested) {
+            const cancel = el("button", "Отменить", "simple-button orange-button job-cancel");
+            cancel.addEventListener("click", async () => {
+                await post(root.dataset.cancelUrl.replace("/0/", `/${job.id}/`));
+                refresh();
+            });
+            head.appendChild(cancel);
+        }
+        item.appendChild(head);
+
+        const p = job.progress;
+        if (p.total) {
+            const bar = el("div", undefined, "job-bar");
+            const fill = el("div");
+            fill.style.width = `${p.percent}%`;
+            bar.appendChild(fill);
+            item.appendChild(bar);
+        }
+        let meta = p.total ? `${p.done}/${p.total}` : "";
+        if (p.message) meta += (meta ? " · " : "") + p.message;
+        if (job.cancel_requested && ACTIVE.includes(job.status)) meta += " · отменяется";
+        if (job.error) meta += (meta ? " · " : "") + job.error.trim().split("\n").pop();
+        if (meta) item.appendChild(el("span", meta, "job-meta"));
+        return item;
+    }
+
+    async function refresh() {
+        clearTimeout(timer);
+        const data = await (await fetch(root.dataset.listUrl)).json();
+        list.replaceChildren(...data.jobs.map(renderJob));
+        if (data.jobs.some((job) => ACTIVE.includes(job.status))) {
+            timer = setTimeout(refresh, POLL_MS);
+        }
+    }
+
+    root.querySelectorAll(".job-start").forEach((button) => {
+        button.addEventListener("click", async () => {
+            errorBox.textContent = "";
+            const data = await post(root.dataset.startUrl.replace("KIND", button.dataset.kind));
+            if (!data.ok) {
+                errorBox.textContent = data.error;
+            }
+            refresh();
+        });
+    });
+
+    refresh();
+})();
@@ -0,0 +1,84 @@
+// Отчёт по индустриям: шард выбранной индустрии подгружается по запросу,
+// уже загруженные хранятся в памяти страницы (и в кэше браузера по ETag).
+// Адреса графиков содержат хэш содержимого — браузер кэширует их без перепроверки.
+(function () {
+    const root = document.getElementById("report");
+    const select = document.getElementById("industry-select");
+    const target = document.getElementById("industry-report");
+    if (!root || !select || !target) {
+        return;
+    }
+
+    const shards = {};
+
+    function el(tag, text, className) {
+        const node = document.createElement(tag);
+        if (text !== undefined) node.textContent = text;
+        if (className) node.className = className;
+        return node;
+    }
+
+    function table(title, headers, rows) {
+        const block = el("div", undefined, "report-table");
+        block.appendChild(el("h4", `${title} (${rows.length})`));
+        if (!rows.length) {
+            block.appendChild(el("p", "нет"));
+            return block;
+        }
+        const t = el("table");
+        const head = el("tr");
+        headers.forEach((h) => head.appendChild(el("th", h)));
+        t.appendChild(head);
+        rows.forEach((row) => {
+            const tr = el("tr");
+            row.forEach((cell) => tr.appendChild(el("td", String(cell))));
+            t.appendChild(tr);
+        });
+        block.appendChild(t);
+        return block;
+    }
+
+    function render(shard) {
+        target.replaceChildren();
+        target.appendChild(el("h3", shard.industry));
+        target.appendChild(el("p",
+            `Компетенций в вакансиях: ${shard.total_demand_competencies}, ` +
+            `в проектах: ${shard.total_supply_competencies}`, "report-meta"));
+        if (shard.recommendation) {
+            target.appendChild(el("div", shard.recommendation, "simple-button prompt-text report-reco"));
+        }
+        if (shard.plot) {
+            const img = el("img");
+            img.src = root.dataset.plotUrl.replace("REL", shard.plot);
+            img.alt = shard.industry;
+            target.appendChild(img);
+        }
+        const gaps = [...shard.gaps].sort((a, b) => b.demand - a.demand);
+        target.appendChild(table("Дефицитные компетенции", ["Компетенция", "Спрос"],
+            gaps.map((g) => [g.competency, g.demand])));
+        target.appendChild(table("Топ в вакансиях", ["Компетенция", "Упоминаний"],
+            shard.top_industry_competencies));
+        target.appendChild(table("Топ в проектах", ["Компетенция", "Упоминаний"],
+            shard.top_project_competencies));
+        target.appendChild(table("Совпадения", ["Компетенция", "Спрос", "Предложение"],
+            shard.matches.map((m) => [m.competency, m.demand, m.supply])));
+    }
+
+    select.addEventListener("change", async () => {
+        const slug = select.value;
+        if (!slug) {
+            target.replaceChildren();
+            return;
+        }
+        try {
+            if (!shards[slug]) {
+                const response = await fetch(root.dataset.industryUrl.replace("SLUG", encodeURIComponent(slug)));
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                shards[slug] = await response.json();
+            }
+            if (select.value === slug) render(shards[slug]);
+        } catch (e) {
+            target.replaceChildren(el("p", `Не удалось загрузить отчёт: ${e.message}`));
+        }
+    });
+})();
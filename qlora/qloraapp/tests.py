@@ -1,3 +1,144 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+from django.db import IntegrityError, transaction
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from . import jobs
+from .models import Job
+
+
+class InlineExecutor:
+    """Вместо пула потоков: задача выполняется сразу, в потоке запроса."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+# TransactionTestCase: jobs пишет в базу вне транзакции запроса, как и в работе
+class JobLifecycleTests(TransactionTestCase):
+    def setUp(self):
+        jobs._recovered = False
+        patcher = mock.patch.object(jobs, "_get_executor", return_value=InlineExecutor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start(self, kind, **params):
+        return self.client.post(
+            reverse("job_start", args=[kind]), data=json.dumps(params), content_type="application/json"
+        )
+
+    def status(self, job_id):
+        return self.client.get(reverse("job_status", args=[job_id])).json()["job"]
+
+    def test_start_runs_and_reports_status(self):
+        def supervise(job, params):
+            self.assertEqual(params, {"force": ["analysis"]})
+            self.assertEqual(self.status(job.pk)["status"], Job.RUNNING)
+            Job.objects.filter(pk=job.pk).update(progress_done=7, progress_total=7, message="report: готово")
+            return Job.DONE, {"stages": {"analysis": "run"}}
+
+        with mock.patch.object(jobs, "_supervise", side_effect=supervise):
+            response = self.start("analysis", force="analysis")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["job"]["status"], Job.QUEUED)
+
+        job = self.status(response.json()["job"]["id"])
+        self.assertEqual(job["status"], Job.DONE)
+        self.assertEqual(job["result"], {"stages": {"analysis": "run"}})
+        self.assertEqual(job["progress"], {"done": 7, "total": 7, "percent": 100.0, "message": "report: готово"})
+        self.assertIsNotNone(job["finished_at"])
+
+    def test_failed_task_keeps_error(self):
+        with mock.patch.object(jobs, "_supervise", return_value=(Job.FAILED, "Traceback\nValueError: нет файла")):
+            job_id = self.start("process").json()["job"]["id"]
+        job = self.status(job_id)
+        self.assertEqual(job["status"], Job.FAILED)
+        self.assertIn("нет файла", job["error"])
+
+    def test_secret_comes_from_session_and_is_not_stored(self):
+        self.assertEqual(self.start("collect_sj", pages=2).status_code, 400)
+
+        session = self.client.session
+        session["sj_api_key"] = "secret"
+        session.save()
+        seen = {}
+        with mock.patch.object(jobs, "_supervise", side_effect=lambda job, params: seen.update(params) or (Job.DONE, None)):
+            self.assertEqual(self.start("collect_sj", pages=2).status_code, 202)
+        self.assertEqual(seen, {"pages": 2, "sj_api_key": "secret"})
+        self.assertEqual(Job.objects.get().params, {"pages": 2})
+
+    def test_bad_params_and_unknown_kind(self):
+        session = self.client.session
+        session["sj_api_key"] = "secret"
+        session.save()
+        self.assertEqual(self.start("collect_sj", pages=9).status_code, 400)
+        self.assertEqual(self.start("no_such_task").status_code, 404)
+        self.assertFalse(Job.objects.exists())
+
+    def test_one_active_job_per_kind(self):
+        running = Job.objects.create(kind="process", status=Job.RUNNING, owner_pid=os.getpid())
+        response = self.start("process")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["job"]["id"], running.pk)
+
+        # правило держит база, а не только проверка в submit
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Job.objects.create(kind="process", status=Job.QUEUED)
+        # другой вид и завершённые задачи не мешают
+        Job.objects.create(kind="analysis", owner_pid=os.getpid())
+        Job.objects.create(kind="process", status=Job.DONE)
+
+    def test_cancel_queued_job(self):
+        queued = Job.objects.create(kind="process", owner_pid=os.getpid())
+        response = self.client.post(reverse("job_cancel", args=[queued.pk]))
+        self.assertEqual(response.json()["job"]["status"], Job.CANCELLED)
+        self.assertEqual(self.client.post(reverse("job_cancel", args=[queued.pk])).status_code, 409)
+
+        # задача снята до запуска — поток пула её не выполняет
+        with mock.patch.object(jobs, "_supervise") as supervise:
+            jobs._run(queued.pk, {})
+        supervise.assert_not_called()
+
+    def test_cancel_running_job(self):
+        def supervise(job, params):
+            response = self.client.post(reverse("job_cancel", args=[job.pk]))
+            self.assertEqual(response.json()["job"]["status"], Job.RUNNING)
+            self.assertTrue(response.json()["job"]["cancel_requested"])
+            return Job.CANCELLED, None
+
+        with mock.patch.object(jobs, "_supervise", side_effect=supervise):
+            job_id = self.start("process").json()["job"]["id"]
+        self.assertEqual(self.status(job_id)["status"], Job.CANCELLED)
+        # после отмены можно запускать снова
+        with mock.patch.object(jobs, "_supervise", return_value=(Job.DONE, None)):
+            self.assertEqual(self.start("process").status_code, 202)
+
+    def test_orphans_fail_on_first_request(self):
+        orphan = Job.objects.create(kind="process", status=Job.RUNNING, owner_pid=_dead_pid())
+        alive = Job.objects.create(kind="analysis", status=Job.RUNNING, owner_pid=os.getpid())
+
+        self.client.get(reverse("job_list"))
+        orphan.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual(orphan.status, Job.FAILED)
+        self.assertTrue(orphan.error)
+        self.assertEqual(alive.status, Job.RUNNING)
+
+    def test_submit_replaces_orphan(self):
+        jobs._recovered = True  # восстановление при старте уже прошло
+        orphan = Job.objects.create(kind="process", owner_pid=_dead_pid())
+        with mock.patch.object(jobs, "_supervise", return_value=(Job.DONE, None)):
+            self.assertEqual(self.start("process").status_code, 202)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, Job.FAILED)
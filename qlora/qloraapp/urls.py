@@ -5,7 +5,17 @@ from . import views
 urlpatterns = [
     path('', views.index, name='home'),
     path('jobs/', views.collect_jobs, name='jobs'),
+    path('jobs/list/', views.job_list, name='job_list'),
+    path('jobs/start/<str:kind>/', views.start_job, name='job_start'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/cancel/', views.cancel_job, name='job_cancel'),
     path('vacancies/', views.analyze_vacancies, name='vacancies'),
+    path('vacancies/analyze/', views.analyze_vacancy_one, name='vacancy_analyze_one'),
     path('project_data/', views.analyze_project_data, name='project_data'),
+    path('project_data/analyze/', views.analyze_project_one, name='project_analyze_one'),
     path('statistics/', views.matrices_and_statistics, name='statistics'),
+    path('statistics/gaps/', views.matrix_gaps, name='matrix_gaps'),
+    path('statistics/demand/', views.matrix_demand, name='matrix_demand'),
+    path('statistics/report/industries/<str:slug>/', views.report_industry, name='report_industry'),
+    path('statistics/report/<path:rel>', views.report_plot, name='report_plot'),
 ]
\ No newline at end of file
@@ -1,8 +1,19 @@
-from django.http import JsonResponse
-from django.shortcuts import render, redirect
-from django.views.decorators.http import require_POST
+import json
+import os
+
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.http import require_GET, require_POST
 import config as cfg
-import fetch_sj as sj
+from analyze_vacancies_llm import _build_prompt as build_vacancy_prompt, MAX_NEW_TOKENS as VAC_MAX_NEW_TOKENS
+from analyze_projects_llm import build_prompt as build_project_prompt, MAX_NEW_TOKENS as PROJ_MAX_NEW_TOKENS
+from llm_service import get_llm_service, PRIORITY_INTERACTIVE
+from llm_utils import competencies_from_answer
+from matrix_index import INDEX_PATH, MatrixIndex
+from report_bundle import BUNDLE_DIR, MANIFEST_NAME, load_manifest
+from job_tasks import TASKS
+from . import jobs
+from .models import Job
 
 
 def index(request):
@@ -19,25 +30,56 @@ def index(request):
     return render(request, "qloraapp/index.html")
 
 def collect_jobs(request):
-    return render(request, 'qloraapp/jobs.html')
+    tasks = [{"kind": kind, "title": task.title} for kind, task in TASKS.items()]
+    return render(request, 'qloraapp/jobs.html', {"tasks": tasks})
+
+# ---------- фоновые задачи (qloraapp.jobs): запуск, статус, отмена ----------
+
+SECRET_NAMES = {"sj_api_key": "SuperJob API key"}
 
 @require_POST
-def start_collect_jobs(request):
-    sj_key = request.session.get("sj_api_key")
-    if not sj_key:
-        return JsonResponse({"ok": False, "error": "Не задан SuperJob API key"}, status=400)
+def start_job(request, kind):
+    task = TASKS.get(kind)
+    if task is None:
+        raise Http404("Нет такой задачи")
+    # параметры — JSON-телом или полями формы
+    raw = _read_json_body(request) if request.content_type == "application/json" else request.POST.dict()
+    if raw is None:
+        return JsonResponse({"ok": False, "error": "Тело запроса — не JSON-объект"}, status=400)
+
+    secrets = {}
+    for name in task.secrets:
+        value = request.session.get(name)
+        if not value:
+            return JsonResponse({"ok": False, "error": f"Не задан {SECRET_NAMES.get(name, name)}"}, status=400)
+        secrets[name] = value
 
     try:
-        keywords = cfg.load_industry_keywords()
-        out = sj.collect_sj_batch(
-            sj_api_key=sj_key,
-            industry_keywords=keywords,
-            out_dir=cfg.RAW_DIR,
-            pages=3,
-        )
-        return JsonResponse({"ok": True, "file": out})
-    except Exception as e:
-        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+        job = jobs.submit(kind, raw, secrets)
+    except ValueError as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=400)
+    except jobs.JobConflict as e:
+        return JsonResponse({"ok": False, "error": str(e), "job": e.job.to_dict()}, status=409)
+    return JsonResponse({"ok": True, "job": job.to_dict()}, status=202)
+
+@require_GET
+def job_status(request, job_id):
+    return JsonResponse({"ok": True, "job": get_object_or_404(Job, pk=job_id).to_dict()})
+
+@require_POST
+def cancel_job(request, job_id):
+    job = get_object_or_404(Job, pk=job_id)
+    if not job.is_active:
+        return JsonResponse({"ok": False, "error": "Задача уже завершена", "job": job.to_dict()}, status=409)
+    return JsonResponse({"ok": True, "job": jobs.cancel(job).to_dict()})
+
+@require_GET
+def job_list(request):
+    qs = Job.objects.all()
+    kind = request.GET.get("kind", "").strip()
+    if kind:
+        qs = qs.filter(kind=kind)
+    return JsonResponse({"ok": True, "jobs": [job.to_dict() for job in qs[:20]]})
 
 def analyze_vacancies(request):
     return render(request, 'qloraapp/vacancies.html')
@@ -45,5 +87,123 @@ def analyze_vacancies(request):
 def analyze_project_data(request):
     return render(request, 'qloraapp/project_data.html')
 
+def _read_json_body(request):
+    try:
+        payload = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+@require_POST
+async def analyze_vacancy_one(request):
+    vac = _read_json_body(request)
+    if not vac or not (vac.get("title") or vac.get("description")):
+        return JsonResponse({"ok": False, "error": "Нужны поля title и/или description"}, status=400)
+
+    try:
+        raw = await get_llm_service().agenerate(
+            build_vacancy_prompt(vac),
+            priority=PRIORITY_INTERACTIVE,
+            max_new_tokens=VAC_MAX_NEW_TOKENS,
+        )
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+    return JsonResponse({"ok": True, "competencies": competencies_from_answer(raw)})
+
+@require_POST
+async def analyze_project_one(request):
+    project = _read_json_body(request)
+    if not project or not (project.get("title") or project.get("description")):
+        return JsonResponse({"ok": False, "error": "Нужны поля title и/или description"}, status=400)
+
+    try:
+        raw = await get_llm_service().agenerate(
+            build_project_prompt(project),
+            priority=PRIORITY_INTERACTIVE,
+            max_new_tokens=PROJ_MAX_NEW_TOKENS,
+        )
+    except Exception as e:
+        return JsonResponse({"ok": False, "error": str(e)}, status=500)
+    return JsonResponse({"ok": True, "competencies": competencies_from_answer(raw)})
+
+def _bundle_dir():
+    return os.path.join(cfg.BASE_DIR, "src", BUNDLE_DIR)
+
+_manifest_cache = {"mtime": None, "manifest": None}
+
+def _report_manifest():
+    # манифест небольшой, но перечитываем его только когда пайплайн его обновил
+    path = os.path.join(_bundle_dir(), MANIFEST_NAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if _manifest_cache["mtime"] != mtime:
+        _manifest_cache["manifest"] = load_manifest(_bundle_dir())
+        _manifest_cache["mtime"] = mtime
+    return _manifest_cache["manifest"]
+
+def _serve_bundle_file(request, rel, content_type, immutable=False):
+    manifest = _report_manifest()
+    digest = (manifest or {}).get("files", {}).get(rel)
+    if digest is None:
+        raise Http404("Нет такого файла в отчёте")
+    etag = f'"{digest}"'
+    if request.headers.get("If-None-Match") == etag:
+        return HttpResponseNotModified(headers={"ETag": etag})
+    try:
+        f = open(os.path.join(_bundle_dir(), rel), "rb")
+    except FileNotFoundError:
+        raise Http404("Файл отчёта заменён новым набором")  # манифест обновился между запросами
+    response = FileResponse(f, content_type=content_type)
+    response["ETag"] = etag
+    if immutable:
+        # адрес содержит путь файла набора, а в его имени — хэш содержимого
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = "no-cache"  # браузер хранит файл, но сверяет ETag
+    return response
+
 def matrices_and_statistics(request):
-    return render(request, 'qloraapp/statistics.html')
\ No newline at end of file
+    # в страницу попадает только манифест: список индустрий и общие графики
+    return render(request, 'qloraapp/statistics.html', {"report": _report_manifest()})
+
+def report_industry(request, slug):
+    manifest = _report_manifest()
+    for entry in (manifest or {}).get("industries", []):
+        if entry["slug"] == slug:
+            return _serve_bundle_file(request, entry["shard"], "application/json")
+    raise Http404("Нет такой индустрии в отчёте")
+
+def report_plot(request, rel):
+    if not rel.startswith("plots/") or not rel.endswith(".png"):
+        raise Http404("Нет такого графика")
+    return _serve_bundle_file(request, rel, "image/png", immutable=True)
+
+def _open_matrix_index():
+    # пути в src относительные (data/derived/...), от корня проекта
+    path = os.path.join(cfg.BASE_DIR, "src", INDEX_PATH)
+    if not os.path.exists(path):
+        return None
+    return MatrixIndex(path)
+
+def matrix_gaps(request):
+    industry = request.GET.get("industry", "").strip()
+    if not industry:
+        return JsonResponse({"ok": False, "error": "Нужен параметр industry"}, status=400)
+    idx = _open_matrix_index()
+    if idx is None:
+        return JsonResponse({"ok": False, "error": "Матрица ещё не построена"}, status=404)
+    with idx:
+        return JsonResponse({"ok": True, "industry": industry, "gaps": idx.gaps_for(industry)})
+
+def matrix_demand(request):
+    competency = request.GET.get("competency", "").strip()
+    if not competency:
+        return JsonResponse({"ok": False, "error": "Нужен параметр competency"}, status=400)
+    idx = _open_matrix_index()
+    if idx is None:
+        return JsonResponse({"ok": False, "error": "Матрица ещё не построена"}, status=404)
+    with idx:
+        industries = [{"industry": name, "demand": d} for name, d in idx.industries_demanding(competency)]
+    return JsonResponse({"ok": True, "competency": competency, "industries": industries})
\ No newline at end of file
@@ -1,17 +1,18 @@
-import json
 from typing import List, Dict, Any
 from tqdm import tqdm
 
 from llm_client import get_llama
+from sharded_inference import generate_sharded
 from llm_prompts import PROJECT_COMPETENCIES_PROMPT
-from llm_utils import parse_competencies
+from llm_utils import competencies_from_answer
+from competency_canon import canonicalize_list
+from record_io import load_records, write_records
 
 MAX_NEW_TOKENS = 128
 
 
 def load_projects(path: str) -> List[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_records(path)
 
 
 def build_prompt(project: Dict[str, Any]) -> str:
@@ -32,8 +33,16 @@ def build_prompt(project: Dict[str, Any]) -> str:
     )
 
 
-def analyze_projects(projects_path: str, out_path: str):
-    llama = get_llama()
+def analyze_projects(
+    projects_path: str,
+    out_path: str,
+    num_shards: int = 1,
+    canonicalize: bool = False,
+):
+    """
+    canonicalize — сразу привести компетенции к канону (competency_canon),
+    тогда отдельный проход normalise_project_competencies не нужен.
+    """
     projects = load_projects(projects_path)
 
     prompts: List[str] = []
@@ -47,23 +56,24 @@ def analyze_projects(projects_path: str, out_path: str):
             "title": p.get("title"),
         })
 
-    raw_answers = llama.generate(
-        prompts,
+    gen_kwargs = dict(
         max_new_tokens=MAX_NEW_TOKENS,
         temperature=0.0,   # deterministic
         top_p=1.0,
         use_tqdm=True,     # прогресс уже на стороне vLLM
+        stage="projects",
     )
+    if num_shards > 1:
+        raw_answers = generate_sharded(prompts, num_workers=num_shards, **gen_kwargs)
+    else:
+        llama = get_llama()
+        raw_answers = llama.generate(prompts, **gen_kwargs)
 
     results: List[Dict[str, Any]] = []
     for meta, raw in zip(metas, raw_answers):
-        comps = parse_competencies(raw)
-
-        if not comps:
-            comps = ["-"]
-        else:
-            comps = [c if (isinstance(c, str) and c.strip()) else "-" for c in comps]
-            comps = list(dict.fromkeys(c.strip() for c in comps if c and c != "-")) or ["-"]
+        comps = competencies_from_answer(raw)
+        if canonicalize:
+            comps = canonicalize_list(comps) or ["-"]
 
         results.append({
             "project_id": meta.get("project_id"),
@@ -72,8 +82,7 @@ def analyze_projects(projects_path: str, out_path: str):
             "competencies": comps,
         })
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    write_records(out_path, results)
 
     print(f"[OK] Компетенции проектов сохранены в {out_path}")
 
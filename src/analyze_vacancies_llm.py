@@ -1,18 +1,19 @@
-import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from tqdm import tqdm
 import os
 
 from llm_client import get_llama
+from sharded_inference import generate_sharded
 from llm_prompts import VACANCY_COMPETENCIES_PROMPT
-from llm_utils import parse_competencies
+from llm_utils import competencies_from_answer
+from competency_canon import canonicalize_list
+from record_io import load_records, write_records
 
 MAX_NEW_TOKENS = 128
 
 
 def load_vacancies(path: str) -> List[Dict[str, Any]]:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return load_records(path)
 
 
 def _build_prompt(vac: Dict[str, Any]) -> str:
@@ -29,13 +30,24 @@ def _build_prompt(vac: Dict[str, Any]) -> str:
     )
 
 
-def analyze_vacancies(vacancies_path: str, out_path: str):
+def analyze_vacancies(
+    vacancies_path: str,
+    out_path: str,
+    num_shards: int = 1,
+    classifier_path: Optional[str] = None,
+    canonicalize: bool = False,
+):
+    """
+    classifier_path — обученный competency_classifier: уверенно размеченные им
+    вакансии в LLM не отправляются.
+    canonicalize — сразу привести компетенции к канону (competency_canon),
+    тогда отдельный проход normalise_vacancy_competencies не нужен.
+    """
     ADAPTER_DIR = r"QLoRA/vac_qlora_adapter/checkpoint-200"
     print("adapter_dir:", ADAPTER_DIR)
     print("exists:", os.path.exists(ADAPTER_DIR))
     print("adapter_config exists:", os.path.exists(os.path.join(ADAPTER_DIR, "adapter_config.json")))
 
-    llama = get_llama(ADAPTER_DIR)
     vacancies = load_vacancies(vacancies_path)
 
     prompts: List[str] = []
@@ -49,23 +61,45 @@ def analyze_vacancies(vacancies_path: str, out_path: str):
             "title": vac.get("title"),
         })
 
-    raw_answers = llama.generate(
-        prompts,
+    # индексы вакансий, которые реально пойдут в модель
+    llm_indices = list(range(len(vacancies)))
+    labelled: Dict[int, List[str]] = {}
+    if classifier_path:
+        from competency_classifier import CompetencyClassifier, route_vacancies
+
+        clf = CompetencyClassifier.load(classifier_path)
+        labelled, llm_indices, report = route_vacancies(clf, vacancies)
+        print(
+            f"[INFO] Классификатор разметил {report['classifier']}/{report['total']} вакансий, "
+            f"в LLM уходит {report['llm']} (экономия {report['llm_traffic_saved']:.1%})"
+        )
+
+    gen_kwargs = dict(
         max_new_tokens=MAX_NEW_TOKENS,
         temperature=0.0,
         top_p=1.0,
         use_tqdm=True,
+        stage="vacancies",
     )
+    llm_prompts = [prompts[i] for i in llm_indices]
+    if not llm_prompts:
+        llm_answers = []
+    elif num_shards > 1:
+        # каждый шард — отдельный процесс со своей моделью (своя GPU)
+        llm_answers = generate_sharded(llm_prompts, num_workers=num_shards, adapter_dir=ADAPTER_DIR, **gen_kwargs)
+    else:
+        llama = get_llama(ADAPTER_DIR)
+        llm_answers = llama.generate(llm_prompts, **gen_kwargs)
+    raw_answers = dict(zip(llm_indices, llm_answers))
 
     results: List[Dict[str, Any]] = []
-    for meta, raw in zip(metas, raw_answers):
-        comps = parse_competencies(raw)
-
-        if not comps:
-            comps = ["-"]
+    for idx, meta in enumerate(metas):
+        if idx in labelled:
+            comps = labelled[idx]
         else:
-            comps = [c if (isinstance(c, str) and c.strip()) else "-" for c in comps]
-            comps = list(dict.fromkeys(c.strip() for c in comps if c and c != "-")) or ["-"]
+            comps = competencies_from_answer(raw_answers[idx])
+        if canonicalize:
+            comps = canonicalize_list(comps) or ["-"]
 
         results.append({
             "vacancy_id": meta["vacancy_id"],
@@ -74,8 +108,7 @@ def analyze_vacancies(vacancies_path: str, out_path: str):
             "competencies": comps,
         })
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    write_records(out_path, results)
 
     print(f"[OK] Индустриальные компетенции по вакансиям сохранены в {out_path}")
 
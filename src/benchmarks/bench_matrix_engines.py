@@ -0,0 +1,121 @@
+# src/benchmarks/bench_matrix_engines.py
+"""
+Два пути build_matrices: python (Counter по разметке + classify_matrix) и
+encoded (разреженные матрицы по массивам id этапа encode, competency_matrix_sparse).
+
+Корпус синтетический: вакансии и проекты с индустриями и компетенциями
+по закону Ципфа (как в реальных данных: Python/SQL встречаются везде,
+хвост — единичные строки). --scale умножает базовый размер корпуса.
+Отдельно замеряются расчёт строк и запись JSON (она у путей общая).
+Кодирование в id (encode_stage_outputs) — отдельный этап run_phase1,
+его время печатается отдельно и в расчёт encoded не входит. Оба пути
+пишут файлы во временную папку, файлы сравниваются побайтно.
+
+Запуск из src/:
+    python -m benchmarks.bench_matrix_engines --scale 100
+"""
+import argparse
+import filecmp
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+from build_competency_matrix import (
+    build_demand_by_industry,
+    build_supply_by_industry,
+    classify_matrix,
+    write_matrices,
+)
+from competency_matrix_sparse import classify_encoded_files
+from vocab_registry import encode_stage_outputs
+
+INDUSTRIES = [
+    "IT", "FinTech", "EdTech", "GameDev", "HealthTech", "E-commerce", "AI",
+    "Telecom", "Retail", "Logistics", "Manufacturing", "Media", "GovTech",
+]
+
+
+def make_corpus(n_vacancies: int, n_projects: int, n_competencies: int, seed: int = 0):
+    rng = random.Random(seed)
+    names = [f"Competency {i}" for i in range(n_competencies)]
+    # накопленные веса считаем один раз: choices(weights=...) пересчитывал бы их на каждый вызов
+    cum_weights = list(itertools.accumulate(1.0 / (i + 1) for i in range(n_competencies)))
+
+    def comps():
+        return list(dict.fromkeys(rng.choices(names, cum_weights=cum_weights, k=rng.randint(0, 12))))
+
+    vacancies = [
+        {"vacancy_id": str(i), "industry": rng.choice(INDUSTRIES), "title": "", "competencies": comps()}
+        for i in range(n_vacancies)
+    ]
+    projects = [
+        {
+            "project_id": i,
+            "industry": "/".join(rng.sample(INDUSTRIES, rng.randint(1, 3))),
+            "title": "",
+            "competencies": comps(),
+        }
+        for i in range(n_projects)
+    ]
+    return vacancies, projects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vacancies", type=int, default=2000, help="базовое число вакансий")
+    parser.add_argument("--projects", type=int, default=300, help="базовое число проектов")
+    parser.add_argument("--competencies", type=int, default=3000, help="базовый размер словаря")
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--engines", nargs="+", choices=["python", "encoded"], default=["python", "encoded"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_matrix_")
+    vacancies, projects = make_corpus(
+        args.vacancies * args.scale,
+        args.projects * args.scale,
+        args.competencies * args.scale,
+        args.seed,
+    )
+    industry_input = os.path.join(tmp, "industry_competencies.json")
+    project_input = os.path.join(tmp, "project_competencies.json")
+    for path, data in ((industry_input, vacancies), (project_input, projects)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    print(f"[BENCH] {len(vacancies)} вакансий, {len(projects)} проектов -> {tmp}")
+
+    encoded = [os.path.join(tmp, name) for name in ("demand.ids.npz", "supply.ids.npz", "vocab.txt")]
+    if "encoded" in args.engines:
+        start = time.perf_counter()
+        encode_stage_outputs(industry_input, project_input, *encoded)
+        print(f"[BENCH] этап encode (вне расчёта encoded): {time.perf_counter() - start:.2f} s")
+
+    outputs = {}
+    for engine in args.engines:
+        matrix_output = os.path.join(tmp, f"competency_matrix.{engine}.json")
+        gaps_output = os.path.join(tmp, f"competency_gaps.{engine}.json")
+        start = time.perf_counter()
+        if engine == "encoded":
+            rows, summaries = classify_encoded_files(*encoded)
+        else:
+            rows, summaries = classify_matrix(
+                build_demand_by_industry(industry_input),
+                build_supply_by_industry(project_input),
+            )
+        computed = time.perf_counter()
+        write_matrices(rows, summaries, matrix_output, gaps_output)
+        written = time.perf_counter()
+        print(f"[BENCH] {engine:>8}: расчёт {computed - start:.2f} s, запись {written - computed:.2f} s, {len(rows)} строк")
+        outputs[engine] = (matrix_output, gaps_output)
+
+    reference = args.engines[0]
+    for engine in args.engines[1:]:
+        same = all(filecmp.cmp(a, b, shallow=False) for a, b in zip(outputs[reference], outputs[engine]))
+        print(f"[BENCH] {engine} vs {reference}: {'файлы идентичны' if same else 'ФАЙЛЫ РАЗЛИЧАЮТСЯ'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+# src/benchmarks/bench_pipeline.py
+"""
+Бенчмарки CPU-этапов пайплайна на синтетическом корпусе (synthetic_corpus).
+
+Этапы — в порядке пайплайна, каждый на выходе предыдущего:
+    normalise                 normalize_hh / normalize_sj по сырым выгрузкам
+    extract_skills            extract_skills_from_vacancy по текстам вакансий
+    competency_normalisers    competency_canon.canonicalize_file для вакансий и проектов
+    build_matrices            счётчики по разметке + классификация + запись
+    build_matrices_encoded    то же по массивам id этапа encode (кодирование — вне замера)
+    filter_competency_matrix  потоковый фильтр матрицы по белому списку
+    compute_stats             stats.json + графики (в отдельную папку на каждый повтор)
+
+Замеры — stage_profiler (wall, CPU, пиковый RSS); лучший из --repeat повторов.
+Этап, которому не хватает зависимостей окружения (bs4), помечается как
+недоступный, остальные идут дальше. extract_skills работает на синтетических
+шаблонах корпуса (SKILL_PATTERNS_PATH), а не на models/skill_patterns.json.
+
+Базовые замеры хранятся в benchmarks/baselines/<масштаб>.json (--save-baseline);
+обычный запуск сравнивает с ними и печатает разницу, регрессии — сверх --tolerance.
+В базе записана машина (machine), на которой она снята: сравнивать имеет
+смысл только с замерами на похожем железе.
+
+Запуск из src/:
+    python -m benchmarks.bench_pipeline --scale 1k --save-baseline
+    python -m benchmarks.bench_pipeline --scale 1k 100k
+    python -m benchmarks.bench_pipeline --scale 1m --only build_matrices compute_stats --repeat 1
+"""
+import argparse
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic_corpus import SCALES, write_corpus
+from record_io import iter_records, load_json, write_json, write_records
+from stage_profiler import RunProfiler
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+WHITELIST_PATH = "data/whitelist_competencies.json"
+_TAG_RE = re.compile(r"<[^>]+>")
+
+
+class BenchmarkUnavailable(Exception):
+    """Этапу не хватает зависимостей окружения — пропускаем, а не падаем."""
+
+
+class BenchContext:
+    def __init__(self, corpus: Dict[str, str], work_dir: str):
+        self.corpus = corpus
+        self.work_dir = work_dir
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.work_dir, name)
+
+
+# ---------- этапы: подготовка (не замеряется) -> функция замера, возвращающая число записей ----------
+
+def bench_normalise(ctx: BenchContext) -> Callable[[], int]:
+    try:
+        from normalise import normalize_hh, normalize_sj
+    except ImportError as e:
+        raise BenchmarkUnavailable(f"normalise: {e}")
+
+    def run():
+        n = 0
+        for item in iter_records(ctx.corpus["hh_raw"]):
+            normalize_hh(item)
+            n += 1
+        for item in iter_records(ctx.corpus["sj_raw"]):
+            normalize_sj(item)
+            n += 1
+        return n
+
+    return run
+
+
+def bench_extract_skills(ctx: BenchContext) -> Callable[[], int]:
+    # шаблоны читаются при импорте модуля: путь задаём до него
+    os.environ.setdefault("SKILL_PATTERNS_PATH", ctx.corpus["skill_patterns"])
+    try:
+        from extract_skills import extract_skills_from_vacancy
+    except (ImportError, OSError) as e:
+        raise BenchmarkUnavailable(f"extract_skills: {e}")
+
+    # тексты готовятся без bs4, чтобы этап не зависел от normalise
+    vacancies = [
+        {"title": item.get("name"), "description_text": _TAG_RE.sub(" ", item.get("description") or "")}
+        for item in iter_records(ctx.corpus["hh_raw"])
+    ] + [
+        {"title": item.get("profession"), "description_text": item.get("candidat") or ""}
+        for item in iter_records(ctx.corpus["sj_raw"])
+    ]
+
+    def run():
+        for vac in vacancies:
+            extract_skills_from_vacancy(vac)
+        return len(vacancies)
+
+    return run
+
+
+def bench_competency_normalisers(ctx: BenchContext) -> Callable[[], int]:
+    from competency_canon import canonicalize, canonicalize_file
+
+    def run():
+        # мемо canonicalize сбрасываем, иначе повторы мерили бы только попадания в кэш
+        canonicalize.cache_clear()
+        n = canonicalize_file(ctx.corpus["vacancy_labels"], ctx.path("vacancy_labels_clean.json"))["records"]
+        n += canonicalize_file(ctx.corpus["project_labels"], ctx.path("project_labels_clean.json"))["records"]
+        return n
+
+    return run
+
+
+def _clean_labels(ctx: BenchContext):
+    vac, proj = ctx.path("vacancy_labels_clean.json"), ctx.path("project_labels_clean.json")
+    if not (os.path.exists(vac) and os.path.exists(proj)):
+        # этап нормализации не выбран — готовим его выход без замера
+        bench_competency_normalisers(ctx)()
+    return vac, proj
+
+
+def _bench_build_matrices(ctx: BenchContext, encoded=None) -> Callable[[], int]:
+    from build_competency_matrix import build_matrices
+
+    vac, proj = _clean_labels(ctx)
+
+    def run():
+        rows, _ = build_matrices(
+            vac, proj, ctx.path("competency_matrix.json"), ctx.path("competency_gaps.json"), encoded=encoded
+        )
+        return len(rows)
+
+    return run
+
+
+def bench_build_matrices(ctx: BenchContext) -> Callable[[], int]:
+    return _bench_build_matrices(ctx)
+
+
+def bench_build_matrices_encoded(ctx: BenchContext) -> Callable[[], int]:
+    from vocab_registry import encode_stage_outputs
+
+    vac, proj = _clean_labels(ctx)
+    # как этап encode в run_phase1: id-массивы готовы до расчёта матрицы
+    encoded = (ctx.path("demand.ids.npz"), ctx.path("supply.ids.npz"), ctx.path("vocab.txt"))
+    encode_stage_outputs(vac, proj, *encoded)
+    return _bench_build_matrices(ctx, encoded)
+
+
+def _matrix(ctx: BenchContext):
+    if not os.path.exists(ctx.path("competency_matrix.json")):
+        bench_build_matrices(ctx)()
+    return ctx.path("competency_matrix.json")
+
+
+def bench_filter_competency_matrix(ctx: BenchContext) -> Callable[[], int]:
+    from filter_competency_matrix import filter_rows, load_whitelist, whitelist_matcher
+
+    matrix = _matrix(ctx)
+    whitelist = load_whitelist(WHITELIST_PATH)
+
+    def run():
+        total = 0
+
+        def counted():
+            nonlocal total
+            for row in iter_records(matrix):
+                total += 1
+                yield row
+
+        # как filter_competency_matrix.main: чтение, фильтр и запись одним потоком
+        write_records(ctx.path("competency_matrix_filtered.json"), filter_rows(counted(), whitelist_matcher(whitelist)))
+        return total
+
+    return run
+
+
+def bench_compute_stats(ctx: BenchContext) -> Callable[[], int]:
+    from generate_stats_and_reports import compute_stats
+
+    _matrix(ctx)
+    if not os.path.exists(ctx.path("competency_matrix_filtered.json")):
+        bench_filter_competency_matrix(ctx)()
+    vac, proj = _clean_labels(ctx)
+    attempt = [0]
+
+    def run():
+        attempt[0] += 1
+        # новая папка графиков на каждый повтор: кэш plot_jobs не должен пропускать отрисовку
+        stats = compute_stats(
+            vac,
+            proj,
+            ctx.path("competency_gaps.json"),
+            ctx.path("stats.json"),
+            viz_dir=ctx.path(f"plots-{attempt[0]}"),
+            matrix_filtered_path=ctx.path("competency_matrix_filtered.json"),
+        )
+        return len(stats)
+
+    return run
+
+
+BENCHMARKS = {
+    "normalise": bench_normalise,
+    "extract_skills": bench_extract_skills,
+    "competency_normalisers": bench_competency_normalisers,
+    "build_matrices": bench_build_matrices,
+    "build_matrices_encoded": bench_build_matrices_encoded,
+    "filter_competency_matrix": bench_filter_competency_matrix,
+    "compute_stats": bench_compute_stats,
+}
+
+
+# ---------- запуск и базовые замеры ----------
+
+def run_suite(scale: str, names: List[str], repeat: int, corpus_dir: str, seed: int = 0) -> dict:
+    corpus = write_corpus(corpus_dir, SCALES[scale], seed)
+    work_dir = tempfile.mkdtemp(prefix=f"bench_pipeline_{scale}_")
+    ctx = BenchContext(corpus, work_dir)
+    results: Dict[str, dict] = {}
+    try:
+        for name in names:
+            try:
+                run = BENCHMARKS[name](ctx)
+            except BenchmarkUnavailable as e:
+                print(f"[WARN] {name}: недоступен ({e})")
+                results[name] = {"unavailable": str(e)}
+                continue
+
+            profiler = RunProfiler(f"bench-{name}", modes=[], out_dir=work_dir)
+            records = 0
+            for _ in range(repeat):
+                with profiler.stage(name):
+                    records = run()
+            walls = [s["wall_s"] for s in profiler.stages]
+            best = min(profiler.stages, key=lambda s: s["wall_s"])
+            results[name] = {
+                "wall_s": best["wall_s"],
+                "wall_median_s": round(statistics.median(walls), 3),
+                "cpu_s": best["cpu_s"],
+                "peak_rss_mb": max(s["peak_rss_mb"] for s in profiler.stages),
+                "records": records,
+                "records_per_s": round(records / best["wall_s"]) if best["wall_s"] else None,
+                "repeat": repeat,
+            }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "scale": scale,
+        "n_vacancies": SCALES[scale],
+        "seed": seed,
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu": _cpu_model(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def diff_against_baseline(current: dict, baseline: dict, tolerance: float) -> List[dict]:
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, cur in current["results"].items():
+        base = base_results.get(name)
+        if "unavailable" in cur:
+            status, ratio = "unavailable", None
+        elif not base or "wall_s" not in base:
+            status, ratio = "new", None
+        else:
+            ratio = round(cur["wall_s"] / base["wall_s"], 3) if base["wall_s"] else None
+            if ratio is None:
+                status = "ok"
+            elif ratio > 1 + tolerance:
+                status = "REGRESSION"
+            elif ratio < 1 - tolerance:
+                status = "faster"
+            else:
+                status = "ok"
+        rows.append({
+            "benchmark": name,
+            "base_wall_s": (base or {}).get("wall_s"),
+            "wall_s": cur.get("wall_s"),
+            "ratio": ratio,
+            "status": status,
+        })
+    for name in base_results:
+        if name not in current["results"]:
+            rows.append({"benchmark": name, "base_wall_s": base_results[name].get("wall_s"), "wall_s": None, "ratio": None, "status": "not run"})
+    return rows
+
+
+def _fmt(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.3f}"
+
+
+def print_results(current: dict, diff: Optional[List[dict]]):
+    print(f"\n[BENCH] Масштаб {current['scale']} ({current['n_vacancies']} вакансий)")
+    print(f"{'benchmark':<28}{'wall, s':>10}{'cpu, s':>10}{'RSS, MB':>10}{'записей/с':>12}")
+    for name, r in current["results"].items():
+        if "unavailable" in r:
+            print(f"{name:<28}{'недоступен':>10}")
+            continue
+        print(f"{name:<28}{r['wall_s']:>10.3f}{r['cpu_s']:>10.3f}{r['peak_rss_mb']:>10.1f}{r['records_per_s'] or 0:>12}")
+    if diff is not None:
+        print(f"\n{'benchmark':<28}{'baseline':>10}{'now':>10}{'ratio':>8}  status")
+        for row in diff:
+            ratio = "-" if row["ratio"] is None else f"x{row['ratio']:.2f}"
+            print(f"{row['benchmark']:<28}{_fmt(row['base_wall_s']):>10}{_fmt(row['wall_s']):>10}{ratio:>8}  {row['status']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=os.path.join(tempfile.gettempdir(), "rh_ai_bench_corpus"),
+                        help="где хранить сгенерированные корпуса (переиспользуются между запусками)")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как новый базовый замер")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление относительно базы (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="код выхода 1 при регрессии")
+    parser.add_argument("--output", default=None, help="записать результаты (и сравнение) в JSON")
+    args = parser.parse_args()
+
+    names = [n for n in BENCHMARKS if n in args.only]  # порядок пайплайна
+    regressions = 0
+    report = {}
+    for scale in args.scale:
+        current = run_suite(scale, names, args.repeat, os.path.join(args.corpus_dir, f"{scale}-{args.seed}"), args.seed)
+        baseline_path = os.path.join(args.baseline_dir, f"{scale}.json")
+        diff = None
+        if os.path.exists(baseline_path):
+            diff = diff_against_baseline(current, load_json(baseline_path), args.tolerance)
+            regressions += sum(row["status"] == "REGRESSION" for row in diff)
+        print_results(current, diff)
+        report[scale] = {"results": current, "diff": diff}
+
+        if args.save_baseline:
+            os.makedirs(args.baseline_dir, exist_ok=True)
+            # недоступные этапы в базу не пишем — пусть остаются замеры, сделанные там, где они работают
+            previous = load_json(baseline_path) if os.path.exists(baseline_path) else {}
+            merged = dict(current)
+            merged["results"] = {
+                **(previous or {}).get("results", {}),
+                **{k: v for k, v in current["results"].items() if "unavailable" not in v},
+            }
+            write_json(baseline_path, merged)
+            print(f"[BENCH] Базовый замер сохранён: {baseline_path}")
+
+    if args.output:
+        write_json(args.output, report)
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+# src/benchmarks/synthetic_corpus.py
+"""
+Синтетический корпус для бенчмарков CPU-этапов (bench_pipeline).
+
+Реальный корпус (311 вакансий, 214 проектов) слишком мал, чтобы увидеть
+проблемы масштаба. Здесь генерируются записи той же формы, что на каждом
+этапе пайплайна:
+
+- сырые выгрузки HH (HTML-описание, employer/area, _industry) и SJ
+  (profession, candidat, client/town) — вход normalise и extract_skills;
+- ответы LLM по вакансиям и проектам (industry_competencies_llm.json,
+  project_competencies_llm.json) с тем же шумом, что у модели: разный
+  регистр и написание ("питон", "postgres"), строки через запятую, "-",
+  повторы; у проектов — индустрии через "/";
+- шаблоны навыков для extract_skills (models/skill_patterns.json в репозиторий
+  не входит): группы -> строки в нижнем регистре, как ищет extract_by_patterns.
+
+Компетенции — реальные названия плюс длинный хвост по закону Ципфа
+(размер словаря растёт с корпусом). Генерация потоковая и детерминированная
+(seed), файлы пишутся через record_io — 1M записей не держится в памяти.
+"""
+import itertools
+import os
+import random
+from typing import Dict, Iterator
+
+from record_io import RecordWriter, load_json, write_json
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+# проектов заметно меньше, чем вакансий (в реальных данных 214 на 311, но при росте корпуса — реже)
+PROJECTS_PER_VACANCY = 0.1
+CORPUS_VERSION = 2
+# шаблонов extract_skills: голова словаря + столько строк хвоста
+PATTERN_TAIL = 300
+PATTERN_GROUPS = ("languages", "frameworks", "databases", "tools", "soft_skills", "domain")
+
+INDUSTRIES = [
+    "IT", "FinTech", "EdTech", "GameDev", "HealthTech", "E-commerce", "AI", "Telecom", "Retail",
+    "Logistics", "Manufacturing", "Media", "GovTech", "1CDevelopment", "Cybersecurity", "AnalyticsBI",
+    "EnterpriseSoftware", "SportTech", "PropTech", "AgroTech",
+]
+
+# голова распределения — реальные названия, в том числе с алиасами competency_canon
+BASE_COMPETENCIES = [
+    "Python", "SQL", "Git", "Docker", "Linux", "JavaScript", "PostgreSQL", "Java", "REST API", "Kubernetes",
+    "1С", "TypeScript", "React", "C#", "C++", "Go", "PHP", "Django", "FastAPI", "Spring",
+    "Machine Learning", "Pandas", "NumPy", "Airflow", "Kafka", "Redis", "MongoDB", "ClickHouse", "Figma", "Jira",
+    "Agile", "Scrum", "CI/CD", "Nginx", "Vue.js", "Angular", "Kotlin", "Swift", "Unity", "Excel",
+    "Power BI", "Tableau", "Английский язык", "Коммуникабельность", "Управление проектами", "Тестирование",
+    "Информационная безопасность", "Сетевые технологии", "Базы данных", "ООП",
+]
+# как модель иногда пишет то же самое
+NOISY_VARIANTS = {
+    "Python": ["python", "питон", "Python 3"],
+    "PostgreSQL": ["postgres", "Postgres", "postgresql"],
+    "JavaScript": ["JS", "javascript"],
+    "1С": ["1C", "1с"],
+    "Kubernetes": ["k8s"],
+    "Machine Learning": ["ML", "машинное обучение"],
+    "Git": ["git"],
+}
+
+TOWNS = ["Москва", "Санкт-Петербург", "Екатеринбург", "Новосибирск", "Казань", "Краснодар", "Удалённо"]
+TITLES = ["Разработчик", "Аналитик", "Инженер", "Тестировщик", "Программист", "Архитектор", "Стажёр", "Тимлид"]
+FILLER = [
+    "Мы ищем специалиста в команду разработки.",
+    "Официальное трудоустройство, гибкий график, ДМС.",
+    "Участие в проектах полного цикла от идеи до поддержки.",
+    "Работа в офисе или удалённо, современный стек.",
+    "Обучение и конференции за счёт компании.",
+]
+
+
+class SyntheticCorpus:
+    def __init__(self, n_vacancies: int, seed: int = 0):
+        self.n_vacancies = n_vacancies
+        self.n_projects = max(1, int(n_vacancies * PROJECTS_PER_VACANCY))
+        self.seed = seed
+        # хвост словаря растёт примерно как sqrt(корпуса) — как новые формулировки у LLM
+        tail = int(30 * n_vacancies ** 0.5)
+        self.competencies = BASE_COMPETENCIES + [f"Навык {i}" for i in range(tail)]
+        # накопленные веса один раз: choices(weights=...) пересчитывал бы их на каждый вызов
+        self._cum = list(itertools.accumulate(1.0 / (i + 1) for i in range(len(self.competencies))))
+
+    def _rng(self, stream: str) -> random.Random:
+        # отдельный поток случайности на каждый файл: файлы не зависят от порядка генерации
+        return random.Random(f"{self.seed}:{stream}")
+
+    def _skills(self, rng: random.Random, k_max: int = 12):
+        return list(dict.fromkeys(rng.choices(self.competencies, cum_weights=self._cum, k=rng.randint(0, k_max))))
+
+    def _noisy(self, rng: random.Random, comp: str) -> str:
+        variants = NOISY_VARIANTS.get(comp)
+        if variants and rng.random() < 0.3:
+            return rng.choice(variants)
+        if rng.random() < 0.05:
+            return comp.lower()
+        return comp
+
+    # ---------- сырые выгрузки ----------
+
+    def hh_raw(self) -> Iterator[dict]:
+        rng = self._rng("hh")
+        for i in range(self.n_vacancies // 2):
+            skills = self._skills(rng)
+            items = "".join(f"<li>Опыт работы с <strong>{s}</strong></li>" for s in skills)
+            yield {
+                "id": str(10_000_000 + i),
+                "name": f"{rng.choice(TITLES)} {skills[0] if skills else ''}".strip(),
+                "description": f"<p>{rng.choice(FILLER)}</p><p><b>Требования:</b></p><ul>{items}</ul><p>{rng.choice(FILLER)}</p>",
+                "key_skills": [{"name": s} for s in skills[:5]],
+                "employer": {"name": f"Компания {rng.randint(1, 5000)}"},
+                "area": {"name": rng.choice(TOWNS)},
+                "_industry": rng.choice(INDUSTRIES),
+                "_fetched_at": "2025-11-23T10:00:00",
+            }
+
+    def sj_raw(self) -> Iterator[dict]:
+        rng = self._rng("sj")
+        for i in range(self.n_vacancies - self.n_vacancies // 2):
+            skills = self._skills(rng)
+            bullets = "\n".join(f"• знание {s};" for s in skills)
+            yield {
+                "id": 50_000_000 + i,
+                "profession": f"{rng.choice(TITLES)} {skills[0] if skills else ''}".strip(),
+                "candidat": f"{rng.choice(FILLER)}\n \nТребования:\n{bullets}\n \n{rng.choice(FILLER)}",
+                "client": {"title": f"Компания {rng.randint(1, 5000)}"},
+                "town": {"title": rng.choice(TOWNS)},
+                "_industry": rng.choice(INDUSTRIES),
+                "_fetched_at": "2025-11-23T10:00:00",
+            }
+
+    # ---------- ответы LLM ----------
+
+    def _llm_competencies(self, rng: random.Random):
+        comps = [self._noisy(rng, c) for c in self._skills(rng)]
+        roll = rng.random()
+        if roll < 0.05:
+            return "-"                      # модель ничего не нашла
+        if roll < 0.10:
+            return ", ".join(comps)         # одной строкой через запятую
+        if comps and roll < 0.20:
+            comps.append(comps[0])          # повтор
+        return comps
+
+    def vacancy_labels(self) -> Iterator[dict]:
+        rng = self._rng("vacancy_labels")
+        half = self.n_vacancies // 2
+        for i in range(self.n_vacancies):
+            vacancy_id = f"hh:{10_000_000 + i}" if i < half else f"sj:{50_000_000 + i - half}"
+            yield {
+                "vacancy_id": vacancy_id,
+                "industry": rng.choice(INDUSTRIES),
+                "title": rng.choice(TITLES),
+                "competencies": self._llm_competencies(rng),
+            }
+
+    def project_labels(self) -> Iterator[dict]:
+        rng = self._rng("project_labels")
+        for i in range(self.n_projects):
+            yield {
+                "project_id": i,
+                "industry": "/".join(rng.sample(INDUSTRIES, rng.randint(1, 3))),
+                "title": f"Проект {i}",
+                "competencies": self._llm_competencies(rng),
+            }
+
+
+    def skill_patterns(self) -> Dict[str, list]:
+        rng = self._rng("skill_patterns")
+        words = {c.lower() for c in BASE_COMPETENCIES}
+        words.update(v.lower() for variants in NOISY_VARIANTS.values() for v in variants)
+        words.update(c.lower() for c in self.competencies[len(BASE_COMPETENCIES):][:PATTERN_TAIL])
+        groups: Dict[str, list] = {g: [] for g in PATTERN_GROUPS}
+        for w in sorted(words):
+            groups[rng.choice(PATTERN_GROUPS)].append(w)
+        return groups
+
+
+FILES = {
+    "hh_raw": "hh_raw.ndjson",
+    "sj_raw": "sj_raw.ndjson",
+    "vacancy_labels": "industry_competencies_llm.json",
+    "project_labels": "project_competencies_llm.json",
+}
+
+
+def write_corpus(out_dir: str, n_vacancies: int, seed: int = 0) -> Dict[str, str]:
+    """
+    Пишет корпус в out_dir (компактный JSON / NDJSON) и возвращает {вид: путь}.
+    Если там уже лежит корпус с теми же параметрами — переиспользует его.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {kind: os.path.join(out_dir, name) for kind, name in FILES.items()}
+    paths["skill_patterns"] = os.path.join(out_dir, "skill_patterns.json")
+    meta_path = os.path.join(out_dir, "corpus_meta.json")
+    meta = {"version": CORPUS_VERSION, "n_vacancies": n_vacancies, "seed": seed}
+    if os.path.exists(meta_path) and load_json(meta_path) == meta and all(map(os.path.exists, paths.values())):
+        return paths
+
+    corpus = SyntheticCorpus(n_vacancies, seed)
+    for kind, path in paths.items():
+        with RecordWriter(path, compact=True) as w:
+            w.write_all(getattr(corpus, kind)())
+        print(f"[BENCH] {os.path.basename(path)}: {w.count} записей")
+    write_json(paths["skill_patterns"], corpus.skill_patterns())
+    write_json(meta_path, meta)
+    return paths
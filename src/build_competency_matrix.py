@@ -1,13 +1,14 @@
 # src/build_competency_matrix.py
 
-import json
+import hashlib
+import os
 from collections import defaultdict, Counter
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
+from record_io import iter_records, load_json, write_json, write_records
 
-def load_json(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+# состояние для apply_delta: папка, файл на индустрию (см. MatrixState)
+STATE_PATH = "data/derived/competency_matrix_state"
 
 
 def normalize_competencies(raw) -> List[str]:
@@ -45,10 +46,9 @@ def build_demand_by_industry(industry_file: str) -> Dict[str, Counter]:
       ...
     ]
     """
-    data = load_json(industry_file)
     demand: Dict[str, Counter] = defaultdict(Counter)
 
-    for item in data:
+    for item in iter_records(industry_file):
         industry = item.get("industry") or "Unknown"
         comps = normalize_competencies(item.get("competencies"))
         for comp in comps:
@@ -70,10 +70,9 @@ def build_supply_by_industry(project_file: str) -> Dict[str, Counter]:
       "AI/EdTech/GameDev" -> ["AI", "EdTech", "GameDev"]
     Каждой такой индустрии начисляем компетенции этого проекта.
     """
-    data = load_json(project_file)
     supply: Dict[str, Counter] = defaultdict(Counter)
 
-    for item in data:
+    for item in iter_records(project_file):
         raw_industry = item.get("industry") or "Unknown"
         # делим по "/", т.к. часто бывают комбинированные индустрии
         industries = [part.strip() for part in str(raw_industry).split("/") if part.strip()]
@@ -88,16 +87,21 @@ def build_supply_by_industry(project_file: str) -> Dict[str, Counter]:
     return supply
 
 
-def build_matrices(
-    industry_input: str,
-    project_input: str,
-    matrix_output: str,
-    gaps_output: str,
-):
-    # 1) агрегируем спрос и предложение
-    demand = build_demand_by_industry(industry_input)
-    supply = build_supply_by_industry(project_input)
+def competency_status(d: int, s: int) -> Optional[str]:
+    if d > 0 and s > 0:
+        return "match"
+    if d > 0 and s == 0:
+        return "gap"
+    if d == 0 and s > 0:
+        return "redundant"
+    return None
 
+
+def classify_matrix(demand: Dict[str, Counter], supply: Dict[str, Counter]):
+    """
+    Из счётчиков спроса/предложения строит строки competency_matrix.json
+    и сводки по индустриям для competency_gaps_and_redundancy.json.
+    """
     # множество всех индустрий
     all_industries = sorted(set(demand.keys()) | set(supply.keys()))
 
@@ -118,14 +122,12 @@ def build_matrices(
             d = demand_counter.get(comp, 0)
             s = supply_counter.get(comp, 0)
 
-            if d > 0 and s > 0:
-                status = "match"
+            status = competency_status(d, s)
+            if status == "match":
                 matches.append({"competency": comp, "demand": d, "supply": s})
-            elif d > 0 and s == 0:
-                status = "gap"
+            elif status == "gap":
                 gaps.append({"competency": comp, "demand": d})
-            elif d == 0 and s > 0:
-                status = "redundant"
+            elif status == "redundant":
                 redundancies.append({"competency": comp, "supply": s})
             else:
                 # d == 0 and s == 0 — сюда вообще не должны попасть, т.к. all_comps — объединение ключей
@@ -156,21 +158,273 @@ def build_matrices(
             }
         )
 
-    # 2) сохраняем результаты
-    with open(matrix_output, "w", encoding="utf-8") as f:
-        json.dump(matrix_rows, f, ensure_ascii=False, indent=2)
+    return matrix_rows, industry_summaries
 
-    with open(gaps_output, "w", encoding="utf-8") as f:
-        json.dump(industry_summaries, f, ensure_ascii=False, indent=2)
+
+def write_matrices(matrix_rows, industry_summaries, matrix_output: str, gaps_output: str):
+    write_records(matrix_output, matrix_rows)
+    write_records(gaps_output, industry_summaries)
 
     print(f"[INFO] Competency matrix saved to: {matrix_output}")
     print(f"[INFO] Gaps/redundancy saved to: {gaps_output}")
 
 
+def build_matrices(
+    industry_input: str,
+    project_input: str,
+    matrix_output: str,
+    gaps_output: str,
+    state_output: Optional[str] = None,
+    index_output: Optional[str] = None,
+    whitelist_path: Optional[str] = None,
+    filtered_output: Optional[str] = None,
+    aggregates=None,
+    encoded: Optional[Tuple[str, str, str]] = None,
+):
+    """
+    state_output — куда сохранить счётчики спроса/предложения для apply_delta.
+    index_output — куда записать бинарный индекс матрицы для запросов (matrix_index).
+    whitelist_path + filtered_output — заодно записать матрицу, отфильтрованную по
+    белому списку: фильтр применяется к счётчикам (filter_competency_matrix.filter_counters),
+    строки не из белого списка не создаются вовсе.
+    aggregates — готовые счётчики competency_aggregates.aggregate_inputs: входные
+    файлы тогда не читаются вовсе, engine не важен (счёт уже сделан).
+    encoded — (ids спроса, ids предложения, словарь) от vocab_registry.encode_stage_outputs:
+    строки матрицы считаются по массивам id (competency_matrix_sparse), разметка
+    не читается; вывод тот же, что у счётчиков Counter;
+    aggregates тогда нужны только для state_output (CorpusAggregates.from_encoded
+    берёт их из тех же массивов).
+
+    Возвращает (matrix_rows, industry_summaries) — для compute_stats без перечитывания.
+    """
+    demand = supply = None
+    if aggregates is not None:
+        demand, supply = aggregates.demand, aggregates.supply
+    if encoded is not None:
+        from competency_matrix_sparse import classify_encoded_files
+
+        matrix_rows, industry_summaries = classify_encoded_files(*encoded)
+    else:
+        if demand is None:
+            # 1) агрегируем спрос и предложение
+            demand = build_demand_by_industry(industry_input)
+            supply = build_supply_by_industry(project_input)
+        matrix_rows, industry_summaries = classify_matrix(demand, supply)
+
+    # 2) сохраняем результаты
+    write_matrices(matrix_rows, industry_summaries, matrix_output, gaps_output)
+    if demand is None and (state_output or (whitelist_path and filtered_output)):
+        demand = build_demand_by_industry(industry_input)
+        supply = build_supply_by_industry(project_input)
+    if whitelist_path and filtered_output:
+        from filter_competency_matrix import filter_counters, load_whitelist, whitelist_matcher
+
+        match = whitelist_matcher(load_whitelist(whitelist_path))
+        filtered_rows, _ = classify_matrix(filter_counters(demand, match), filter_counters(supply, match))
+        kept = write_records(filtered_output, filtered_rows)
+        print(f"[INFO] Filtered matrix saved to: {filtered_output} ({kept} из {len(matrix_rows)} строк)")
+    if index_output:
+        from matrix_index import write_matrix_index
+
+        write_matrix_index(matrix_rows, index_output)
+
+    if state_output:
+        MatrixState(demand, supply).save(state_output)
+        print(f"[INFO] Matrix state saved to: {state_output}")
+
+    return matrix_rows, industry_summaries
+
+
+# ---------- инкрементальное обновление ----------
+
+
+def _industry_file(industry: str) -> str:
+    # имя файла индустрии в папке состояния: имена индустрий бывают любыми ("AI/EdTech", кириллица)
+    return hashlib.sha1(industry.encode("utf-8")).hexdigest()[:16] + ".json"
+
+
+class MatrixState:
+    """
+    Состояние матрицы по индустриям: счётчики спроса/предложения и готовые строки
+    матрицы со сводкой (как у classify_matrix для одной индустрии).
+
+    На диске — папка: файл на индустрию + index.json со списком индустрий.
+    load читает только индекс, файлы индустрий — по мере надобности; apply_delta
+    пересчитывает, а save перезаписывает только затронутые индустрии.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, demand: Dict[str, Counter], supply: Dict[str, Counter]):
+        self.path: Optional[str] = None  # папка, с которой состояние синхронизировано
+        # индустрия -> {"industry", "demand", "supply", "rows", "summary"}; None — ещё не прочитана с диска
+        self._industries: Dict[str, Optional[dict]] = {}
+        self._dirty = set()
+        self._index_dirty = True
+        for industry in set(demand) | set(supply):
+            self._set(industry, demand.get(industry) or {}, supply.get(industry) or {})
+
+    def _set(self, industry: str, demand: dict, supply: dict):
+        if not demand and not supply:
+            if industry in self._industries:
+                del self._industries[industry]
+                self._index_dirty = True
+        else:
+            if industry not in self._industries:
+                self._index_dirty = True
+            rows, summaries = classify_matrix({industry: Counter(demand)}, {industry: Counter(supply)})
+            self._industries[industry] = {
+                "industry": industry,
+                "demand": dict(demand),
+                "supply": dict(supply),
+                "rows": rows,
+                "summary": summaries[0],
+            }
+        self._dirty.add(industry)
+
+    def _record(self, industry: str) -> Optional[dict]:
+        if industry in self._industries and self._industries[industry] is None:
+            self._industries[industry] = load_json(os.path.join(self.path, _industry_file(industry)))
+        return self._industries.get(industry)
+
+    def apply_delta(self, added=(), removed=(), kind: str = "demand") -> set:
+        """
+        added/removed — записи в формате входных файлов build_matrices:
+        kind="demand" — вакансии (одна индустрия), kind="supply" — проекты (индустрии через "/").
+        Возвращает множество затронутых пар (индустрия, компетенция).
+        """
+        if kind not in ("demand", "supply"):
+            raise ValueError(f"Неизвестный kind={kind!r} (ожидается demand или supply)")
+        other = "supply" if kind == "demand" else "demand"
+
+        changes: Dict[str, Counter] = defaultdict(Counter)
+        for records, sign in ((added, 1), (removed, -1)):
+            for item in records:
+                if kind == "demand":
+                    industries = [item.get("industry") or "Unknown"]
+                else:
+                    raw_industry = item.get("industry") or "Unknown"
+                    industries = [part.strip() for part in str(raw_industry).split("/") if part.strip()]
+                    if not industries:
+                        industries = ["Unknown"]
+                for comp in normalize_competencies(item.get("competencies")):
+                    for industry in industries:
+                        changes[industry][comp] += sign
+
+        touched = set()
+        for industry, delta in changes.items():
+            record = self._record(industry) or {"demand": {}, "supply": {}}
+            counts = dict(record[kind])
+            for comp, n in delta.items():
+                value = counts.get(comp, 0) + n
+                if value < 0:
+                    print(f"[WARN] Удаление больше, чем было: {industry} / {comp}")
+                if value > 0:
+                    counts[comp] = value
+                else:
+                    counts.pop(comp, None)
+                touched.add((industry, comp))
+            self._set(industry, **{kind: counts, other: record[other]})
+        return touched
+
+    def matrices(self):
+        """Строки competency_matrix.json и сводки — как у classify_matrix по всему корпусу."""
+        records = [self._record(industry) for industry in sorted(self._industries)]
+        matrix_rows = [row for record in records for row in record["rows"]]
+        return matrix_rows, [record["summary"] for record in records]
+
+    def save(self, path: str = STATE_PATH):
+        # состояние читает только apply_delta — без отступов
+        if path != self.path:
+            # другая папка (или первая запись): пишем все индустрии, чужие файлы убираем
+            if os.path.isfile(path):
+                os.remove(path)  # прежний формат — один json со счётчиками
+            os.makedirs(path, exist_ok=True)
+            for industry in list(self._industries):
+                self._record(industry)
+            keep = {_industry_file(industry) for industry in self._industries}
+            for name in os.listdir(path):
+                if name.endswith(".json") and name != self.INDEX_FILE and name not in keep:
+                    os.remove(os.path.join(path, name))
+            dirty, self._index_dirty = set(self._industries), True
+        else:
+            dirty = self._dirty
+
+        for industry in dirty:
+            file_path = os.path.join(path, _industry_file(industry))
+            if industry in self._industries:
+                write_json(file_path, self._industries[industry], compact=True)
+            elif os.path.exists(file_path):
+                os.remove(file_path)
+        if self._index_dirty:
+            write_json(os.path.join(path, self.INDEX_FILE), {"industries": sorted(self._industries)}, compact=True)
+        self.path = path
+        self._dirty = set()
+        self._index_dirty = False
+
+    @classmethod
+    def load(cls, path: str = STATE_PATH) -> "MatrixState":
+        if os.path.isfile(path):
+            # прежний формат: только счётчики — строки пересчитываются один раз
+            data = load_json(path)
+            return cls(data.get("demand", {}), data.get("supply", {}))
+        state = cls({}, {})
+        state.path = path
+        state._industries = dict.fromkeys(load_json(os.path.join(path, cls.INDEX_FILE))["industries"])
+        state._index_dirty = False
+        return state
+
+
+def apply_delta(
+    added=(),
+    removed=(),
+    kind: str = "demand",
+    state_path: str = STATE_PATH,
+) -> MatrixState:
+    """
+    Применяет дельту к сохранённому состоянию (build_matrices(..., state_output=...))
+    вместо пересборки по всей истории: читаются, пересчитываются и перезаписываются
+    только затронутые индустрии (и index.json, если набор индустрий изменился).
+    Общие файлы матрицы — O(корпуса) — собирает отдельно export_matrices.
+    """
+    added, removed = list(added), list(removed)
+    state = MatrixState.load(state_path)
+    touched = state.apply_delta(added, removed, kind)
+    state.save(state_path)
+    print(
+        f"[INFO] Delta applied ({kind}): +{len(added)} / -{len(removed)} записей, "
+        f"затронуто пар: {len(touched)}, индустрий: {len({industry for industry, _ in touched})}"
+    )
+    return state
+
+
+def export_matrices(
+    state_path: str = STATE_PATH,
+    matrix_output: Optional[str] = "data/derived/competency_matrix.json",
+    gaps_output: Optional[str] = "data/derived/competency_gaps_and_redundancy.json",
+    index_output: Optional[str] = None,
+):
+    """
+    competency_matrix.json, сводки и индекс из готовых строк состояния (без пересчёта).
+    Читает все индустрии — запускать, когда нужны общие файлы, а не после каждой дельты.
+    """
+    state = MatrixState.load(state_path)
+    matrix_rows, industry_summaries = state.matrices()
+    if matrix_output and gaps_output:
+        write_matrices(matrix_rows, industry_summaries, matrix_output, gaps_output)
+    if index_output:
+        from matrix_index import write_matrix_index
+
+        write_matrix_index(matrix_rows, index_output)
+    return matrix_rows, industry_summaries
+
+
 if __name__ == "__main__":
     build_matrices(
         "data/derived/industry_competencies_llm_clean_updated.json",
         "data/derived/project_competencies_llm_clean_updated.json",
         "data/derived/competency_matrix.json",
         "data/derived/competency_gaps_and_redundancy.json",
+        state_output=STATE_PATH,
+        index_output="data/derived/competency_matrix.idx",
     )
@@ -0,0 +1,152 @@
+# src/competency_aggregates.py
+"""
+Общая агрегация вакансий и проектов для этапов 3 и 4 run_phase1_analysis.
+
+Раньше build_matrices, build_similarity и compute_stats каждый заново читали
+industry_competencies_llm.json и project_competencies_llm_clean_updated.json
+и строили одни и те же Counter по индустриям. aggregate_inputs читает каждый
+файл один раз и за тот же проход собирает все счётчики:
+
+- demand / supply — для матрицы и сходства (как build_demand_by_industry /
+  build_supply_by_industry: normalize_competencies, индустрии проекта через "/");
+- industry_counts / project_counts и глобальные счётчики — для stats.json
+  (как раньше в compute_stats: extract_competency_name, индустрия проекта
+  как есть, без деления по "/").
+
+Правила счёта у матрицы и у статистики разные исторически, и stats.json
+должен остаться совместимым — поэтому счётчики раздельные, а проход один.
+
+В run_phase1_analysis разметку читает только этап encode: он пишет массивы
+id (vocab_registry) и счётчики для stats.json (save_stats), а этап analysis
+собирает CorpusAggregates.from_encoded — demand / supply из тех же массивов,
+по которым строится матрица, так что второго пути агрегации нет.
+"""
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from build_competency_matrix import normalize_competencies
+from record_io import iter_records, load_json, write_json
+
+STATS_COUNTS_PATH = "data/derived/corpus_stats_counts.json"
+
+
+def extract_competency_name(c) -> Optional[str]:
+    if isinstance(c, str):
+        c = c.strip()
+        return c if c and c != "-" else None
+    if isinstance(c, dict):
+        name = c.get("name")
+        if isinstance(name, str) and name.strip():
+            return name.strip()
+    return None
+
+
+def split_project_industries(raw_industry) -> List[str]:
+    """ "AI/EdTech/GameDev" -> ["AI", "EdTech", "GameDev"] (как в build_supply_by_industry)."""
+    industries = [part.strip() for part in str(raw_industry).split("/") if part.strip()]
+    return industries or ["Unknown"]
+
+
+class CorpusAggregates:
+    def __init__(self):
+        # матрица / сходство
+        self.demand: Dict[str, Counter] = defaultdict(Counter)
+        self.supply: Dict[str, Counter] = defaultdict(Counter)
+        # stats.json
+        self.industry_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.project_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.global_industry: Counter = Counter()
+        self.global_project: Counter = Counter()
+        self.n_vacancies = 0
+        self.n_projects = 0
+
+    def add_vacancy(self, item: dict):
+        industry = item.get("industry") or "Unknown"
+        # индустрия без компетенций не должна появляться в счётчиках — как у defaultdict в исходных функциях
+        comps = normalize_competencies(item.get("competencies"))
+        if comps:
+            self.demand[industry].update(comps)
+        self.add_vacancy_stats(item)
+
+    def add_project(self, item: dict):
+        raw_industry = item.get("industry") or "Unknown"
+        comps = normalize_competencies(item.get("competencies"))
+        if comps:
+            for industry in split_project_industries(raw_industry):
+                self.supply[industry].update(comps)
+        self.add_project_stats(item)
+
+    # ---------- только счётчики stats.json (этап encode считает demand / supply массивами id) ----------
+
+    def add_vacancy_stats(self, item: dict):
+        names = [n for n in map(extract_competency_name, item.get("competencies") or ()) if n]
+        if names:
+            industry = item.get("industry") or "Unknown"
+            self.industry_counts[industry].update(names)
+            self.global_industry.update(names)
+        self.n_vacancies += 1
+
+    def add_project_stats(self, item: dict):
+        names = [n for n in map(extract_competency_name, item.get("competencies") or ()) if n]
+        if names:
+            self.project_counts[item.get("industry") or "Unknown"].update(names)
+            self.global_project.update(names)
+        self.n_projects += 1
+
+    def save_stats(self, path: str = STATS_COUNTS_PATH):
+        # порядок ключей сохраняется: most_common при равных счётчиках даёт тот же топ, что и без файла
+        write_json(path, {
+            "n_vacancies": self.n_vacancies,
+            "n_projects": self.n_projects,
+            "industry_counts": self.industry_counts,
+            "project_counts": self.project_counts,
+            "global_industry": self.global_industry,
+            "global_project": self.global_project,
+        })
+
+    @classmethod
+    def from_encoded(
+        cls, demand_path: str, supply_path: str, vocab_path: str, stats_path: str = STATS_COUNTS_PATH
+    ) -> "CorpusAggregates":
+        """
+        Счётчики без чтения разметки: demand / supply — из массивов id этапа encode
+        (те же, по которым classify_encoded строит матрицу), остальное — из save_stats.
+        """
+        from competency_matrix_sparse import load_count_matrices
+
+        agg = cls()
+        D, S, vocab = load_count_matrices(demand_path, supply_path, vocab_path)
+        agg.demand = _counters_by_industry(D, vocab)
+        agg.supply = _counters_by_industry(S, vocab)
+
+        saved = load_json(stats_path)
+        agg.n_vacancies = saved["n_vacancies"]
+        agg.n_projects = saved["n_projects"]
+        for key in ("industry_counts", "project_counts"):
+            getattr(agg, key).update((industry, Counter(c)) for industry, c in saved[key].items())
+        agg.global_industry = Counter(saved["global_industry"])
+        agg.global_project = Counter(saved["global_project"])
+        return agg
+
+
+def _counters_by_industry(m, vocab) -> Dict[str, Counter]:
+    """CSR индустрия × компетенция -> {индустрия: Counter}; пустые строки пропускаются."""
+    result: Dict[str, Counter] = defaultdict(Counter)
+    comp_names = vocab.competencies.names
+    indptr, indices, data = m.indptr.tolist(), m.indices.tolist(), m.data.tolist()
+    for r in range(len(indptr) - 1):
+        lo, hi = indptr[r], indptr[r + 1]
+        if lo < hi:
+            result[vocab.industry_name(r)] = Counter(dict(zip([comp_names[c] for c in indices[lo:hi]], data[lo:hi])))
+    return result
+
+
+def aggregate_inputs(industry_input: str, project_input: str) -> CorpusAggregates:
+    """Один проход по каждому входному файлу -> все счётчики этапов 3 и 4."""
+    agg = CorpusAggregates()
+    for item in iter_records(industry_input):
+        agg.add_vacancy(item)
+    for item in iter_records(project_input):
+        agg.add_project(item)
+    print(f"[INFO] Aggregated {agg.n_vacancies} vacancies, {agg.n_projects} projects")
+    return agg
@@ -0,0 +1,183 @@
+# src/competency_canon.py
+"""
+Единая канонизация строк компетенций для вакансий и проектов.
+
+Раньше у normalise_vacancy_competencies и normalise_project_competencies были
+свои копии NORMALIZATION_MAP (и только одна знала angular/1c/1с). Теперь
+таблица алиасов одна, правила разбиения скомпилированы один раз, а
+canonicalize() мемоизирован: одни и те же строки ("Python", "SQL", ...)
+повторяются тысячи раз, и считать их каждый раз заново незачем.
+
+Движок можно вызывать прямо из analyze_* (canonicalize=True), тогда
+отдельный проход по файлу normalise_*_competencies не нужен.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from record_io import iter_records, load_json, write_records
+
+# единая таблица алиасов: нижний регистр -> каноническое написание
+ALIASES = {
+    "python": "Python",
+    "java": "Java",
+    "c#": "C#",
+    "c++": "C++",
+    "c": "C",
+    "javascript": "JavaScript",
+    "js": "JavaScript",
+    "typescript": "TypeScript",
+    "nodejs": "Node.js",
+    "node js": "Node.js",
+    "node.js": "Node.js",
+    "react": "React",
+    "vue": "Vue",
+    "angular": "Angular",
+    "django": "Django",
+    "flask": "Flask",
+    "fastapi": "FastAPI",
+    "sql": "SQL",
+    "postgresql": "PostgreSQL",
+    "postgress": "PostgreSQL",
+    "mysql": "MySQL",
+    "mongodb": "MongoDB",
+    "redis": "Redis",
+    "docker": "Docker",
+    "kubernetes": "Kubernetes",
+    "aws": "AWS",
+    "gcp": "GCP",
+    "azure": "Azure",
+    "llm": "LLM",
+    "ml": "ML",
+    "nlp": "NLP",
+    "eda": "EDA",
+    "datascience": "Data Science",
+    "unity": "Unity",
+    "unreal engine": "Unreal Engine",
+    "webgl": "WebGL",
+    "3d": "3D",
+    "1c": "1C",
+    "1с": "1C",  # русская буква С
+}
+
+# одобренные после ревью синонимы (см. competency_synonyms): {"alias": "Canonical"}
+# или сам файл ревью целиком — тогда берётся его раздел "aliases".
+# Путь — от src/, а не от текущей папки: результат не должен зависеть от того, откуда запущен код
+EXTRA_ALIASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "competency_aliases.json")
+
+# "Python, SQL" -> по запятой; "Unity/Unreal Engine" -> по "/", если кусок короткий
+_COMMA_SPLIT = re.compile(r",")
+_SLASH_SPLIT = re.compile(r"/")
+SLASH_SPLIT_MAX_LEN = 40
+
+CACHE_SIZE = 65536
+
+_extra_aliases_loaded = False
+
+
+def alias_table() -> Dict[str, str]:
+    """ALIASES вместе с одобренными синонимами (файл читается при первом обращении)."""
+    if not _extra_aliases_loaded:
+        load_extra_aliases()
+    return ALIASES
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def canonicalize(token: str) -> str:
+    """Каноническое написание одной компетенции ("" — если от строки ничего не осталось)."""
+    t = token.strip().strip("\"' ")
+    if not t:
+        return ""
+
+    low = t.lower()
+    aliases = alias_table()
+    if low in aliases:
+        return aliases[low]
+
+    # аббревиатура
+    if t.isupper() and len(t) <= 6:
+        return t
+
+    # по умолчанию — капитализация
+    return t[0].upper() + t[1:]
+
+
+def split_competency_string(s: str) -> List[str]:
+    """
+    Разбиваем строки типа:
+    "Python, SQL, Django"
+    "Unity/Unreal Engine"
+    "C#, .NET, React, Node.js"
+    """
+    return list(_split_cached(s))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _split_cached(s: str) -> Tuple[str, ...]:
+    # кэшируется неизменяемый кортеж: список из кэша вызывающий мог бы испортить
+    parts = []
+    for chunk in _COMMA_SPLIT.split(s):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+
+        if "/" in chunk and len(chunk) < SLASH_SPLIT_MAX_LEN:
+            parts.extend(c.strip() for c in _SLASH_SPLIT.split(chunk) if c.strip())
+        else:
+            parts.append(chunk)
+    return tuple(parts)
+
+
+def load_extra_aliases(path: str = EXTRA_ALIASES_PATH) -> int:
+    """Дополняет ALIASES одобренными синонимами. Возвращает число загруженных пар."""
+    global _extra_aliases_loaded
+    _extra_aliases_loaded = True
+    if not os.path.exists(path):
+        return 0
+    data = load_json(path) or {}
+    if isinstance(data.get("aliases"), dict):
+        data = data["aliases"]
+
+    for alias, canonical in data.items():
+        if isinstance(alias, str) and isinstance(canonical, str) and alias.strip():
+            ALIASES[alias.strip().lower()] = canonical
+    canonicalize.cache_clear()
+    return len(data)
+
+
+def canonicalize_list(raw_list: Iterable[Any]) -> List[str]:
+    """Разбивает, канонизирует и убирает дубли с сохранением порядка."""
+    cleaned = []
+    seen = set()
+
+    for item in raw_list:
+        if not isinstance(item, str):
+            continue
+
+        for tok in _split_cached(item):
+            norm = canonicalize(tok)
+            if norm and norm not in seen:
+                seen.add(norm)
+                cleaned.append(norm)
+
+    return cleaned
+
+
+def canonicalize_records(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Потоковый режим: запись за записью, поле competencies приводится к канону."""
+    for obj in records:
+        comps = obj.get("competencies", [])
+        if not isinstance(comps, list) or not comps:
+            obj["competencies"] = []
+        else:
+            obj["competencies"] = canonicalize_list(comps)
+        yield obj
+
+
+def canonicalize_file(input_path: str, output_path: str) -> Dict[str, int]:
+    """Канонизирует файл результатов analyze_* (вакансии или проекты) потоково."""
+    records = write_records(output_path, canonicalize_records(iter_records(input_path)))
+
+    info = canonicalize.cache_info()
+    return {"records": records, "cache_hits": info.hits, "cache_misses": info.misses}
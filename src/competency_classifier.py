@@ -0,0 +1,309 @@
+# src/competency_classifier.py
+"""
+Лёгкий multi-label классификатор компетенций, обученный на уже размеченных LLM данных.
+
+Признаки — разреженный мешок слов и биграмм (title + description + отрасль),
+модель — one-vs-rest логистическая регрессия на NumPy. Предсказание на CPU
+занимает микросекунды на вакансию, поэтому классификатор ставится перед
+LlamaClient: уверенные ответы берём сразу, в модель уходят только сомнительные.
+
+Обучение:
+    python competency_classifier.py            # обучить и сохранить в models/competency_classifier.*
+"""
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from config import MODELS_DIR
+from record_io import iter_records
+
+VACANCY_LABELS_PATH = "data/derived/industry_competencies_llm_clean_updated.json"
+VACANCY_TEXTS_PATH = "data/processed/vacancies_processed.json"
+PROJECT_LABELS_PATH = "data/derived/project_competencies_llm_clean_updated.json"
+PROJECT_TEXTS_PATH = "data/projects_with_industries_full.json"
+
+MODEL_PATH = os.path.join(MODELS_DIR, "competency_classifier")
+
+TOKEN_RE = re.compile(r"[a-zа-яё0-9#+.]+")
+MAX_LABELS = 7  # как в промптах: не более 7 компетенций
+
+
+def _tokens(text: str) -> List[str]:
+    words = [w.strip(".") for w in TOKEN_RE.findall(text.lower())]
+    words = [w for w in words if len(w) > 1]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vacancy_text(vac: Dict[str, Any]) -> str:
+    return " ".join([vac.get("title") or "", (vac.get("description") or "")[:4000]])
+
+
+def project_text(project: Dict[str, Any]) -> str:
+    return " ".join(
+        str(project.get(k) or "") for k in ("title", "description", "goal", "results", "tech")
+    )
+
+
+def _features(text: str, industry: Optional[str], kind: str) -> List[str]:
+    # отрасль и тип источника — отдельные признаки: одни и те же слова
+    # в вакансии и в проекте дают разные компетенции
+    return _tokens(text) + [f"__industry={industry or 'Unknown'}", f"__kind={kind}"]
+
+
+class CompetencyClassifier:
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        labels: List[str],
+        weights: np.ndarray,
+        bias: np.ndarray,
+        threshold: float = 0.9,
+    ):
+        self.vocab = vocab
+        self.labels = labels
+        self.weights = weights      # (n_features, n_labels)
+        self.bias = bias            # (n_labels,)
+        self.threshold = threshold  # уверенность: каждая вероятность ≤ 1-threshold или ≥ threshold
+
+    # ---------- признаки ----------
+
+    @staticmethod
+    def _matrix(feature_lists: List[List[str]], vocab: Dict[str, int]) -> sparse.csr_matrix:
+        indptr, indices, data = [0], [], []
+        for feats in feature_lists:
+            counts = Counter(vocab[f] for f in feats if f in vocab)
+            indices.extend(counts.keys())
+            data.extend(1.0 + np.log(list(counts.values())) if counts else [])
+            indptr.append(len(indices))
+        X = sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(feature_lists), len(vocab)),
+        )
+        # L2-нормировка строк, чтобы длинные описания не доминировали
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(X).tocsr().astype(np.float32)
+
+    # ---------- обучение ----------
+
+    @classmethod
+    def train(
+        cls,
+        samples: List[Tuple[List[str], List[str]]],
+        *,
+        min_label_count: int = 5,
+        min_feature_df: int = 2,
+        epochs: int = 300,
+        lr: float = 0.05,
+        l2: float = 1e-4,
+        threshold: float = 0.9,
+    ) -> "CompetencyClassifier":
+        """
+        samples — пары (признаки, компетенции). Метки реже min_label_count
+        в модель не попадают: по паре примеров их всё равно не выучить.
+        """
+        label_counts = Counter(c for _, comps in samples for c in set(comps))
+        labels = sorted(c for c, n in label_counts.items() if n >= min_label_count)
+        label_idx = {c: i for i, c in enumerate(labels)}
+
+        df = Counter(f for feats, _ in samples for f in set(feats))
+        vocab = {f: i for i, f in enumerate(sorted(f for f, n in df.items() if n >= min_feature_df))}
+
+        X = cls._matrix([feats for feats, _ in samples], vocab)
+        Y = np.zeros((len(samples), len(labels)), dtype=np.float32)
+        for row, (_, comps) in enumerate(samples):
+            for c in comps:
+                if c in label_idx:
+                    Y[row, label_idx[c]] = 1.0
+
+        # full-batch Adam по логистической функции потерь, все метки сразу
+        W = np.zeros((len(vocab), len(labels)), dtype=np.float32)
+        b = np.log((Y.mean(axis=0) + 1e-3) / (1 - Y.mean(axis=0) + 1e-3)).astype(np.float32)
+        mW, vW = np.zeros_like(W), np.zeros_like(W)
+        mb, vb = np.zeros_like(b), np.zeros_like(b)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        n = max(1, len(samples))
+
+        for t in range(1, epochs + 1):
+            P = 1.0 / (1.0 + np.exp(-(X @ W + b)))
+            G = (P - Y) / n
+            gW = np.asarray(X.T @ G) + l2 * W
+            gb = G.sum(axis=0)
+            mW = beta1 * mW + (1 - beta1) * gW
+            vW = beta2 * vW + (1 - beta2) * gW * gW
+            mb = beta1 * mb + (1 - beta1) * gb
+            vb = beta2 * vb + (1 - beta2) * gb * gb
+            W -= lr * (mW / (1 - beta1 ** t)) / (np.sqrt(vW / (1 - beta2 ** t)) + eps)
+            b -= lr * (mb / (1 - beta1 ** t)) / (np.sqrt(vb / (1 - beta2 ** t)) + eps)
+
+        return cls(vocab, labels, W, b, threshold)
+
+    # ---------- предсказание ----------
+
+    def predict_proba(self, feature_lists: List[List[str]]) -> np.ndarray:
+        X = self._matrix(feature_lists, self.vocab)
+        return 1.0 / (1.0 + np.exp(-(X @ self.weights + self.bias)))
+
+    def predict(self, feature_lists: List[List[str]]) -> List[Tuple[List[str], bool]]:
+        """
+        Для каждого примера — (компетенции, уверен ли классификатор).
+        Уверен, если все вероятности далеки от 0.5 и нашлась хотя бы одна компетенция.
+        """
+        P = self.predict_proba(feature_lists)
+        margin = 1.0 - self.threshold
+        confident = ((P <= margin) | (P >= self.threshold)).all(axis=1)
+
+        results = []
+        for row in range(P.shape[0]):
+            order = np.argsort(-P[row])[:MAX_LABELS]
+            comps = [self.labels[i] for i in order if P[row, i] >= 0.5]
+            results.append((comps, bool(confident[row] and comps)))
+        return results
+
+    # ---------- сохранение ----------
+
+    def save(self, path: str = MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path + ".npz", weights=self.weights, bias=self.bias)
+        with open(path + ".json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"labels": self.labels, "vocab": self.vocab, "threshold": self.threshold},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH, threshold: Optional[float] = None) -> "CompetencyClassifier":
+        with open(path + ".json", "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        arrays = np.load(path + ".npz")
+        return cls(
+            meta["vocab"],
+            meta["labels"],
+            arrays["weights"],
+            arrays["bias"],
+            meta["threshold"] if threshold is None else threshold,
+        )
+
+
+# ---------- данные и маршрутизация ----------
+
+def _load(path: str):
+    return iter_records(path)
+
+
+def load_training_samples(
+    vacancy_labels_path: str = VACANCY_LABELS_PATH,
+    vacancy_texts_path: str = VACANCY_TEXTS_PATH,
+    project_labels_path: Optional[str] = PROJECT_LABELS_PATH,
+    project_texts_path: Optional[str] = PROJECT_TEXTS_PATH,
+) -> List[Tuple[List[str], List[str]]]:
+    """Метки LLM + исходные тексты (в файлах с метками описаний нет)."""
+    samples = []
+
+    texts = {v["id"]: v for v in _load(vacancy_texts_path)}
+    for item in _load(vacancy_labels_path):
+        vac = texts.get(item.get("vacancy_id"))
+        comps = [c for c in item.get("competencies") or [] if c and c != "-"]
+        if vac is None or not comps:
+            continue
+        samples.append((_features(vacancy_text(vac), vac.get("industry"), "vacancy"), comps))
+
+    if project_labels_path and project_texts_path:
+        projects = {str(p.get("id")): p for p in _load(project_texts_path)}
+        for item in _load(project_labels_path):
+            project = projects.get(str(item.get("project_id")))
+            comps = [c for c in item.get("competencies") or [] if c and c != "-"]
+            if project is None or not comps:
+                continue
+            samples.append((_features(project_text(project), project.get("industry"), "project"), comps))
+
+    return samples
+
+
+def route_vacancies(
+    clf: CompetencyClassifier, vacancies: List[Dict[str, Any]]
+) -> Tuple[Dict[int, List[str]], List[int], Dict[str, Any]]:
+    """
+    Делит вакансии на размеченные классификатором и те, что нужно отдать LLM.
+    Возвращает ({индекс: компетенции}, [индексы для LLM], отчёт).
+    """
+    feats = [_features(vacancy_text(v), v.get("industry"), "vacancy") for v in vacancies]
+    labelled: Dict[int, List[str]] = {}
+    to_llm: List[int] = []
+    for idx, (comps, confident) in enumerate(clf.predict(feats)):
+        if confident:
+            labelled[idx] = comps
+        else:
+            to_llm.append(idx)
+
+    total = len(vacancies)
+    report = {
+        "total": total,
+        "classifier": len(labelled),
+        "llm": len(to_llm),
+        "llm_traffic_saved": round(len(labelled) / total, 4) if total else 0.0,
+        "threshold": clf.threshold,
+    }
+    return labelled, to_llm, report
+
+
+def evaluate(clf: CompetencyClassifier, samples: List[Tuple[List[str], List[str]]]) -> Dict[str, Any]:
+    """
+    Насколько уверенные ответы совпадают с разметкой LLM (micro P/R/F1)
+    и какую долю примеров классификатор забирает себе.
+    """
+    preds = clf.predict([feats for feats, _ in samples])
+    tp = fp = fn = 0
+    covered = 0
+    for (comps, confident), (_, gold) in zip(preds, samples):
+        if not confident:
+            continue
+        covered += 1
+        pred_set, gold_set = set(comps), set(gold)
+        tp += len(pred_set & gold_set)
+        fp += len(pred_set - gold_set)
+        fn += len(gold_set - pred_set)
+
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "samples": len(samples),
+        "confident": covered,
+        "llm_traffic_saved": round(covered / len(samples), 4) if samples else 0.0,
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+    }
+
+
+def train_and_save(path: str = MODEL_PATH, holdout: float = 0.2, seed: int = 0, **train_kwargs):
+    samples = load_training_samples()
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(samples))
+    n_test = int(len(samples) * holdout)
+    test = [samples[i] for i in order[:n_test]]
+    train = [samples[i] for i in order[n_test:]]
+
+    clf = CompetencyClassifier.train(train, **train_kwargs)
+    print(f"[INFO] Классификатор: {len(clf.labels)} меток, {len(clf.vocab)} признаков, обучено на {len(train)}")
+    if test:
+        for thr in (0.8, 0.9, 0.95):
+            clf.threshold = thr
+            print(f"[INFO] holdout, threshold={thr}: {evaluate(clf, test)}")
+
+    # финальная модель — на всех данных
+    clf = CompetencyClassifier.train(samples, **train_kwargs)
+    clf.save(path)
+    print(f"[OK] Классификатор сохранён в {path}.npz / {path}.json")
+    return clf
+
+
+if __name__ == "__main__":
+    train_and_save()
@@ -0,0 +1,128 @@
+# src/competency_matrix_sparse.py
+"""
+Матрица компетенций по корпусам, закодированным в id (build_matrices(encoded=...)).
+
+Массивы id этапа encode (vocab_registry) собираются в разреженные матрицы
+индустрия × компетенция (COO -> CSR, дубликаты пар суммируются при
+конвертации). Пары (индустрия, компетенция) из объединения двух матриц
+упорядочиваются по именам так же, как в classify_matrix, статусы считаются
+масками, итоги по индустриям — bincount.
+
+Это не ускорение classify_matrix: строки матрицы всё равно словари, и на их
+сборку уходит большая часть времени у обоих путей (benchmarks.bench_matrix_engines).
+Смысл — этапу analysis не нужно перечитывать разметку. Результат совпадает
+с classify_matrix байт в байт.
+"""
+import os
+from typing import List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from vocab_registry import VOCAB_PATH, EncodedCorpus, Vocabulary
+
+
+def count_matrix(corpus: EncodedCorpus, shape: Tuple[int, int]) -> sparse.csr_matrix:
+    ind, comp = corpus.pairs()
+    ones = np.ones(len(ind), dtype=np.int64)
+    return sparse.coo_matrix((ones, (ind, comp)), shape=shape).tocsr()
+
+
+def _name_ranks(names: List[str]):
+    """rank[id] — позиция имени в sorted(names); sorted_names — сами имена по порядку."""
+    order = sorted(range(len(names)), key=names.__getitem__)
+    rank = np.empty(len(names), dtype=np.int64)
+    rank[order] = np.arange(len(names))
+    return rank, [names[i] for i in order]
+
+
+def _sorted_keys(m: sparse.csr_matrix, ind_rank: np.ndarray, comp_rank: np.ndarray):
+    coo = m.tocoo()
+    keys = ind_rank[coo.row] * len(comp_rank) + comp_rank[coo.col]
+    order = np.argsort(keys, kind="stable")
+    return keys[order], coo.data[order]
+
+
+def classify_counts(D: sparse.csr_matrix, S: sparse.csr_matrix, vocab: Vocabulary):
+    """То же, что classify_matrix, но над матрицами счётчиков D и S."""
+    n_comp = len(vocab.competencies)
+    ind_rank, ind_names = _name_ranks(vocab.industries.names)
+    comp_rank, comp_names = _name_ranks(vocab.competencies.names)
+
+    # ключ пары = rank(индустрии) * n_comp + rank(компетенции):
+    # сортировка по ключу = сортировка по (индустрия, компетенция) как строкам
+    d_keys, d_vals = _sorted_keys(D, ind_rank, comp_rank)
+    s_keys, s_vals = _sorted_keys(S, ind_rank, comp_rank)
+    keys = np.union1d(d_keys, s_keys)
+
+    d = np.zeros(len(keys), dtype=np.int64)
+    s = np.zeros(len(keys), dtype=np.int64)
+    d[np.searchsorted(keys, d_keys)] = d_vals
+    s[np.searchsorted(keys, s_keys)] = s_vals
+
+    rows = keys // max(n_comp, 1)
+    cols = keys % max(n_comp, 1)
+
+    has_d = d > 0
+    has_s = s > 0
+    status = np.where(has_d & has_s, "match", np.where(has_d, "gap", "redundant"))
+
+    # индустрии без единой компетенции в вывод не попадают — как и у defaultdict(Counter)
+    present, starts = np.unique(rows, return_index=True)
+    ends = np.append(starts[1:], len(keys))
+    total_d = np.bincount(rows, weights=has_d, minlength=len(ind_names)).astype(np.int64)
+    total_s = np.bincount(rows, weights=has_s, minlength=len(ind_names)).astype(np.int64)
+
+    comp_col = [comp_names[c] for c in cols.tolist()]
+    d_list, s_list, status_list = d.tolist(), s.tolist(), status.tolist()
+
+    matrix_rows = []
+    industry_summaries = []
+    for r, lo, hi in zip(present.tolist(), starts.tolist(), ends.tolist()):
+        industry = ind_names[r]
+        gaps, redundancies, matches = [], [], []
+        for k in range(lo, hi):
+            comp, dv, sv, st = comp_col[k], d_list[k], s_list[k], status_list[k]
+            if st == "match":
+                matches.append({"competency": comp, "demand": dv, "supply": sv})
+            elif st == "gap":
+                gaps.append({"competency": comp, "demand": dv})
+            else:
+                redundancies.append({"competency": comp, "supply": sv})
+            matrix_rows.append({"industry": industry, "competency": comp, "demand": dv, "supply": sv, "status": st})
+
+        industry_summaries.append(
+            {
+                "industry": industry,
+                "total_demand_competencies": int(total_d[r]),
+                "total_supply_competencies": int(total_s[r]),
+                "gaps": gaps,
+                "redundancies": redundancies,
+                "matches": matches,
+            }
+        )
+
+    return matrix_rows, industry_summaries
+
+
+def classify_encoded(demand: EncodedCorpus, supply: EncodedCorpus, vocab: Vocabulary):
+    """Классификация по уже закодированным корпусам (vocab_registry.encode_stage_outputs)."""
+    shape = (len(vocab.industries), len(vocab.competencies))
+    return classify_counts(count_matrix(demand, shape), count_matrix(supply, shape), vocab)
+
+
+def load_count_matrices(demand_path: str, supply_path: str, vocab_path: str = VOCAB_PATH):
+    """Файлы этапа encode (словарь + два .npz) -> (D, S, vocab)."""
+    if not os.path.exists(vocab_path):
+        # без словаря id в .npz ничего не значат (Vocabulary.load вернул бы пустой)
+        raise FileNotFoundError(f"Нет словаря {vocab_path} — сначала этап encode")
+    vocab = Vocabulary.load(vocab_path)
+    shape = (len(vocab.industries), len(vocab.competencies))
+    D = count_matrix(EncodedCorpus.load(demand_path), shape)
+    S = count_matrix(EncodedCorpus.load(supply_path), shape)
+    return D, S, vocab
+
+
+def classify_encoded_files(demand_path: str, supply_path: str, vocab_path: str = VOCAB_PATH):
+    """classify_encoded по файлам этапа encode — разметка не перечитывается."""
+    return classify_counts(*load_count_matrices(demand_path, supply_path, vocab_path))
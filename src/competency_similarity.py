@@ -0,0 +1,120 @@
+# src/competency_similarity.py
+"""
+Сходство спроса и предложения между индустриями без LLM.
+
+Для каждой индустрии строятся два вектора над общим словарём компетенций:
+спрос (вакансии) и предложение (проекты). Веса — сырые счётчики или TF-IDF,
+после L2-нормировки вся матрица косинусного сходства индустрия × индустрия
+считается одним умножением D @ S.T.
+
+Строка i — спрос индустрии i, столбец j — предложение индустрии j:
+диагональ показывает, насколько проекты индустрии закрывают её же вакансии.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from build_competency_matrix import build_demand_by_industry, build_supply_by_industry
+from record_io import write_json
+
+TOP_K = 5
+
+
+def _count_matrix(
+    counters: Dict[str, Dict[str, int]],
+    industries: List[str],
+    comp_idx: Dict[str, int],
+) -> sparse.csr_matrix:
+    rows, cols, vals = [], [], []
+    for i, industry in enumerate(industries):
+        for comp, cnt in counters.get(industry, {}).items():
+            rows.append(i)
+            cols.append(comp_idx[comp])
+            vals.append(cnt)
+    return sparse.csr_matrix(
+        (np.asarray(vals, dtype=np.float64), (rows, cols)),
+        shape=(len(industries), len(comp_idx)),
+    )
+
+
+def _l2_normalize(m: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ m
+
+
+def similarity_matrix(
+    demand: Dict[str, Dict[str, int]],
+    supply: Dict[str, Dict[str, int]],
+    weighting: str = "tfidf",
+) -> Tuple[List[str], np.ndarray]:
+    """
+    weighting="counts" — сырые частоты, "tfidf" — частоты с понижением
+    компетенций, которые встречаются почти во всех индустриях
+    ("ведение документации" не должна делать все индустрии похожими).
+    """
+    if weighting not in ("counts", "tfidf"):
+        raise ValueError(f"Неизвестный weighting={weighting!r}")
+
+    industries = sorted(set(demand) | set(supply))
+    vocab = sorted({c for ctr in demand.values() for c in ctr} | {c for ctr in supply.values() for c in ctr})
+    comp_idx = {c: i for i, c in enumerate(vocab)}
+
+    D = _count_matrix(demand, industries, comp_idx)
+    S = _count_matrix(supply, industries, comp_idx)
+
+    if weighting == "tfidf":
+        # документ — вектор спроса или предложения одной индустрии
+        n_docs = D.shape[0] + S.shape[0]
+        df = np.asarray((D > 0).sum(axis=0)).ravel() + np.asarray((S > 0).sum(axis=0)).ravel()
+        idf = sparse.diags(np.log((1 + n_docs) / (1 + df)) + 1.0)
+        D = D.log1p() @ idf
+        S = S.log1p() @ idf
+
+    sim = (_l2_normalize(D) @ _l2_normalize(S).T).toarray()
+    return industries, sim
+
+
+def build_similarity(
+    industry_input: str,
+    project_input: str,
+    output: str,
+    weighting: str = "tfidf",
+    top_k: int = TOP_K,
+    aggregates=None,
+):
+    """aggregates — счётчики competency_aggregates.aggregate_inputs, чтобы не перечитывать входы."""
+    if aggregates is not None:
+        demand, supply = aggregates.demand, aggregates.supply
+    else:
+        demand = build_demand_by_industry(industry_input)
+        supply = build_supply_by_industry(project_input)
+    industries, sim = similarity_matrix(demand, supply, weighting)
+
+    top_supply = {}
+    for i, industry in enumerate(industries):
+        order = np.argsort(-sim[i])[:top_k]
+        top_supply[industry] = [[industries[j], round(float(sim[i, j]), 4)] for j in order if sim[i, j] > 0]
+
+    result = {
+        "weighting": weighting,
+        "industries": industries,
+        # matrix[i][j] — сходство спроса industries[i] и предложения industries[j]
+        "matrix": np.round(sim, 4).tolist(),
+        "self_match": {industry: round(float(sim[i, i]), 4) for i, industry in enumerate(industries)},
+        "top_supply_for_demand": top_supply,
+    }
+
+    write_json(output, result)
+
+    print(f"[INFO] Industry similarity ({weighting}) saved to: {output}")
+    return result
+
+
+if __name__ == "__main__":
+    build_similarity(
+        "data/derived/industry_competencies_llm_clean_updated.json",
+        "data/derived/project_competencies_llm_clean_updated.json",
+        "data/derived/industry_similarity.json",
+    )
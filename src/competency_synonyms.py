@@ -0,0 +1,303 @@
+# src/competency_synonyms.py
+"""
+Поиск синонимов среди канонизированных компетенций.
+
+"PostgreSQL", "Postgres", "postgress", "Постгрес" и "PostgreSQL DB" после
+competency_canon остаются разными строками и дробят счётчики матрицы.
+Здесь словарь индексируется по символьным триграммам (кириллица
+транслитерируется в латиницу), кандидаты для каждой строки достаются
+из инвертированного индекса, а не перебором всех пар. Близость строк
+целиком — только повод для проверки: пара сливается, если каждому слову
+одной строки нашлось слово-пара в другой (то же слово, сходство по
+триграммам не ниже порога, другое окончание русского слова или хвост
+вроде "JS"). Поэтому "работа с кредиторской задолженностью" и
+"работа с дебиторской задолженностью" или "Power" и "Power BI" остаются
+разными, хотя по триграммам строк целиком почти совпадают.
+
+Группы собираются вокруг канона: строка попадает в группу, только если
+сама прошла проверку в паре с каноном, цепочек через третью строку нет.
+
+Результат — файл на ревью (data/derived/competency_aliases_review.json).
+Одобренные пары переносятся в data/competency_aliases.json, откуда их
+подхватывает competency_canon.
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from competency_canon import alias_table
+from record_io import iter_records, write_json
+
+REVIEW_PATH = "data/derived/competency_aliases_review.json"
+
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "h", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+_TRANSLIT_TABLE = str.maketrans(TRANSLIT)
+_NON_WORD = re.compile(r"[^a-zа-яё0-9#+]+")
+_CYRILLIC = re.compile(r"[а-яё]")
+
+# хвосты, которые не меняют смысл технологии: "PostgreSQL DB", "Redis база данных"
+GENERIC_SUFFIXES = ("db", "database", "bd", "baza dannyh", "baza dannykh")
+
+MIN_KEY_LEN = 4        # C, C#, Go, R — короткие и непохожие по сути, их не трогаем
+# "postgres" / "postgresql", "node" / "nodejs": только эти хвосты не меняют технологию
+# (в отличие от "Scala" / "Scalable", "Swift" / "SwiftUI", "Power" / "Power BI")
+STEM_TAILS = ("js", "ql")
+STEM_MIN_LEN = 4
+# "консультация" / "консультации", "ведение проекта" / "ведение проектов":
+# общее начало не короче INFLECTION_MIN_STEM и разные хвосты не длиннее
+# INFLECTION_TAIL букв; латинские слова — только опечатка в последней букве
+INFLECTION_MIN_STEM = 5
+INFLECTION_TAIL = 3
+LATIN_INFLECTION_TAIL = 1
+DEFAULT_THRESHOLD = 0.85
+# порог сходства строк целиком для отбора кандидатов — ниже DEFAULT_THRESHOLD,
+# чтобы пары, различающиеся окончаниями, дошли до пословной проверки
+CANDIDATE_THRESHOLD = 0.7
+
+
+def match_words(name: str) -> List[Tuple[str, bool]]:
+    """
+    Слова для сравнения: (транслит, было ли слово кириллическим). Без пунктуации,
+    общих хвостов ("DB", "база данных") и номеров версий в конце ("Python 3.13").
+    """
+    # "1С" с кириллической С — то же, что "1C"
+    text = name.lower().replace("1с", "1c")
+    words = [(w.translate(_TRANSLIT_TABLE), bool(_CYRILLIC.search(w))) for w in _NON_WORD.sub(" ", text).split()]
+    words = [(w, cyr) for w, cyr in words if w]
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in GENERIC_SUFFIXES:
+            tail = suffix.split()
+            if len(words) > len(tail) and [w for w, _ in words[-len(tail):]] == tail:
+                del words[-len(tail):]
+                stripped = True
+                break
+        if len(words) > 1 and words[-1][0].isdigit():
+            words.pop()
+            stripped = True
+    return words
+
+
+def match_key(name: str) -> str:
+    """Ключ сравнения: слова match_words без пробелов."""
+    return "".join(w for w, _ in match_words(name))
+
+
+def trigrams(key: str) -> frozenset:
+    padded = f"^{key}$"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _dice(a: frozenset, b: frozenset) -> float:
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _stem_variant(a: str, b: str) -> bool:
+    short, long_ = sorted((a, b), key=len)
+    tail = long_[len(short):]
+    return len(short) >= STEM_MIN_LEN and tail in STEM_TAILS and long_.startswith(short)
+
+
+def _inflection_variant(a: Tuple[str, bool], b: Tuple[str, bool]) -> bool:
+    (wa, cyr_a), (wb, cyr_b) = a, b
+    stem = 0
+    for ca, cb in zip(wa, wb):
+        if ca != cb:
+            break
+        stem += 1
+    tail_a, tail_b = wa[stem:], wb[stem:]
+    max_tail = INFLECTION_TAIL if cyr_a or cyr_b else LATIN_INFLECTION_TAIL
+    return (
+        stem >= INFLECTION_MIN_STEM
+        and len(tail_a) <= max_tail
+        and len(tail_b) <= max_tail
+        and not any(c.isdigit() for c in tail_a + tail_b)
+    )
+
+
+def _words_match(a: Tuple[str, bool], b: Tuple[str, bool], threshold: float) -> bool:
+    wa, wb = a[0], b[0]
+    if wa == wb:
+        return True
+    if min(len(wa), len(wb)) < MIN_KEY_LEN:
+        return False
+    return (
+        _dice(trigrams(wa), trigrams(wb)) >= threshold
+        or _stem_variant(wa, wb)
+        or _inflection_variant(a, b)
+    )
+
+
+def same_meaning(a: List[Tuple[str, bool]], b: List[Tuple[str, bool]], threshold: float = DEFAULT_THRESHOLD) -> bool:
+    """Каждому слову одной строки есть слово-пара в другой (и наоборот)."""
+    return all(any(_words_match(x, y, threshold) for y in b) for x in a) and all(
+        any(_words_match(y, x, threshold) for x in a) for y in b
+    )
+
+
+def find_synonym_pairs(
+    names: List[str], threshold: float = DEFAULT_THRESHOLD
+) -> List[Tuple[int, int, float]]:
+    """
+    Пары (i, j, сходство строк целиком) с i < j.
+
+    Кандидаты достаются через инвертированный индекс с prefix filtering:
+    триграммы каждой строки упорядочены от редких к частым, и индексируется
+    только префикс, без которого пересечение не может дотянуть до
+    CANDIDATE_THRESHOLD по Дайсу. Поэтому частые триграммы ("ани", "ова")
+    не порождают кандидатов, а работа растёт с размером постингов редких
+    триграмм, а не как n². Кандидат становится парой, только если строки
+    совпадают пословно (same_meaning) или их ключи равны.
+    """
+    words = [match_words(n) for n in names]
+    keys = ["".join(w for w, _ in ws) for ws in words]
+    grams = [trigrams(k) if len(k) >= MIN_KEY_LEN else frozenset() for k in keys]
+    candidate_threshold = min(threshold, CANDIDATE_THRESHOLD)
+
+    def accept(i: int, j: int) -> bool:
+        return keys[i] == keys[j] or same_meaning(words[i], words[j], threshold)
+
+    df = Counter(g for gs in grams for g in gs)
+    ordered = [sorted(gs, key=lambda g: (df[g], g)) for gs in grams]
+
+    def prefix_len(size: int) -> int:
+        # при Дайсе >= t пересечение не меньше t*|A|/(2-t)
+        min_overlap = math.ceil(candidate_threshold * size / (2 - candidate_threshold) - 1e-9)
+        return max(1, size - min_overlap + 1)
+
+    index: Dict[str, List[int]] = defaultdict(list)
+    pairs = []
+    sizes = [len(gs) for gs in grams]
+    ratio = candidate_threshold / (2 - candidate_threshold)
+    for i, gs in enumerate(grams):
+        if not gs:
+            continue
+        size = sizes[i]
+        prefix = ordered[i][:prefix_len(size)]
+
+        candidates = set()
+        for g in prefix:
+            candidates.update(index[g])
+        lo, hi = ratio * size, size / ratio
+        for j in candidates:
+            other = sizes[j]
+            # фильтр по длине: у слишком разных по размеру множеств Дайс заведомо ниже порога
+            if other < lo or other > hi:
+                continue
+            score = 1.0 if keys[i] == keys[j] else _dice(gs, grams[j])
+            if score >= candidate_threshold and accept(i, j):
+                pairs.append((min(i, j), max(i, j), round(score, 4)))
+
+        for g in prefix:
+            index[g].append(i)
+
+    # "node" / "nodejs" по триграммам далеки — отдельный проход по словарю обрезков
+    stems: Dict[str, List[int]] = defaultdict(list)
+    for idx, key in enumerate(keys):
+        for tail in STEM_TAILS:
+            if key.endswith(tail) and len(key) - len(tail) >= STEM_MIN_LEN:
+                stems[key[:-len(tail)]].append(idx)
+    found = {(i, j) for i, j, _ in pairs}
+    for i, key in enumerate(keys):
+        for j in stems.get(key, []):
+            pair = (min(i, j), max(i, j))
+            if pair not in found and accept(i, j):
+                found.add(pair)
+                pairs.append((*pair, round(_dice(grams[i], grams[j]), 4)))
+
+    return pairs
+
+
+def _canonical_order(names: List[str], counts: Counter) -> List[int]:
+    canonical_forms = set(alias_table().values())
+    # сначала — написание из таблицы алиасов, потом самое частое, потом самое короткое
+    return sorted(
+        range(len(names)),
+        key=lambda i: (names[i] not in canonical_forms, -counts[names[i]], len(names[i]), names[i]),
+    )
+
+
+def resolve_synonyms(counts: Counter, threshold: float = DEFAULT_THRESHOLD) -> Dict[str, object]:
+    names = sorted(counts)
+    neighbours: Dict[int, Dict[int, float]] = defaultdict(dict)
+    for i, j, score in find_synonym_pairs(names, threshold):
+        neighbours[i][j] = score
+        neighbours[j][i] = score
+
+    # канон выбирается первым, в группу идут только его прямые пары — без транзитивных цепочек
+    review_groups = []
+    aliases: Dict[str, str] = {}
+    assigned = set()
+    for canon in _canonical_order(names, counts):
+        if canon in assigned or canon not in neighbours:
+            continue
+        others = sorted(
+            (m for m in neighbours[canon] if m not in assigned),
+            key=lambda m: (-counts[names[m]], names[m]),
+        )
+        if not others:
+            continue
+        assigned.add(canon)
+        assigned.update(others)
+        for m in others:
+            aliases[names[m]] = names[canon]
+        review_groups.append({
+            "canonical": names[canon],
+            "count": counts[names[canon]],
+            "aliases": [
+                {"name": names[m], "count": counts[names[m]], "score": neighbours[canon][m]}
+                for m in others
+            ],
+        })
+
+    review_groups.sort(key=lambda g: -(g["count"] + sum(a["count"] for a in g["aliases"])))
+    return {
+        "threshold": threshold,
+        "vocabulary_size": len(names),
+        "merged_away": len(aliases),
+        "groups": review_groups,
+        # готовый маппинг alias -> canonical; после ревью — в data/competency_aliases.json
+        "aliases": aliases,
+    }
+
+
+def vocabulary_from_files(paths: Iterable[str]) -> Counter:
+    counts: Counter = Counter()
+    for path in paths:
+        for item in iter_records(path):
+            for c in item.get("competencies") or []:
+                if isinstance(c, str) and c.strip() and c.strip() != "-":
+                    counts[c.strip()] += 1
+    return counts
+
+
+def build_alias_review(
+    inputs: Iterable[str],
+    output: str = REVIEW_PATH,
+    threshold: float = DEFAULT_THRESHOLD,
+):
+    counts = vocabulary_from_files(inputs)
+    result = resolve_synonyms(counts, threshold)
+
+    write_json(output, result)
+
+    print(
+        f"[INFO] Синонимы: словарь {result['vocabulary_size']}, групп {len(result['groups'])}, "
+        f"сливается {result['merged_away']} строк. Файл на ревью: {output}"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    build_alias_review([
+        "data/derived/industry_competencies_llm_clean_updated.json",
+        "data/derived/project_competencies_llm_clean_updated.json",
+    ])
@@ -11,6 +11,10 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 RAW_DIR = os.path.join(DATA_DIR, "raw")
 PROCESSED_DIR = os.path.join(DATA_DIR, "processed")
 
+# локальный манифест моделей: repo_id -> путь к снапшоту, чтобы не ходить в сеть на старте
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+MODEL_MANIFEST_PATH = os.getenv("MODEL_MANIFEST_PATH", os.path.join(MODELS_DIR, "manifest.json"))
+
 INDUSTRY_KEYWORDS_PATH = os.path.join(
     BASE_DIR, "src", "data", "industry_keywords.json"
 )
@@ -0,0 +1,267 @@
+# src/demand_timeseries.py
+"""
+Спрос на компетенции во времени: куб (период, индустрия, компетенция) -> число вакансий.
+
+Сырые выгрузки уже датированы (hh_YYYY-MM-DD.ndjson, sj_YYYY-MM-DD.ndjson),
+а матрица схлопывает всё в один счётчик. Здесь каждая выгрузка относится
+к периоду (неделя ISO по умолчанию), вакансии выгрузки сопоставляются с
+разметкой LLM (industry_competencies_llm.json) по vacancy_id ("sj:123") и
+добавляются в куб. Вакансия, висящая несколько недель, считается в каждом
+периоде, где её видели, но внутри периода — один раз.
+
+Куб хранится в data/derived/demand_cube.json вместе со списком уже учтённых
+выгрузок: update_cube обрабатывает только новые файлы. Вакансии, которые
+ещё не размечены LLM, откладываются и добираются при следующем обновлении.
+Запросы по окнам (рост за N недель, топ растущих) читают только куб.
+"""
+import glob
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from build_competency_matrix import normalize_competencies
+from record_io import iter_records, load_json, write_json
+
+# как и остальные пути этапов — относительно src/ (там лежат data/raw и data/derived)
+RAW_DIR = "data/raw"
+CUBE_PATH = "data/derived/demand_cube.json"
+LABELS_PATH = "data/derived/industry_competencies_llm.json"
+
+GRANULARITIES = ("day", "week", "month")
+SNAPSHOT_RE = re.compile(r"^(hh|sj)_(\d{4}-\d{2}-\d{2})\.ndjson$")
+
+
+# ---------- периоды ----------
+
+def period_key(d: date, granularity: str = "week") -> str:
+    if granularity == "day":
+        return d.isoformat()
+    if granularity == "week":
+        year, week, _ = d.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return f"{d.year}-{d.month:02d}"
+    raise ValueError(f"Неизвестная гранулярность {granularity!r} (ожидается {', '.join(GRANULARITIES)})")
+
+
+def shift_period(key: str, n: int, granularity: str = "week") -> str:
+    """Период на n шагов позже (n < 0 — раньше)."""
+    if granularity == "day":
+        return (date.fromisoformat(key) + timedelta(days=n)).isoformat()
+    if granularity == "week":
+        year, week = key.split("-W")
+        return period_key(date.fromisocalendar(int(year), int(week), 1) + timedelta(weeks=n), "week")
+    if granularity == "month":
+        year, month = map(int, key.split("-"))
+        total = year * 12 + (month - 1) + n
+        return f"{total // 12}-{total % 12 + 1:02d}"
+    raise ValueError(f"Неизвестная гранулярность {granularity!r}")
+
+
+def snapshot_files(raw_dir: str = RAW_DIR) -> List[Tuple[str, str, date]]:
+    """[(путь, источник, дата выгрузки)] по возрастанию даты."""
+    found = []
+    for path in glob.glob(os.path.join(raw_dir, "*.ndjson")):
+        m = SNAPSHOT_RE.match(os.path.basename(path))
+        if m:
+            found.append((path, m.group(1), date.fromisoformat(m.group(2))))
+    return sorted(found, key=lambda item: (item[2], item[0]))
+
+
+def load_labels(path: str = LABELS_PATH) -> Dict[str, dict]:
+    """vacancy_id -> {"industry", "competencies"} из разметки analyze_vacancies."""
+    return {item["vacancy_id"]: item for item in iter_records(path) if item.get("vacancy_id")}
+
+
+def _snapshot_ids(path: str, source: str) -> Iterable[str]:
+    for item in iter_records(path):
+        if item.get("id") is not None:
+            # тот же формат id, что у normalize_hh / normalize_sj
+            yield f"{source}:{item['id']}"
+
+
+# ---------- куб ----------
+
+class DemandCube:
+    def __init__(self, granularity: str = "week"):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Неизвестная гранулярность {granularity!r}")
+        self.granularity = granularity
+        # period -> industry -> competency -> число вакансий
+        self.counts: Dict[str, Dict[str, Counter]] = defaultdict(lambda: defaultdict(Counter))
+        # period -> число учтённых вакансий (знаменатель для долей)
+        self.vacancies: Counter = Counter()
+        # period -> id вакансий, уже учтённых в периоде
+        self.seen: Dict[str, set] = defaultdict(set)
+        # period -> id вакансий, ещё не размеченных LLM
+        self.pending: Dict[str, set] = defaultdict(set)
+        self.snapshots: List[str] = []
+
+    # ---------- обновление ----------
+
+    def _add_vacancy(self, period: str, vacancy_id: str, label: dict):
+        self.seen[period].add(vacancy_id)
+        self.vacancies[period] += 1
+        industry = label.get("industry") or "Unknown"
+        # как в build_demand_by_industry: каждая компетенция записи +1
+        for comp in normalize_competencies(label.get("competencies")):
+            self.counts[period][industry][comp] += 1
+
+    def ingest_snapshot(self, path: str, source: str, snapshot_date: date, labels: Dict[str, dict]) -> Dict[str, int]:
+        period = period_key(snapshot_date, self.granularity)
+        added = pending = 0
+        for vacancy_id in _snapshot_ids(path, source):
+            if vacancy_id in self.seen[period]:
+                continue
+            label = labels.get(vacancy_id)
+            if label is None:
+                self.pending[period].add(vacancy_id)
+                pending += 1
+                continue
+            self.pending[period].discard(vacancy_id)
+            self._add_vacancy(period, vacancy_id, label)
+            added += 1
+        self.snapshots.append(os.path.basename(path))
+        return {"period": period, "added": added, "pending": pending}
+
+    def resolve_pending(self, labels: Dict[str, dict]) -> int:
+        """Добирает отложенные вакансии, для которых появилась разметка."""
+        resolved = 0
+        for period, ids in self.pending.items():
+            for vacancy_id in [v for v in ids if v in labels]:
+                ids.discard(vacancy_id)
+                if vacancy_id not in self.seen[period]:
+                    self._add_vacancy(period, vacancy_id, labels[vacancy_id])
+                    resolved += 1
+        return resolved
+
+    # ---------- запросы ----------
+
+    def periods(self) -> List[str]:
+        return sorted(self.counts)
+
+    def window(self, end: str, size: int, industry: Optional[str] = None) -> Counter:
+        """Сумма по size периодам, заканчивая end (календарно, пустые периоды — нули)."""
+        total: Counter = Counter()
+        for n in range(size):
+            per_industry = self.counts.get(shift_period(end, -n, self.granularity))
+            if not per_industry:
+                continue
+            for ind, counter in per_industry.items():
+                if industry is None or ind == industry:
+                    for comp, cnt in counter.items():
+                        total[(ind, comp)] += cnt
+        return total
+
+    def growth(self, window: int = 4, end: Optional[str] = None, industry: Optional[str] = None) -> List[dict]:
+        """
+        Последние window периодов против предыдущих window периодов
+        по каждой паре (индустрия, компетенция).
+        """
+        periods = self.periods()
+        if not periods:
+            return []
+        end = end or periods[-1]
+        current = self.window(end, window, industry)
+        previous = self.window(shift_period(end, -window, self.granularity), window, industry)
+
+        rows = []
+        for key in set(current) | set(previous):
+            cur, prev = current.get(key, 0), previous.get(key, 0)
+            rows.append({
+                "industry": key[0],
+                "competency": key[1],
+                "current": cur,
+                "previous": prev,
+                "delta": cur - prev,
+                # None — компетенции не было в предыдущем окне
+                "growth": round((cur - prev) / prev, 4) if prev else None,
+            })
+        return rows
+
+    def top_risers(
+        self,
+        window: int = 4,
+        top_n: int = 20,
+        min_count: int = 2,
+        end: Optional[str] = None,
+        industry: Optional[str] = None,
+    ) -> List[dict]:
+        """Пары с наибольшим приростом; min_count отсекает шум из единичных вакансий."""
+        rows = [r for r in self.growth(window, end, industry) if r["delta"] > 0 and r["current"] >= min_count]
+        rows.sort(key=lambda r: (-r["delta"], r["industry"], r["competency"]))
+        return rows[:top_n]
+
+    # ---------- диск ----------
+
+    def to_json(self) -> dict:
+        return {
+            "granularity": self.granularity,
+            "snapshots": self.snapshots,
+            "vacancies": dict(self.vacancies),
+            "counts": {p: {ind: dict(c) for ind, c in inds.items()} for p, inds in self.counts.items()},
+            "seen": {p: sorted(ids) for p, ids in self.seen.items() if ids},
+            "pending": {p: sorted(ids) for p, ids in self.pending.items() if ids},
+        }
+
+    def save(self, path: str = CUBE_PATH):
+        write_json(path, self.to_json(), compact=True)
+
+    @classmethod
+    def load(cls, path: str = CUBE_PATH, granularity: str = "week") -> "DemandCube":
+        if not os.path.exists(path):
+            return cls(granularity)
+        data = load_json(path) or {}
+        cube = cls(data.get("granularity", granularity))
+        cube.snapshots = list(data.get("snapshots", []))
+        cube.vacancies.update(data.get("vacancies", {}))
+        for p, inds in data.get("counts", {}).items():
+            for ind, comps in inds.items():
+                cube.counts[p][ind].update(comps)
+        for p, ids in data.get("seen", {}).items():
+            cube.seen[p].update(ids)
+        for p, ids in data.get("pending", {}).items():
+            cube.pending[p].update(ids)
+        return cube
+
+
+def update_cube(
+    raw_dir: str = RAW_DIR,
+    labels_path: str = LABELS_PATH,
+    cube_path: str = CUBE_PATH,
+    granularity: str = "week",
+) -> DemandCube:
+    """Добавляет в куб выгрузки, которых в нём ещё нет, и добирает отложенные вакансии."""
+    cube = DemandCube.load(cube_path, granularity)
+    if cube.granularity != granularity:
+        raise ValueError(
+            f"{cube_path} собран с гранулярностью {cube.granularity!r}; "
+            f"для {granularity!r} нужен отдельный файл куба"
+        )
+    labels = load_labels(labels_path)
+
+    resolved = cube.resolve_pending(labels)
+    if resolved:
+        print(f"[INFO] Куб спроса: добрано {resolved} ранее неразмеченных вакансий")
+
+    known = set(cube.snapshots)
+    for path, source, snapshot_date in snapshot_files(raw_dir):
+        if os.path.basename(path) in known:
+            continue
+        info = cube.ingest_snapshot(path, source, snapshot_date, labels)
+        print(
+            f"[INFO] Куб спроса: {os.path.basename(path)} -> {info['period']}, "
+            f"+{info['added']} вакансий, без разметки {info['pending']}"
+        )
+
+    cube.save(cube_path)
+    print(f"[INFO] Demand cube saved to: {cube_path} ({len(cube.periods())} периодов)")
+    return cube
+
+
+if __name__ == "__main__":
+    cube = update_cube()
+    for row in cube.top_risers(window=4, top_n=20):
+        print(f"{row['industry']:<25} {row['competency']:<40} {row['previous']:>4} -> {row['current']:<4} (+{row['delta']})")
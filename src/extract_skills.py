@@ -6,7 +6,8 @@ from typing import List, Dict
 
 # --- исправленный путь ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-MODEL_PATH = os.path.join(BASE_DIR, "models", "skill_patterns.json")
+# SKILL_PATTERNS_PATH — другой файл шаблонов (бенчмарки подставляют синтетический)
+MODEL_PATH = os.getenv("SKILL_PATTERNS_PATH") or os.path.join(BASE_DIR, "models", "skill_patterns.json")
 
 with open(MODEL_PATH, "r", encoding="utf-8") as f:
     PATTERNS = json.load(f)
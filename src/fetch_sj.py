@@ -4,7 +4,7 @@ import time
 import json
 import requests
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, Dict, List, Optional
 
 from config import RAW_DIR, SJ_API_KEY, load_industry_keywords
 
@@ -15,17 +15,24 @@ HEADERS = {
     "User-Agent": "RH-AI-Memory-Agent/1.0",
 }
 
-def _ensure_key():
-    if not SJ_API_KEY:
+# progress(сделано, всего, сообщение) — для фоновых задач веба; может бросить исключение, чтобы прервать сбор
+ProgressCallback = Callable[[int, int, str], None]
+
+def _ensure_key(api_key: Optional[str] = None):
+    if not (api_key or SJ_API_KEY):
         raise RuntimeError("Не установлена переменная окружения SJ_API_KEY")
 
-def fetch_sj_vacancies(keyword: str, pages: int = 5) -> List[Dict]:
-    _ensure_key()
+def _headers(api_key: Optional[str] = None) -> Dict[str, str]:
+    # ключ из сессии веба важнее ключа из окружения
+    return {**HEADERS, "X-Api-App-Id": api_key} if api_key else HEADERS
+
+def fetch_sj_vacancies(keyword: str, pages: int = 5, api_key: Optional[str] = None) -> List[Dict]:
+    _ensure_key(api_key)
     all_items = []
     page = 0
     while page < pages:
         params = {"keyword": keyword, "page": page, "count": 100}
-        resp = requests.get(f"{SJ_BASE_URL}/vacancies/", params=params, headers=HEADERS, timeout=20)
+        resp = requests.get(f"{SJ_BASE_URL}/vacancies/", params=params, headers=_headers(api_key), timeout=20)
         if resp.status_code == 429:
             print("[RATE] SJ 429 Too Many Requests — пауза 2 сек")
             time.sleep(2)
@@ -41,14 +48,16 @@ def fetch_sj_vacancies(keyword: str, pages: int = 5) -> List[Dict]:
         time.sleep(0.5)
     return all_items
 
-def collect_sj_batch(pages: int = 5):
-    _ensure_key()
+def collect_sj_batch(pages: int = 5, api_key: Optional[str] = None, progress: Optional[ProgressCallback] = None):
+    _ensure_key(api_key)
     os.makedirs(RAW_DIR, exist_ok=True)
     date_tag = datetime.utcnow().strftime("%Y-%m-%d")
     ndjson_path = os.path.join(RAW_DIR, f"sj_{date_tag}.ndjson")
 
     industries = load_industry_keywords()
     total_written = 0
+    total_keywords = sum(len(ind["keywords"]) for ind in industries)
+    keywords_done = 0
 
     with open(ndjson_path, "a", encoding="utf-8") as out:
         for ind in industries:
@@ -61,7 +70,9 @@ def collect_sj_batch(pages: int = 5):
             print(f"\n[INDUSTRY] {industry_name} — {len(keywords)} keywords")
 
             for kw in keywords:
-                items = fetch_sj_vacancies(kw, pages=pages)
+                if progress is not None:
+                    progress(keywords_done, total_keywords, f"{industry_name} / {kw}: записано {total_written}")
+                items = fetch_sj_vacancies(kw, pages=pages, api_key=api_key)
                 print(f"[SJ] {industry_name} / '{kw}' → {len(items)} вакансий (до фильтрации дублей)")
 
                 for idx, it in enumerate(items, start=1):
@@ -84,9 +95,12 @@ def collect_sj_batch(pages: int = 5):
                     out.write(json.dumps(it, ensure_ascii=False) + "\n")
                     total_written += 1
                     time.sleep(0.2)
+                keywords_done += 1
 
             print(f"[INDUSTRY] {industry_name} — уникальных вакансий: {len(seen_ids)}")
 
+    if progress is not None:
+        progress(total_keywords, total_keywords, f"записано {total_written}")
     print(f"\n[OK][SJ] Сохранено {total_written} уникальных вакансий (по всем индустриям) в {ndjson_path}")
     return ndjson_path
 
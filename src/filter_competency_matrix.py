@@ -1,16 +1,23 @@
 # src/filter_competency_matrix.py
 import json
+from collections import Counter
 from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator
+
+from build_competency_matrix import competency_status
+from competency_canon import canonicalize
+from record_io import iter_records, write_records
 
 MATRIX_INPUT_PATH = Path("data/derived/competency_matrix.json")
 MATRIX_OUTPUT_PATH = Path("data/derived/competency_matrix_filtered.json")
 WHITELIST_PATH = Path("data/whitelist_competencies.json")
 
 
-def load_whitelist() -> set:
-    if not WHITELIST_PATH.exists():
-        raise FileNotFoundError(f"Не найден файл whitelist: {WHITELIST_PATH}")
-    content = WHITELIST_PATH.read_text(encoding="utf-8").strip()
+def load_whitelist(path: Path = WHITELIST_PATH) -> set:
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Не найден файл whitelist: {path}")
+    content = path.read_text(encoding="utf-8").strip()
     if not content:
         return set()
     data = json.loads(content)
@@ -19,6 +26,76 @@ def load_whitelist() -> set:
     return {str(x).strip() for x in data if isinstance(x, str) and x.strip()}
 
 
+def whitelist_matcher(whitelist: Iterable[str]) -> Callable[[str], bool]:
+    """
+    Проверка "компетенция в белом списке" с учётом алиасов: и белый список,
+    и компетенции приводятся через competency_canon ("postgres" == "PostgreSQL").
+    Ответ по каждой строке запоминается — в матрице строки повторяются по индустриям.
+    """
+    allowed = {canonicalize(w) for w in whitelist} - {""}
+    cache: Dict[str, bool] = {}
+
+    def match(comp: str) -> bool:
+        hit = cache.get(comp)
+        if hit is None:
+            hit = cache[comp] = comp in allowed or canonicalize(comp) in allowed
+        return hit
+
+    return match
+
+
+def filter_rows(rows: Iterable[dict], match: Callable[[str], bool]) -> Iterator[dict]:
+    """
+    Строки матрицы из белого списка, компетенция — в каноническом написании.
+    Алиасы одной компетенции в индустрии ("JS" и "JavaScript") сливаются в одну
+    строку: demand и supply суммируются, статус пересчитывается. Строки индустрии
+    в матрице идут подряд, поэтому в памяти держится только текущая индустрия.
+    """
+    industry = None
+    merged: Dict[str, dict] = {}
+    for row in rows:
+        comp = row.get("competency")
+        if not (isinstance(comp, str) and match(comp)):
+            continue
+        if row.get("industry") != industry:
+            yield from _sorted_rows(merged)
+            industry, merged = row.get("industry"), {}
+
+        canon = canonicalize(comp)
+        prev = merged.get(canon)
+        if prev is None:
+            # строка уже в канонической форме — отдаём её же, без копии
+            merged[canon] = row if comp == canon else {**row, "competency": canon}
+        else:
+            d = prev.get("demand", 0) + row.get("demand", 0)
+            s = prev.get("supply", 0) + row.get("supply", 0)
+            merged[canon] = {**prev, "demand": d, "supply": s, "status": competency_status(d, s)}
+    yield from _sorted_rows(merged)
+
+
+def filter_counters(counters: Dict[str, Counter], match: Callable[[str], bool]) -> Dict[str, Counter]:
+    """
+    То же, что filter_rows, но до построения строк: в счётчиках индустрий остаются
+    только компетенции из белого списка под каноническим именем (алиасы суммируются).
+    classify_matrix по таким счётчикам даёт ровно отфильтрованную матрицу.
+    """
+    result: Dict[str, Counter] = {}
+    for industry, counter in counters.items():
+        kept: Counter = Counter()
+        for comp, n in counter.items():
+            if isinstance(comp, str) and match(comp):
+                kept[canonicalize(comp)] += n
+        if kept:
+            result[industry] = kept
+    return result
+
+
+def _sorted_rows(merged: Dict[str, dict]) -> Iterator[dict]:
+    # порядок как в матрице: по компетенции внутри индустрии
+    for canon in sorted(merged):
+        yield merged[canon]
+
+
 def main():
     if not MATRIX_INPUT_PATH.exists():
         raise FileNotFoundError(f"Не найден входной файл матрицы: {MATRIX_INPUT_PATH}")
@@ -26,24 +103,19 @@ def main():
     whitelist = load_whitelist()
     print(f"[INFO] Загружено {len(whitelist)} компетенций из whitelist")
 
-    matrix = json.loads(MATRIX_INPUT_PATH.read_text(encoding="utf-8"))
+    # потоковый режим для уже построенной матрицы; при полном прогоне фильтр
+    # применяется прямо в build_matrices(whitelist_path=...)
+    total = 0
 
-    filtered = []
-    for row in matrix:
-        comp = row.get("competency")
-        if not isinstance(comp, str):
-            continue
-        if comp not in whitelist:
-            continue
-        filtered.append(row)
+    def counted():
+        nonlocal total
+        for row in iter_records(str(MATRIX_INPUT_PATH)):
+            total += 1
+            yield row
 
-    MATRIX_OUTPUT_PATH.write_text(
-        json.dumps(filtered, ensure_ascii=False, indent=2),
-        encoding="utf-8"
-    )
+    kept = write_records(str(MATRIX_OUTPUT_PATH), filter_rows(counted(), whitelist_matcher(whitelist)))
     print(f"[OK] Отфильтрованная матрица сохранена в {MATRIX_OUTPUT_PATH}")
-    print(f"Всего записей до: {len(matrix)}, после фильтра: {len(filtered)}")
-
+    print(f"Всего записей до: {total}, после фильтра: {kept}")
 
 if __name__ == "__main__":
     main()
@@ -1,49 +1,33 @@
+import hashlib
 import json
-from collections import Counter, defaultdict
-import matplotlib.pyplot as plt
+from collections import Counter
+from datetime import datetime
 import os
 
-from llm_client import get_llama
-from llm_prompts import RECOMMENDATIONS_PROMPT
-
-
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def extract_competency_name(c):
-    if isinstance(c, str):
-        c = c.strip()
-        return c if c and c != "-" else None
-    if isinstance(c, dict):
-        name = c.get("name")
-        if isinstance(name, str) and name.strip():
-            return name.strip()
-    return None
-
+from typing import Dict, Iterable, List, Optional, Union
 
-def jitter_points(xs, ys, x_amount=0.25, y_amount=0.08):
-    from collections import defaultdict
-    import math
-
-    grouped = defaultdict(list)
-    for idx, (x, y) in enumerate(zip(xs, ys)):
-        grouped[(x, y)].append(idx)
-
-    xs2 = xs[:]
-    ys2 = ys[:]
-
-    for (x, y), indices in grouped.items():
-        if len(indices) <= 1:
-            continue
-        n = len(indices)
-        for k, idx in enumerate(indices):
-            angle = 2 * math.pi * k / n
-            xs2[idx] = x + x_amount * math.cos(angle)
-            ys2[idx] = y + y_amount * math.sin(angle)
-
-    return xs2, ys2
+from competency_aggregates import CorpusAggregates, aggregate_inputs, extract_competency_name  # noqa: F401
+from llm_prompts import RECOMMENDATIONS_PROMPT
+from plot_jobs import (  # noqa: F401
+    MATCH_SCATTER_DENSE_THRESHOLD,
+    MATCH_SCATTER_TOP_LABELS,
+    PlotJob,
+    industry_slug,
+    jitter_points,
+    render_jobs,
+)
+from record_io import iter_records, load_json, write_json
+
+
+def gaps_by_industry(gaps_info) -> Dict[str, list]:
+    """industry -> gaps из competency_gaps_and_redundancy.json (список сводок или dict)."""
+    if isinstance(gaps_info, dict):
+        return {industry: (entry or {}).get("gaps", []) for industry, entry in gaps_info.items()}
+    lookup: Dict[str, list] = {}
+    for entry in gaps_info or []:
+        # при повторах берём первую запись, как прежний линейный поиск
+        lookup.setdefault(entry.get("industry"), entry.get("gaps", []))
+    return lookup
 
 
 def compute_stats(
@@ -52,95 +36,63 @@ def compute_stats(
     gaps_path: str,
     out_stats_path: str,
     viz_dir: str = "data/derived/plots",
+    aggregates: Optional[CorpusAggregates] = None,
+    gaps_info=None,
+    per_industry_plots: bool = False,
+    matrix_filtered_path: str = "data/derived/competency_matrix_filtered.json",
 ):
-    os.makedirs(viz_dir, exist_ok=True)
-
-    ind_comp = load_json(industry_comp_path)
-    proj_comp = load_json(project_comp_path)
-    gaps_info = load_json(gaps_path)
-
-    industry_counts = defaultdict(Counter)
-    project_counts = defaultdict(Counter)
-
-    global_industry_counter = Counter()
-    global_project_counter = Counter()
-
-    for item in ind_comp:
-        industry = item.get("industry") or "Unknown"
-        for c in item.get("competencies", []):
-            name = extract_competency_name(c)
-            if name:
-                industry_counts[industry][name] += 1
-                global_industry_counter[name] += 1
-
-    for item in proj_comp:
-        industry = item.get("industry") or "Unknown"
-        for c in item.get("competencies", []):
-            name = extract_competency_name(c)
-            if name:
-                project_counts[industry][name] += 1
-                global_project_counter[name] += 1
+    """
+    aggregates — счётчики competency_aggregates.aggregate_inputs (общие с build_matrices),
+    gaps_info — сводки по индустриям, которые вернул build_matrices.
+    Без них входные файлы и gaps_path читаются здесь.
+    per_industry_plots — дополнительно viz_dir/industries/<индустрия>.png (plot_jobs).
+    matrix_filtered_path — отфильтрованная матрица для графика MATCH.
+    """
+    if aggregates is None:
+        aggregates = aggregate_inputs(industry_comp_path, project_comp_path)
+    if gaps_info is None:
+        gaps_info = load_json(gaps_path)
+
+    industry_counts = aggregates.industry_counts
+    project_counts = aggregates.project_counts
+    global_industry_counter = aggregates.global_industry
+    global_project_counter = aggregates.global_project
+    gaps_lookup = gaps_by_industry(gaps_info)
 
     stats = {}
-    all_industries = set(industry_counts.keys()) | set(project_counts.keys())
+    all_industries = sorted(set(industry_counts.keys()) | set(project_counts.keys()))
 
     for industry in all_industries:
         ind_counter = industry_counts.get(industry, Counter())
         proj_counter = project_counts.get(industry, Counter())
 
-        top_ind = ind_counter.most_common(20)
-        top_proj = proj_counter.most_common(20)
-
-        industry_gaps = []
-        if isinstance(gaps_info, list):
-            for entry in gaps_info:
-                if entry.get("industry") == industry:
-                    industry_gaps = entry.get("gaps", [])
-                    break
-        elif isinstance(gaps_info, dict):
-            industry_gaps = gaps_info.get(industry, {}).get("gaps", [])
-
         stats[industry] = {
-            "top_industry_competencies": top_ind,
-            "top_project_competencies": top_proj,
-            "gaps": industry_gaps,
+            "top_industry_competencies": ind_counter.most_common(20),
+            "top_project_competencies": proj_counter.most_common(20),
+            "gaps": gaps_lookup.get(industry, []),
         }
 
-    with open(out_stats_path, "w", encoding="utf-8") as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
+    write_json(out_stats_path, stats)
 
-    # --- графики без изменений ---
+    # --- графики: задания рисуются параллельно, неизменившиеся пропускаются ---
+    jobs = []
     if global_project_counter:
-        top_proj_global = global_project_counter.most_common(30)
-        skills, counts = zip(*top_proj_global)
-        plt.figure(figsize=(12, 6))
-        plt.barh(skills, counts)
-        plt.gca().invert_yaxis()
-        plt.title("Топ компетенций в учебных проектах (общий по всем индустриям)")
-        plt.xlabel("Количество упоминаний в проектах")
-        plt.tight_layout()
-        plt.savefig(os.path.join(viz_dir, "global_projects_top.png"))
-        plt.close()
+        jobs.append(PlotJob("global_projects_top.png", "top_bar", {
+            "items": global_project_counter.most_common(30),
+            "title": "Топ компетенций в учебных проектах (общий по всем индустриям)",
+            "xlabel": "Количество упоминаний в проектах",
+        }))
 
     if global_industry_counter:
-        top_ind_global = global_industry_counter.most_common(30)
-
-        skills, counts = zip(*top_ind_global)
-        plt.figure(figsize=(12, 6))
-        plt.barh(skills, counts)
-        plt.gca().invert_yaxis()
-        plt.title("Топ компетенций в вакансиях (общий по всем индустриям)")
-        plt.xlabel("Количество упоминаний в вакансиях")
-        plt.tight_layout()
-        plt.savefig(os.path.join(viz_dir, "global_industry_top.png"))
-        plt.close()
-
-    matrix_path_filtered = "data/derived/competency_matrix_filtered.json"
-    if os.path.exists(matrix_path_filtered):
-        matrix = load_json(matrix_path_filtered)
+        jobs.append(PlotJob("global_industry_top.png", "top_bar", {
+            "items": global_industry_counter.most_common(30),
+            "title": "Топ компетенций в вакансиях (общий по всем индустриям)",
+            "xlabel": "Количество упоминаний в вакансиях",
+        }))
 
+    if os.path.exists(matrix_filtered_path):
         xs, ys, labels = [], [], []
-        for row in matrix:
+        for row in iter_records(matrix_filtered_path):
             if row.get("status") != "match":
                 continue
             comp = row.get("competency")
@@ -155,31 +107,84 @@ def compute_stats(
             labels.append(comp)
 
         if xs and ys:
-            plt.figure(figsize=(14, 12))
-            xs_jit, ys_jit = jitter_points(xs, ys, x_amount=0.5, y_amount=0.4)
-            plt.scatter(xs_jit, ys_jit, alpha=0.7)
-            for label, sx, sy in zip(labels, xs_jit, ys_jit):
-                plt.annotate(label, (sx, sy), textcoords="offset points", xytext=(3, 3),
-                             fontsize=14, alpha=0.85)
-            plt.xlabel("Сколько раз встречается в проектах (supply)", fontsize=30)
-            plt.ylabel("Сколько раз встречается в вакансиях (demand)", fontsize=30)
-            plt.title("Компетенции со статусом MATCH (есть в обоих случаях)", fontsize=30, pad=20)
-            plt.grid(True, linestyle="--", alpha=0.3)
-            plt.tight_layout()
-            plt.savefig(os.path.join(viz_dir, "demand_vs_supply_matches.png"))
-            plt.close()
+            jobs.append(PlotJob("demand_vs_supply_matches.png", "match_scatter", {
+                "xs": xs,
+                "ys": ys,
+                "labels": labels,
+                # режим отрисовки входит в хэш задания: смена порога перерисует картинку
+                "dense_threshold": MATCH_SCATTER_DENSE_THRESHOLD,
+                "top_labels": MATCH_SCATTER_TOP_LABELS,
+            }))
+
+    if per_industry_plots:
+        for industry, entry in stats.items():
+            jobs.append(PlotJob(f"industries/{industry_slug(industry)}.png", "industry_overview", {
+                "industry": industry,
+                "vacancies": entry["top_industry_competencies"],
+                "projects": entry["top_project_competencies"],
+                "gaps": len(entry["gaps"]),
+            }))
+
+    render_jobs(jobs, viz_dir)
 
     return stats
 
 
+RECO_GEN_PARAMS = {"max_new_tokens": 256, "temperature": 0.4, "top_p": 0.9}
+
+
+def recommendation_fingerprint(industry, top_ind, top_proj, gaps, redundancy) -> str:
+    """
+    Хэш всего, от чего зависит ответ модели по индустрии:
+    входные данные промпта, сам шаблон и параметры генерации.
+    Кортежи из Counter.most_common и списки из stats.json дают одинаковый хэш.
+    """
+    payload = {
+        "industry": industry,
+        "industry_stats": top_ind,
+        "project_stats": top_proj,
+        "gaps": gaps,
+        "redundancy": redundancy,
+        "template": RECOMMENDATIONS_PROMPT,
+        "params": RECO_GEN_PARAMS,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
 def generate_recommendations(
     stats: dict,
     gaps_path: str,
     out_reco_path: str,
     log_path: str = "data/derived/reco_log.txt",
+    cache_path: Optional[str] = "data/derived/recommendations_cache.json",
+    force_refresh: Union[bool, Iterable[str]] = False,
+    gaps_info=None,
 ):
-    llama = get_llama()
-    gaps_info = load_json(gaps_path)
+    """
+    Рекомендации по индустриям. Ответ модели кэшируется в cache_path
+    вместе с отпечатком входных данных: индустрии, у которых топы, дефициты
+    и избыточности не менялись, берутся из кэша без обращения к модели.
+
+    force_refresh=True — перегенерировать всё, список индустрий — только их.
+    gaps_info — уже загруженные сводки (build_matrices), иначе читаются из gaps_path.
+    """
+    if gaps_info is None:
+        gaps_info = load_json(gaps_path)
+
+    cache: dict = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            # пустой файл — None; оборванная запись — ошибка разбора: в обоих случаях кэша нет
+            cache = load_json(cache_path) or {}
+        except ValueError as e:
+            print(f"[WARN] Кэш рекомендаций {cache_path} повреждён ({e}) — генерируем заново")
+        if not isinstance(cache, dict):
+            cache = {}
+    if force_refresh is True:
+        refresh = None  # все индустрии
+    else:
+        refresh = set(force_refresh or [])
 
     os.makedirs(os.path.dirname(log_path), exist_ok=True)
     log_f = open(log_path, "w", encoding="utf-8")
@@ -191,10 +196,11 @@ def generate_recommendations(
         entries = gaps_info
     else:
         entries = [{"industry": k, **v} for k, v in gaps_info.items()]
-    from typing import List
     prompts: List[str] = []
     industries: List[str] = []
+    fingerprints: List[str] = []
     ready_text: dict = {}
+    reused = 0
 
     for entry in entries:
         industry = entry["industry"]
@@ -213,13 +219,23 @@ def generate_recommendations(
             continue
 
         cleaned_gaps = [g for g in gaps if g.get("competency") != industry]
+        redundancy = entry.get("redundancies", [])
+
+        fingerprint = recommendation_fingerprint(industry, top_ind, top_proj, cleaned_gaps, redundancy)
+        cached = cache.get(industry)
+        forced = refresh is None or industry in refresh
+        if cached and cached.get("fingerprint") == fingerprint and not forced:
+            log(f"=== INDUSTRY: {industry} === (из кэша, входные данные не менялись)")
+            ready_text[industry] = cached["text"]
+            reused += 1
+            continue
 
         prompt = RECOMMENDATIONS_PROMPT.format(
             industry=industry,
             industry_stats=top_ind,
             project_stats=top_proj,
             gaps=cleaned_gaps,
-            redundancy=entry.get("redundancies", []),
+            redundancy=redundancy,
         )
 
         log(f"=== INDUSTRY: {industry} ===")
@@ -227,24 +243,37 @@ def generate_recommendations(
 
         industries.append(industry)
         prompts.append(prompt)
+        fingerprints.append(fingerprint)
+
+    print(f"[INFO] Рекомендации: {reused} индустрий из кэша, {len(prompts)} на генерацию")
 
     if prompts:
+        # модель поднимаем, только если есть что генерировать
+        from llm_client import get_llama
+
+        llama = get_llama()
         raw_answers = llama.generate(
             prompts,
-            max_new_tokens=256,
-            temperature=0.4,
-            top_p=0.9,
             use_tqdm=True,
+            stage="recommendations",
+            **RECO_GEN_PARAMS,
         )
 
-        for industry, raw in zip(industries, raw_answers):
+        generated_at = datetime.now().isoformat()
+        for industry, fingerprint, raw in zip(industries, fingerprints, raw_answers):
             log(f"LLM RESPONSE ({industry}):\n{raw}\n")
-            ready_text[industry] = raw.strip() or "Модель не вернула ответа."
+            text = raw.strip() or "Модель не вернула ответа."
+            ready_text[industry] = text
+            cache[industry] = {"fingerprint": fingerprint, "text": text, "generated_at": generated_at}
 
     log_f.close()
 
-    with open(out_reco_path, "w", encoding="utf-8") as f:
-        json.dump(ready_text, f, ensure_ascii=False, indent=2)
+    write_json(out_reco_path, ready_text)
+
+    if cache_path and prompts:
+        write_json(cache_path, cache)
+
+    return ready_text
 
 
 if __name__ == "__main__":
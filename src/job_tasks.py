@@ -0,0 +1,134 @@
+# src/job_tasks.py
+"""
+Фоновые задачи веба: сбор, обработка и анализ (очередь — qloraapp.jobs).
+
+Задача — функция (params, progress) -> JSON-совместимый результат.
+Веб запускает каждую задачу в отдельном процессе (run_task), чтобы долгий
+сбор или LLM-этапы не занимали обработчик запросов. Процесс работает из
+src/ — пути этапов относительные (data/derived/...).
+
+progress(сделано, всего, сообщение) пересылает счётчики веб-процессу и
+бросает JobCancelled, если задачу отменили: задачи проверяют отмену между
+шагами, а не посреди записи файла.
+
+Секреты (ключ SuperJob из сессии) передаются процессу задачи, но не
+сохраняются в таблице задач: см. JobTask.secrets.
+"""
+import os
+import traceback
+from typing import Callable, Dict, Optional, Sequence
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+# SuperJob отдаёт не больше 500 вакансий на запрос (5 страниц по 100)
+SJ_MAX_PAGES = 5
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class JobCancelled(Exception):
+    """Задачу отменили — бросается из progress и завершает задачу без ошибки."""
+
+
+class JobTask:
+    def __init__(
+        self,
+        title: str,
+        func: Callable[[dict, ProgressCallback], object],
+        clean: Optional[Callable[[dict], dict]] = None,
+        secrets: Sequence[str] = (),
+    ):
+        self.title = title
+        self.func = func
+        self.clean = clean or (lambda raw: {})  # проверка параметров из запроса; ValueError — ответ 400
+        self.secrets = tuple(secrets)            # ключи сессии, которые нужны задаче (в базу не пишутся)
+
+
+# ---------- задачи ----------
+
+def _clean_collect_sj(raw: dict) -> dict:
+    try:
+        pages = int(raw.get("pages", 3))
+    except (TypeError, ValueError):
+        raise ValueError("pages должно быть целым числом")
+    if not 1 <= pages <= SJ_MAX_PAGES:
+        raise ValueError(f"pages должно быть от 1 до {SJ_MAX_PAGES}")
+    return {"pages": pages}
+
+
+def task_collect_sj(params: dict, progress: ProgressCallback):
+    from fetch_sj import collect_sj_batch
+
+    path = collect_sj_batch(pages=params["pages"], api_key=params.get("sj_api_key"), progress=progress)
+    return {"file": path}
+
+
+def task_process(params: dict, progress: ProgressCallback):
+    from config import PROCESSED_DIR
+    from main_collect import process_all
+
+    process_all(progress=progress)
+    return {"file": os.path.join(PROCESSED_DIR, "vacancies_processed.json")}
+
+
+def _name_list(raw: dict, key: str, what: str) -> list:
+    names = raw.get(key) or []
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(",") if name.strip()]
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"{key} — список {what} (или all)")
+    return names
+
+
+def _clean_analysis(raw: dict) -> dict:
+    cleaned = {"force": _name_list(raw, "force", "этапов")}
+    refresh = _name_list(raw, "refresh_recommendations", "индустрий")
+    if refresh:
+        cleaned["refresh_recommendations"] = refresh
+    return cleaned
+
+
+def task_analysis(params: dict, progress: ProgressCallback):
+    from run_phase1_analysis import run_phase1
+
+    return {
+        "stages": run_phase1(
+            force=params["force"],
+            progress=progress,
+            refresh_recommendations=params.get("refresh_recommendations", ()),
+        )
+    }
+
+
+TASKS: Dict[str, JobTask] = {
+    "collect_sj": JobTask("Сбор вакансий SuperJob", task_collect_sj, _clean_collect_sj, secrets=["sj_api_key"]),
+    "process": JobTask("Обработка собранных вакансий", task_process),
+    "analysis": JobTask("Анализ: матрица, статистика, отчёт", task_analysis, _clean_analysis),
+}
+
+
+# ---------- процесс задачи ----------
+
+def run_task(kind: str, params: dict, events, cancel_event):
+    """
+    Точка входа процесса задачи (multiprocessing, spawn).
+    events — очередь сообщений веб-процессу: ("progress", сделано, всего, сообщение),
+    в конце одно из ("done", результат), ("cancelled", None), ("failed", traceback).
+    cancel_event — установлен, когда задачу отменили.
+    """
+    if hasattr(os, "setpgrp"):
+        # своя группа процессов: при принудительной отмене веб завершает и пулы этапов
+        os.setpgrp()
+    os.chdir(SRC_DIR)
+
+    def progress(done: int, total: int, message: str = ""):
+        if cancel_event.is_set():
+            raise JobCancelled()
+        events.put(("progress", done, total, message))
+
+    try:
+        events.put(("done", TASKS[kind].func(params, progress)))
+    except JobCancelled:
+        print(f"[WARN] Задача {kind} отменена")
+        events.put(("cancelled", None))
+    except BaseException:
+        events.put(("failed", traceback.format_exc()))
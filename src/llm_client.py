@@ -1,16 +1,116 @@
 from typing import List, Optional, Union
 import gc
+import json
 import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
 
-import torch
-from huggingface_hub import snapshot_download
-
-from vllm import LLM, SamplingParams
-from vllm.lora.request import LoRARequest
+from config import MODEL_MANIFEST_PATH
+from llm_metrics import InferenceMetrics, METRICS_PATH
 
+# torch, vllm и huggingface_hub импортируются только там, где реально нужна модель:
+# импорт этого модуля не должен стоить секунд и требовать CUDA.
 
 MODEL_NAME = "hugging-quants/Meta-Llama-3.1-8B-Instruct-AWQ-INT4"
 
+# "vllm" — настоящая модель на GPU, "stub" — заглушка для CPU (отладка, тесты сервиса)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "vllm")
+
+# порядок подачи промптов в generate: "fifo" (как в файле), "sorted" (по длине),
+# "bucketed" (по корзинам длины) — см. plan_order
+SCHEDULES = ("fifo", "sorted", "bucketed")
+DEFAULT_SCHEDULE = os.getenv("LLM_SCHEDULE", "fifo")
+
+
+def _load_manifest() -> dict:
+    try:
+        with open(MODEL_MANIFEST_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest: dict):
+    os.makedirs(os.path.dirname(MODEL_MANIFEST_PATH), exist_ok=True)
+    tmp_path = MODEL_MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, MODEL_MANIFEST_PATH)
+
+
+def resolve_model_path(repo_id: str = MODEL_NAME) -> str:
+    """
+    Локальный путь к снапшоту модели, по возможности без сети:
+    1) LLM_MODEL_PATH из окружения;
+    2) путь из локального манифеста (models/manifest.json), если он ещё существует;
+    3) кэш HuggingFace (local_files_only=True — без запроса к хабу);
+    4) только если локально ничего нет — скачиваем и записываем в манифест.
+    """
+    env_path = os.getenv("LLM_MODEL_PATH")
+    if env_path:
+        return env_path
+
+    manifest = _load_manifest()
+    entry = manifest.get(repo_id) or {}
+    path = entry.get("path")
+    if path and os.path.isfile(os.path.join(path, "config.json")):
+        return path
+
+    from huggingface_hub import snapshot_download
+
+    try:
+        path = snapshot_download(repo_id=repo_id, local_files_only=True)
+        source = "hf_cache"
+    except Exception:
+        print(f"[LLM] Модели {repo_id} нет локально — скачиваем (snapshot_download)...")
+        path = snapshot_download(repo_id=repo_id)
+        source = "download"
+
+    manifest[repo_id] = {
+        "path": path,
+        "source": source,
+        "resolved_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _save_manifest(manifest)
+    return path
+
+
+def _free_cuda_memory():
+    # если torch так и не импортировали — модели на GPU не было и чистить нечего
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.synchronize()
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+
+
+def plan_order(lengths: List[int], schedule: str = "fifo") -> List[int]:
+    """
+    Порядок, в котором промпты отдаются vLLM. Все промпты уходят одним вызовом
+    llm.generate: планировщик vLLM сам добирает запросы в батч по мере того, как
+    освобождается KV-кэш, поэтому GPU не простаивает на хвосте каждой волны,
+    как при нескольких последовательных вызовах.
+
+    fifo     — исходный порядок (старое поведение);
+    sorted   — от длинных к коротким: планировщик берёт соседние запросы,
+               и в батч попадают промпты похожей длины;
+    bucketed — по корзинам длины (степени двойки), от длинных к коротким,
+               внутри корзины — исходный порядок: батчи почти так же однородны,
+               а соседние в файле промпты остаются рядом.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Неизвестный schedule={schedule!r}, ожидается один из {SCHEDULES}")
+
+    order = list(range(len(lengths)))
+    if schedule == "sorted":
+        order.sort(key=lambda i: lengths[i], reverse=True)
+    elif schedule == "bucketed":
+        order.sort(key=lambda i: -max(lengths[i], 1).bit_length())
+    return order
+
 
 class LlamaClient:
     def __init__(
@@ -20,11 +120,12 @@ class LlamaClient:
         gpu_memory_utilization: float = 0.85,
         max_lora_rank: int = 32,
         enforce_eager: bool = False,
+        metrics_path: Optional[str] = METRICS_PATH,
     ):
-        # Можно не snapshot_download и просто передать MODEL_NAME в vLLM.
-        # Но оставим как в вашем стиле, чтобы путь был локальный.
-        print("[LLM] Проверяем и докачиваем модель (snapshot_download)...")
-        cache_dir = snapshot_download(repo_id=MODEL_NAME)
+        from vllm import LLM
+        from vllm.lora.request import LoRARequest
+
+        cache_dir = resolve_model_path(MODEL_NAME)
         print(f"[LLM] Загружаем модель из {cache_dir}")
 
         self.lora_request: Optional[LoRARequest] = None
@@ -49,8 +150,16 @@ class LlamaClient:
             enforce_eager=enforce_eager,
         )
 
+        self.max_model_len = max_model_len
+        self.metrics = InferenceMetrics(metrics_path)
+        self.last_call_metrics: Optional[dict] = None
+
         print("[LLM] LlamaClient (vLLM, AWQ INT4) готов к работе.")
 
+    def count_tokens(self, prompts: List[str]) -> List[int]:
+        tokenizer = self.llm.get_tokenizer()
+        return [len(ids) for ids in tokenizer(prompts, add_special_tokens=True)["input_ids"]]
+
     def generate(
         self,
         prompts: Union[str, List[str]],
@@ -60,7 +169,11 @@ class LlamaClient:
         temperature: float = 0.0,
         top_p: float = 1.0,
         use_tqdm: bool = False,
+        stage: str = "default",
+        schedule: Optional[str] = None,
     ) -> Union[str, List[str]]:
+        from vllm import SamplingParams
+
         is_single = isinstance(prompts, str)
         prompt_list = [prompts] if is_single else prompts
 
@@ -71,12 +184,36 @@ class LlamaClient:
             top_p=top_p,
         )
 
-        outputs = self.llm.generate(
-            prompt_list,
+        schedule = schedule or DEFAULT_SCHEDULE
+        started = time.perf_counter()
+
+        if schedule == "fifo" or len(prompt_list) < 2:
+            order = list(range(len(prompt_list)))
+        else:
+            order = plan_order(self.count_tokens(prompt_list), schedule)
+
+        # один вызов на весь список; ответы раскладываем обратно по исходным индексам
+        ordered_outputs = self.llm.generate(
+            [prompt_list[i] for i in order],
             sampling_params=sampling_params,
             use_tqdm=use_tqdm,
             lora_request=self.lora_request,
         )
+        outputs = [None] * len(prompt_list)
+        for idx, out in zip(order, ordered_outputs):
+            outputs[idx] = out
+
+        self.last_call_metrics = self.metrics.record_outputs(
+            stage,
+            outputs,
+            started,
+            params={
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "top_p": top_p,
+                "schedule": schedule,
+            },
+        )
 
         texts = [out.outputs[0].text.strip() for out in outputs]
         return texts[0] if is_single else texts
@@ -111,37 +248,129 @@ class LlamaClient:
         if hasattr(self, "llm"):
             del self.llm
         gc.collect()
-        if torch.cuda.is_available():
-            torch.cuda.synchronize()
-            torch.cuda.empty_cache()
-            torch.cuda.ipc_collect()
+        _free_cuda_memory()
+
+
+class StubLlamaClient:
+    """
+    Заглушка с тем же интерфейсом, что и LlamaClient, но без GPU.
+    Возвращает детерминированный JSON-массив из слов промпта —
+    этого достаточно, чтобы гонять пайплайн и сервис на CPU.
+    """
+
+    def __init__(
+        self,
+        adapter_dir: Optional[str] = None,
+        metrics_path: Optional[str] = METRICS_PATH,
+        **kwargs,
+    ):
+        self.adapter_dir = adapter_dir
+        self.metrics = InferenceMetrics(metrics_path)
+        self.last_call_metrics: Optional[dict] = None
+        print("[LLM] StubLlamaClient (CPU-заглушка) готов к работе.")
+
+    def _answer(self, prompt: str, max_new_tokens: int) -> str:
+        # берём слова из описания, а не из инструкции промпта
+        body = prompt.split("Описание:", 1)[-1]
+        words = [w.strip(".,:;\"'()[]{}") for w in body.split()]
+        words = list(dict.fromkeys(w for w in words if len(w) > 3))
+        return json.dumps(words[:max(1, min(7, max_new_tokens))], ensure_ascii=False)
+
+    def generate(
+        self,
+        prompts: Union[str, List[str]],
+        *,
+        max_new_tokens: int = 128,
+        min_new_tokens: int = 2,
+        temperature: float = 0.0,
+        top_p: float = 1.0,
+        use_tqdm: bool = False,
+        stage: str = "default",
+        schedule: Optional[str] = None,
+    ) -> Union[str, List[str]]:
+        is_single = isinstance(prompts, str)
+        prompt_list = [prompts] if is_single else prompts
+
+        # порядок проверяем и на заглушке, чтобы ошибки планирования ловились без GPU
+        schedule = schedule or DEFAULT_SCHEDULE
+        order = plan_order([len(p.split()) for p in prompt_list], schedule)
+
+        started = time.perf_counter()
+        texts: List[str] = [""] * len(prompt_list)
+        for idx in order:
+            texts[idx] = self._answer(prompt_list[idx], max_new_tokens)
+        wall = time.perf_counter() - started
+
+        # токенов у заглушки нет — считаем слова, чтобы метрики были сопоставимы по форме
+        requests = [
+            {
+                "prompt_tokens": len(p.split()),
+                "generated_tokens": len(t.split()),
+                "cached_tokens": None,
+                "ttft_s": None,
+                "latency_s": round(wall, 4),
+                "tokens_per_s": None,
+                "finish_reason": "stop",
+            }
+            for p, t in zip(prompt_list, texts)
+        ]
+        self.last_call_metrics = self.metrics.record_call(
+            stage,
+            requests,
+            wall,
+            params={
+                "max_new_tokens": max_new_tokens,
+                "temperature": temperature,
+                "schedule": schedule,
+            },
+        )
+        return texts[0] if is_single else texts
+
+    def ask_one(self, prompt: str, max_new_tokens: int = 256) -> str:
+        return self.generate(prompt, max_new_tokens=max_new_tokens)
+
+    def ask_batch(
+        self,
+        prompts: List[str],
+        max_new_tokens: int = 256,
+        batch_size: int = 8,
+    ) -> List[str]:
+        return self.generate(prompts, max_new_tokens=max_new_tokens)
+
+    def close(self):
+        pass
 
 
 llama_client = None
 llama_adapter_dir = None
+# get_llama вызывается и из пайплайна, и из потоков веб-сервиса —
+# без блокировки два потока могут одновременно поднять две модели на GPU
+_llama_lock = threading.RLock()
 
 
 def get_llama(adapter_dir: Optional[str] = None):
     global llama_client, llama_adapter_dir
-    if llama_client is None or adapter_dir != llama_adapter_dir:
-        llama_adapter_dir = adapter_dir
-        llama_client = LlamaClient(adapter_dir=adapter_dir)
-    return llama_client
+    with _llama_lock:
+        if llama_client is None or adapter_dir != llama_adapter_dir:
+            if llama_client is not None:
+                llama_client.close()
+            llama_adapter_dir = adapter_dir
+            client_cls = StubLlamaClient if LLM_BACKEND == "stub" else LlamaClient
+            llama_client = client_cls(adapter_dir=adapter_dir)
+        return llama_client
 
 
 def reset_llama():
     global llama_client, llama_adapter_dir
-    try:
-        if llama_client is not None:
-            llama_client.close()
-    except Exception:
-        pass
+    with _llama_lock:
+        try:
+            if llama_client is not None:
+                llama_client.close()
+        except Exception:
+            pass
 
-    llama_client = None
-    llama_adapter_dir = None
+        llama_client = None
+        llama_adapter_dir = None
 
     gc.collect()
-    if torch.cuda.is_available():
-        torch.cuda.synchronize()
-        torch.cuda.empty_cache()
-        torch.cuda.ipc_collect()
+    _free_cuda_memory()
@@ -0,0 +1,256 @@
+# src/llm_metrics.py
+"""
+Метрики инференса: сколько токенов ушло на промпты и ответы,
+сколько ждали первый токен, какая вышла скорость и как работал prefix cache.
+
+Каждый вызов LlamaClient.generate пишет в JSONL по строке на запрос
+("type": "request") и одну строку-итог на вызов ("type": "call").
+По файлу строится сводная таблица по этапам пайплайна (stage).
+"""
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+METRICS_PATH = "data/derived/llm_metrics.jsonl"
+SUMMARY_PATH = "data/derived/llm_metrics_summary.json"
+
+# один запуск процесса = один run_id, чтобы сводка не смешивала разные прогоны
+RUN_ID = datetime.now().strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    idx = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[idx]
+
+
+def _round(x: Optional[float], nd: int = 4) -> Optional[float]:
+    return None if x is None else round(x, nd)
+
+
+def request_metrics_from_output(out: Any, call_started: float, call_finished: float) -> Dict[str, Any]:
+    """
+    Метрики одного запроса из vllm.RequestOutput.
+    Поля metrics/num_cached_tokens есть не во всех версиях vLLM (в V1 metrics бывает None),
+    поэтому всё достаём через getattr и при отсутствии берём время всего вызова.
+    """
+    completion = out.outputs[0]
+    prompt_tokens = len(getattr(out, "prompt_token_ids", None) or [])
+    generated_tokens = len(getattr(completion, "token_ids", None) or [])
+    cached_tokens = getattr(out, "num_cached_tokens", None)
+
+    ttft = None
+    latency = call_finished - call_started
+    m = getattr(out, "metrics", None)
+    if m is not None:
+        arrival = getattr(m, "arrival_time", None)
+        first_token = getattr(m, "first_token_time", None)
+        finished = getattr(m, "finished_time", None) or getattr(m, "last_token_time", None)
+        if arrival and first_token:
+            ttft = first_token - arrival
+        if arrival and finished:
+            latency = finished - arrival
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "generated_tokens": generated_tokens,
+        "cached_tokens": cached_tokens,
+        "ttft_s": _round(ttft),
+        "latency_s": _round(latency),
+        "tokens_per_s": _round(generated_tokens / latency if latency > 0 else None, 2),
+        "finish_reason": getattr(completion, "finish_reason", None),
+    }
+
+
+def summarize_requests(requests: List[Dict[str, Any]], wall_s: float) -> Dict[str, Any]:
+    prompt_tokens = sum(r["prompt_tokens"] for r in requests)
+    generated_tokens = sum(r["generated_tokens"] for r in requests)
+    cached = [r["cached_tokens"] for r in requests if r.get("cached_tokens") is not None]
+    latencies = [r["latency_s"] for r in requests]
+    ttfts = [r["ttft_s"] for r in requests]
+
+    return {
+        "requests": len(requests),
+        "prompt_tokens": prompt_tokens,
+        "generated_tokens": generated_tokens,
+        "wall_s": _round(wall_s, 3),
+        "gen_tokens_per_s": _round(generated_tokens / wall_s if wall_s > 0 else None, 2),
+        "total_tokens_per_s": _round((prompt_tokens + generated_tokens) / wall_s if wall_s > 0 else None, 2),
+        "latency_p50_s": _percentile(latencies, 0.5),
+        "latency_p95_s": _percentile(latencies, 0.95),
+        "ttft_p50_s": _percentile(ttfts, 0.5),
+        "ttft_p95_s": _percentile(ttfts, 0.95),
+        "cache_hit_rate": _round(sum(cached) / prompt_tokens, 4) if cached and prompt_tokens else None,
+        "finish_reasons": dict(Counter(r.get("finish_reason") for r in requests)),
+    }
+
+
+class InferenceMetrics:
+    def __init__(self, metrics_path: Optional[str] = METRICS_PATH, run_id: Optional[str] = None):
+        # metrics_path=None — считаем метрики, но никуда не пишем
+        self.metrics_path = metrics_path
+        # воркеры шардированного инференса пишут под run_id родителя, чтобы попасть в его сводку
+        self.run_id = run_id or RUN_ID
+
+    def record_call(
+        self,
+        stage: str,
+        requests: List[Dict[str, Any]],
+        wall_s: float,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        ts = datetime.now().isoformat()
+        call = {
+            "type": "call",
+            "run_id": self.run_id,
+            "stage": stage,
+            "ts": ts,
+            "params": params or {},
+            **summarize_requests(requests, wall_s),
+        }
+
+        if self.metrics_path:
+            os.makedirs(os.path.dirname(self.metrics_path) or ".", exist_ok=True)
+            with open(self.metrics_path, "a", encoding="utf-8") as f:
+                for idx, r in enumerate(requests):
+                    rec = {"type": "request", "run_id": self.run_id, "stage": stage, "ts": ts, "index": idx, **r}
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.write(json.dumps(call, ensure_ascii=False) + "\n")
+
+        return call
+
+    def record_outputs(self, stage: str, outputs: Iterable[Any], started: float, params=None) -> Dict[str, Any]:
+        finished = time.perf_counter()
+        requests = [request_metrics_from_output(o, started, finished) for o in outputs]
+        return self.record_call(stage, requests, finished - started, params)
+
+
+def load_metrics(path: str = METRICS_PATH, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if run_id is None or rec.get("run_id") == run_id:
+                records.append(rec)
+    return records
+
+
+def merge_shard_metrics(shard_paths: Iterable[str], metrics_path: str = METRICS_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Переносит метрики воркеров шардированного инференса в основной JSONL и удаляет файлы шардов.
+    Запросы переносятся как есть; итоги шардов — с "type": "shard_call" (шарды шли параллельно,
+    их время нельзя складывать), а на каждый этап добавляется один "call" со временем
+    самого долгого шарда. Возвращает эти итоги по этапам.
+    """
+    records: List[Dict[str, Any]] = []
+    requests: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    shard_calls: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for path in shard_paths:
+        for rec in load_metrics(path):
+            if rec.get("type") == "call":
+                rec["type"] = "shard_call"
+                shard_calls[rec["stage"]].append(rec)
+            else:
+                requests[rec["stage"]].append(rec)
+            records.append(rec)
+        if os.path.exists(path):
+            os.remove(path)
+
+    calls = {}
+    for stage, reqs in requests.items():
+        parts = shard_calls.get(stage, [])
+        calls[stage] = {
+            "type": "call",
+            "run_id": parts[0]["run_id"] if parts else reqs[0].get("run_id"),
+            "stage": stage,
+            "ts": datetime.now().isoformat(),
+            "params": {**(parts[0].get("params") or {}), "shards": len(parts)} if parts else {},
+            **summarize_requests(reqs, max((c.get("wall_s") or 0.0 for c in parts), default=0.0)),
+        }
+    if records:
+        os.makedirs(os.path.dirname(metrics_path) or ".", exist_ok=True)
+        with open(metrics_path, "a", encoding="utf-8") as f:
+            for rec in records + list(calls.values()):
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    return calls
+
+
+def stage_summary(path: str = METRICS_PATH, run_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Сводка по этапам: запросы одного stage складываются, а время —
+    сумма wall-времени вызовов (вызовы внутри этапа идут последовательно).
+    """
+    records = load_metrics(path, run_id)
+    by_stage_requests: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    by_stage_wall: Dict[str, float] = defaultdict(float)
+    for rec in records:
+        if rec.get("type") == "request":
+            by_stage_requests[rec["stage"]].append(rec)
+        elif rec.get("type") == "call":
+            by_stage_wall[rec["stage"]] += rec.get("wall_s") or 0.0
+
+    return {
+        stage: summarize_requests(reqs, by_stage_wall.get(stage, 0.0))
+        for stage, reqs in by_stage_requests.items()
+    }
+
+
+def format_summary_table(summary: Dict[str, Dict[str, Any]]) -> str:
+    columns = [
+        ("stage", 16), ("requests", 9), ("prompt_tok", 11), ("gen_tok", 9), ("wall_s", 9),
+        ("gen_tok/s", 10), ("p50_lat", 8), ("p95_lat", 8), ("p50_ttft", 9), ("cache_hit", 10),
+    ]
+    keys = [
+        None, "requests", "prompt_tokens", "generated_tokens", "wall_s",
+        "gen_tokens_per_s", "latency_p50_s", "latency_p95_s", "ttft_p50_s", "cache_hit_rate",
+    ]
+
+    def fmt(v):
+        if v is None:
+            return "-"
+        if isinstance(v, float):
+            return f"{v:.3f}" if v < 100 else f"{v:.1f}"
+        return str(v)
+
+    lines = [" ".join(name.ljust(w) for name, w in columns).rstrip()]
+    for stage, row in sorted(summary.items()):
+        cells = [stage] + [fmt(row.get(k)) for k in keys[1:]]
+        lines.append(" ".join(str(c).ljust(w) for c, (_, w) in zip(cells, columns)).rstrip())
+    return "\n".join(lines)
+
+
+def write_summary(
+    path: str = METRICS_PATH,
+    out_path: str = SUMMARY_PATH,
+    run_id: Optional[str] = RUN_ID,
+) -> Dict[str, Dict[str, Any]]:
+    summary = stage_summary(path, run_id)
+    if not summary:
+        print(f"[WARN] В {path} нет метрик для run_id={run_id}")
+        return summary
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"run_id": run_id, "stages": summary}, f, ensure_ascii=False, indent=2)
+
+    print(format_summary_table(summary))
+    print(f"[INFO] Сводка метрик LLM сохранена в {out_path}")
+    return summary
+
+
+if __name__ == "__main__":
+    # python llm_metrics.py [metrics.jsonl] [run_id]  — сводка по уже записанным метрикам
+    metrics_path = sys.argv[1] if len(sys.argv) > 1 else METRICS_PATH
+    run = sys.argv[2] if len(sys.argv) > 2 else None
+    print(format_summary_table(stage_summary(metrics_path, run)))
@@ -35,7 +35,7 @@ PROJECT_COMPETENCIES_PROMPT = """
 Ответ:
 """
 
-# MATRIX_SIMILARITY_PROMPT - legacy, сейчас не используется, в будущем вместо этого будет использоваться маленькая модель для similarity
+# MATRIX_SIMILARITY_PROMPT - legacy, не используется: сходство индустрий считает competency_similarity.py (векторно, без LLM)
 MATRIX_SIMILARITY_PROMPT = """
 Оцени степень похожести двух наборов компетенций по шкале от 0 до 1.
 
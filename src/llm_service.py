@@ -0,0 +1,239 @@
+# src/llm_service.py
+"""
+Асинхронный сервисный слой над LlamaClient для интерактивных запросов.
+
+Вызывающие (веб-вьюхи, скрипты) кладут отдельные промпты в очередь,
+а сервис собирает их в микробатчи в пределах короткого окна и отдаёт
+модели одним вызовом generate. Каждый запрос получает свой future.
+
+Модель одна и не потокобезопасна, поэтому:
+- у сервиса свой event loop в отдельном потоке (не зависит от того,
+  в каком loop работает Django — ASGI, runserver или обычный скрипт);
+- generate выполняется строго в одном рабочем потоке, пока loop
+  продолжает копить следующий батч.
+"""
+import asyncio
+import concurrent.futures
+import itertools
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from llm_client import get_llama
+
+# чем меньше число, тем раньше запрос попадёт в батч
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+MAX_BATCH_SIZE = 32
+BATCH_WINDOW_MS = 15.0
+
+
+@dataclass(order=True)
+class _Request:
+    priority: int
+    seq: int
+    prompt: str = field(compare=False)
+    params: Tuple[Tuple[str, object], ...] = field(compare=False)
+    future: concurrent.futures.Future = field(compare=False)
+
+
+class LLMService:
+    def __init__(
+        self,
+        backend_factory: Optional[Callable[[], object]] = None,
+        *,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        batch_window_ms: float = BATCH_WINDOW_MS,
+    ):
+        self.backend_factory = backend_factory or get_llama
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+
+        self._backend = None
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    # ---------- жизненный цикл ----------
+
+    def start(self, warmup: bool = False):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            ready = threading.Event()
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="llm-service"
+            )
+            self._loop = asyncio.new_event_loop()
+
+            def run_loop():
+                asyncio.set_event_loop(self._loop)
+                self._queue = asyncio.PriorityQueue()
+                self._worker = self._loop.create_task(self._run())
+                ready.set()
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run_loop, name="llm-service-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+        if warmup:
+            # модель грузится долго — лучше сделать это до первого запроса
+            self._executor.submit(self._get_backend).result()
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, thread, executor = self._loop, self._thread, self._executor
+
+            async def shutdown():
+                self._worker.cancel()
+                try:
+                    await self._worker
+                except asyncio.CancelledError:
+                    pass
+                while not self._queue.empty():
+                    req = self._queue.get_nowait()
+                    if not req.future.done():
+                        req.future.set_exception(RuntimeError("LLMService остановлен"))
+
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            # дожидаемся батча, который уже отдан модели: его future получат результат
+            executor.shutdown(wait=True)
+            self._loop = self._thread = self._queue = self._worker = self._executor = None
+
+    # ---------- API для вызывающих ----------
+
+    def submit(
+        self,
+        prompt: str,
+        *,
+        priority: int = PRIORITY_INTERACTIVE,
+        max_new_tokens: int = 128,
+        min_new_tokens: int = 2,
+        temperature: float = 0.0,
+        top_p: float = 1.0,
+    ) -> concurrent.futures.Future:
+        """
+        Ставит один промпт в очередь и сразу возвращает future с текстом ответа.
+        Можно вызывать из любого потока; из async-кода удобнее agenerate.
+        """
+        self.start()
+        params = (
+            ("max_new_tokens", max_new_tokens),
+            ("min_new_tokens", min_new_tokens),
+            ("temperature", temperature),
+            ("top_p", top_p),
+        )
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        req = _Request(priority, next(self._seq), prompt, params, future)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, req)
+        return future
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        return await asyncio.wrap_future(self.submit(prompt, **kwargs))
+
+    async def agenerate_many(
+        self, prompts: List[str], *, priority: int = PRIORITY_BATCH, **kwargs
+    ) -> List[str]:
+        futures = [self.submit(p, priority=priority, **kwargs) for p in prompts]
+        return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in futures)))
+
+    # ---------- внутренности ----------
+
+    def _get_backend(self):
+        if self._backend is None:
+            self._backend = self.backend_factory()
+        return self._backend
+
+    async def _collect_batch(self) -> List[_Request]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        # запросы, от которых уже отказались (клиент ушёл), не отдаём модели
+        return [r for r in batch if r.future.set_running_or_notify_cancel()]
+
+    def _generate_batch(self, batch: List[_Request]):
+        try:
+            backend = self._get_backend()
+        except Exception as e:
+            # модель не загрузилась: ошибка уходит всем запросам батча,
+            # следующий батч попробует загрузить её снова
+            for r in batch:
+                r.future.set_exception(e)
+            return
+
+        # generate принимает одни параметры семплирования на вызов
+        groups: Dict[Tuple, List[_Request]] = {}
+        for req in batch:
+            groups.setdefault(req.params, []).append(req)
+
+        for params, reqs in groups.items():
+            try:
+                texts = backend.generate([r.prompt for r in reqs], stage="service", **dict(params))
+            except Exception as e:
+                for r in reqs:
+                    r.future.set_exception(e)
+                continue
+            for r, text in zip(reqs, texts):
+                r.future.set_result(text)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            if not batch:
+                continue
+            try:
+                await loop.run_in_executor(self._executor, self._generate_batch, batch)
+            except Exception as e:
+                # упавший батч не должен останавливать обработчик очереди
+                print(f"[WARN] LLMService: батч из {len(batch)} запросов завершился ошибкой: {e!r}")
+                for r in batch:
+                    if not r.future.done():
+                        r.future.set_exception(e)
+
+
+_service: Optional[LLMService] = None
+_service_lock = threading.Lock()
+
+
+def get_llm_service() -> LLMService:
+    """
+    Общий сервис процесса. Адаптер берётся из LLM_SERVICE_ADAPTER_DIR
+    (по умолчанию — базовая модель без LoRA).
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            adapter_dir = os.getenv("LLM_SERVICE_ADAPTER_DIR") or None
+            _service = LLMService(lambda: get_llama(adapter_dir))
+        return _service
+
+
+def shutdown_llm_service():
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.stop()
+        _service = None
@@ -33,6 +33,15 @@ def parse_competencies(raw: str) -> List[str]:
     return []
 
 
+def competencies_from_answer(raw: str) -> List[str]:
+    """
+    Список компетенций из ответа модели: без пустых строк и дублей.
+    Если ничего не нашли — ["-"], как и в сохранённых файлах.
+    """
+    comps = parse_competencies(raw)
+    return list(dict.fromkeys(c.strip() for c in comps if c and c.strip() != "-")) or ["-"]
+
+
 def safe_parse_llm_json(raw: str):
     """
     Пытается достать JSON из ответа модели.
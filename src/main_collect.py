@@ -1,10 +1,13 @@
 # src/main_collect.py
-import json
 import glob
 import os
+from typing import Callable, Optional
+
 from normalise import normalize_hh, normalize_sj
 from extract_skills import extract_skills_from_vacancy
 from config import RAW_DIR, PROCESSED_DIR
+from record_io import iter_records, load_json, write_records
+from stage_profiler import RunProfiler
 
 def load_raw_files(prefix: str):
     print("\n[STEP] Загрузка файлов:", prefix)
@@ -33,20 +36,14 @@ def load_raw_files(prefix: str):
         print(f"[INFO] Загружаю {f} ...")
         try:
             if f.endswith(".ndjson"):
-                with open(f, "r", encoding="utf-8") as fh:
-                    for line in fh:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        data.append(json.loads(line))
+                data.extend(iter_records(f))
             else:
-                with open(f, "r", encoding="utf-8") as fh:
-                    obj = json.load(fh)
-                    if isinstance(obj, dict):
-                        if "items" in obj: obj = obj["items"]
-                        if "objects" in obj: obj = obj["objects"]
-                    if isinstance(obj, list):
-                        data.extend(obj)
+                obj = load_json(f)
+                if isinstance(obj, dict):
+                    if "items" in obj: obj = obj["items"]
+                    if "objects" in obj: obj = obj["objects"]
+                if isinstance(obj, list):
+                    data.extend(obj)
         except Exception as e:
             print(f"[ERROR] Ошибка чтения {f}: {e}")
 
@@ -55,35 +52,57 @@ def load_raw_files(prefix: str):
 
 
 
-def process_all():
+def process_all(profiler: Optional[RunProfiler] = None, progress: Optional[Callable[[int, int, str], None]] = None):
+    """
+    profiler — замеры по шагам (stage_profiler); по умолчанию включается через PIPELINE_PROFILE.
+    progress(сделано, всего, сообщение) — счётчик для фоновых задач веба (по каждому источнику).
+    """
+    profiler = profiler if profiler is not None else RunProfiler.from_env("collect")
+    try:
+        _process_all(profiler, progress or (lambda done, total, message: None))
+    finally:
+        profiler.write()
+
+
+def _process_all(profiler: RunProfiler, progress: Callable[[int, int, str], None]):
     os.makedirs(PROCESSED_DIR, exist_ok=True)
     processed = []
 
     # === HeadHunter ===
-    hh_raw = load_raw_files("hh")
+    with profiler.stage("load_hh"):
+        hh_raw = load_raw_files("hh")
     print(f"[INFO] Обработка {len(hh_raw)} вакансий HH ...")
-    for idx, item in enumerate(hh_raw, start=1):
-        try:
-            vac = normalize_hh(item)
-            vac = extract_skills_from_vacancy(vac)
-            processed.append(vac)
+    with profiler.stage("normalize_hh"):
+        for idx, item in enumerate(hh_raw, start=1):
+            try:
+                vac = normalize_hh(item)
+                vac = extract_skills_from_vacancy(vac)
+                processed.append(vac)
+                if idx % 10 == 0 or idx == len(hh_raw):
+                    print(f"  → HH: обработано {idx}/{len(hh_raw)} вакансий")
+            except Exception as e:
+                print(f"[ERROR] HH ID={item.get('id')} ошибка: {e}")
             if idx % 10 == 0 or idx == len(hh_raw):
-                print(f"  → HH: обработано {idx}/{len(hh_raw)} вакансий")
-        except Exception as e:
-            print(f"[ERROR] HH ID={item.get('id')} ошибка: {e}")
+                # вне try: исключение из progress (отмена задачи) должно прервать обработку
+                progress(idx, len(hh_raw), "HH")
 
     # === SuperJob ===
-    sj_raw = load_raw_files("sj")
+    with profiler.stage("load_sj"):
+        sj_raw = load_raw_files("sj")
     print(f"[INFO] Обработка {len(sj_raw)} вакансий SJ ...")
-    for idx, item in enumerate(sj_raw, start=1):
-        try:
-            vac = normalize_sj(item)
-            vac = extract_skills_from_vacancy(vac)
-            processed.append(vac)
+    with profiler.stage("normalize_sj"):
+        for idx, item in enumerate(sj_raw, start=1):
+            try:
+                vac = normalize_sj(item)
+                vac = extract_skills_from_vacancy(vac)
+                processed.append(vac)
+                if idx % 10 == 0 or idx == len(sj_raw):
+                    print(f"  → SJ: обработано {idx}/{len(sj_raw)} вакансий")
+            except Exception as e:
+                print(f"[ERROR] SJ ID={item.get('id')} ошибка: {e}")
             if idx % 10 == 0 or idx == len(sj_raw):
-                print(f"  → SJ: обработано {idx}/{len(sj_raw)} вакансий")
-        except Exception as e:
-            print(f"[ERROR] SJ ID={item.get('id')} ошибка: {e}")
+                # вне try: исключение из progress (отмена задачи) должно прервать обработку
+                progress(idx, len(sj_raw), "SJ")
 
     # === Итог ===
     print(f"[INFO] Всего обработано {len(processed)} вакансий.")
@@ -92,8 +111,8 @@ def process_all():
         return
 
     out_path = os.path.join(PROCESSED_DIR, "vacancies_processed.json")
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(processed, f, ensure_ascii=False, indent=2)
+    with profiler.stage("write"):
+        write_records(out_path, processed)
     print(f"[OK] Файл сохранён: {out_path} ({len(processed)} записей)")
 
 if __name__ == "__main__":
@@ -0,0 +1,224 @@
+# src/matrix_index.py
+"""
+Бинарный индекс матрицы компетенций (competency_matrix.idx) для быстрых запросов.
+
+"Пробелы индустрии X" или "какие индустрии требуют компетенцию Y" раньше
+требовали загрузить и просмотреть весь competency_matrix.json. Здесь те же
+строки лежат массивами фиксированной ширины, плюс два индекса смещений:
+по индустриям (строки матрицы уже идут по индустриям) и по компетенциям.
+Файл открывается через mmap, массивы — np.frombuffer поверх него, так что
+запрос читает только свой срез: O(результат) без разбора JSON.
+
+Раскладка файла (little-endian, секции выровнены по 8 байт):
+    заголовок: MAGIC, версия, n_industries, n_competencies, n_rows
+    таблица секций: (offset, nbytes) на каждую из SECTIONS
+    секции: имена (offsets + utf-8 blob), строки матрицы, индексы
+"""
+import mmap
+import os
+import struct
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_PATH = "data/derived/competency_matrix.idx"
+
+MAGIC = b"RHMXIDX\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sIIII")  # magic, version, n_industries, n_competencies, n_rows
+_SECTION = struct.Struct("<QQ")
+
+STATUSES = ("match", "gap", "redundant")
+_STATUS_CODE = {s: i for i, s in enumerate(STATUSES)}
+
+# имя секции -> dtype; порядок = порядок в файле
+SECTIONS = (
+    ("industry_name_offsets", np.int64),   # n_industries + 1
+    ("industry_name_blob", np.uint8),
+    ("competency_name_offsets", np.int64),  # n_competencies + 1
+    ("competency_name_blob", np.uint8),
+    ("row_industry", np.int32),             # строки в порядке competency_matrix.json
+    ("row_competency", np.int32),
+    ("row_demand", np.int32),
+    ("row_supply", np.int32),
+    ("row_status", np.uint8),
+    ("industry_row_offsets", np.int64),     # строки индустрии i: [offsets[i], offsets[i+1])
+    ("competency_row_offsets", np.int64),   # по компетенциям: позиции в competency_rows
+    ("competency_rows", np.int32),          # номера строк, сгруппированные по компетенции
+)
+
+
+def _names_blob(names: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [n.encode("utf-8") for n in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_matrix_index(matrix_rows: List[dict], path: str = INDEX_PATH):
+    """matrix_rows — строки competency_matrix.json (отсортированы по индустрии, затем по компетенции)."""
+    industries = sorted({row["industry"] for row in matrix_rows})
+    competencies = sorted({row["competency"] for row in matrix_rows})
+    ind_id = {name: i for i, name in enumerate(industries)}
+    comp_id = {name: i for i, name in enumerate(competencies)}
+
+    row_industry = np.fromiter((ind_id[r["industry"]] for r in matrix_rows), dtype=np.int32, count=len(matrix_rows))
+    row_competency = np.fromiter((comp_id[r["competency"]] for r in matrix_rows), dtype=np.int32, count=len(matrix_rows))
+    row_demand = np.fromiter((r["demand"] for r in matrix_rows), dtype=np.int32, count=len(matrix_rows))
+    row_supply = np.fromiter((r["supply"] for r in matrix_rows), dtype=np.int32, count=len(matrix_rows))
+    row_status = np.fromiter((_STATUS_CODE[r["status"]] for r in matrix_rows), dtype=np.uint8, count=len(matrix_rows))
+
+    if len(row_industry) > 1 and np.any(np.diff(row_industry) < 0):
+        raise ValueError("Строки матрицы должны идти по индустриям, как в competency_matrix.json")
+
+    industry_row_offsets = np.searchsorted(row_industry, np.arange(len(industries) + 1)).astype(np.int64)
+    # стабильная сортировка по компетенции: внутри — в порядке индустрий
+    competency_rows = np.argsort(row_competency, kind="stable").astype(np.int32)
+    competency_row_offsets = np.zeros(len(competencies) + 1, dtype=np.int64)
+    competency_row_offsets[1:] = np.cumsum(np.bincount(row_competency, minlength=len(competencies)))
+
+    ind_offsets, ind_blob = _names_blob(industries)
+    comp_offsets, comp_blob = _names_blob(competencies)
+    arrays = {
+        "industry_name_offsets": ind_offsets,
+        "industry_name_blob": ind_blob,
+        "competency_name_offsets": comp_offsets,
+        "competency_name_blob": comp_blob,
+        "row_industry": row_industry,
+        "row_competency": row_competency,
+        "row_demand": row_demand,
+        "row_supply": row_supply,
+        "row_status": row_status,
+        "industry_row_offsets": industry_row_offsets,
+        "competency_row_offsets": competency_row_offsets,
+        "competency_rows": competency_rows,
+    }
+
+    pos = _HEADER.size + _SECTION.size * len(SECTIONS)
+    table, payload = [], []
+    for name, dtype in SECTIONS:
+        data = np.ascontiguousarray(arrays[name], dtype=dtype).astype(np.dtype(dtype).newbyteorder("<"), copy=False)
+        pad = (-pos) % 8
+        pos += pad
+        table.append((pos, data.nbytes))
+        payload.append((pad, data.tobytes()))
+        pos += data.nbytes
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(industries), len(competencies), len(matrix_rows)))
+        for offset, nbytes in table:
+            f.write(_SECTION.pack(offset, nbytes))
+        for pad, raw in payload:
+            f.write(b"\0" * pad)
+            f.write(raw)
+    os.replace(tmp_path, path)
+    print(f"[INFO] Matrix index saved to: {path}")
+
+
+class MatrixIndex:
+    """
+    Запросы к competency_matrix.idx:
+        with MatrixIndex() as idx:
+            idx.gaps_for("FinTech")                # как "gaps" в competency_gaps_and_redundancy.json
+            idx.industries_demanding("Python")     # [(индустрия, demand), ...]
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.n_industries, self.n_competencies, self.n_rows = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: неизвестный формат индекса матрицы")
+
+        self._arrays: Dict[str, np.ndarray] = {}
+        for i, (name, dtype) in enumerate(SECTIONS):
+            offset, nbytes = _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size)
+            dt = np.dtype(dtype).newbyteorder("<")
+            self._arrays[name] = np.frombuffer(self._mm, dtype=dt, count=nbytes // dt.itemsize, offset=offset)
+
+    # ---------- имена ----------
+
+    def _name(self, kind: str, idx: int) -> str:
+        offsets = self._arrays[f"{kind}_name_offsets"]
+        lo, hi = int(offsets[idx]), int(offsets[idx + 1])
+        return self._arrays[f"{kind}_name_blob"][lo:hi].tobytes().decode("utf-8")
+
+    def _find(self, kind: str, name: str) -> Optional[int]:
+        # имена отсортированы при записи — двоичный поиск, декодируя только пробы
+        lo, hi = 0, self.n_industries if kind == "industry" else self.n_competencies
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(kind, mid) < name:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < (self.n_industries if kind == "industry" else self.n_competencies) and self._name(kind, lo) == name:
+            return lo
+        return None
+
+    def industries(self) -> List[str]:
+        return [self._name("industry", i) for i in range(self.n_industries)]
+
+    # ---------- запросы ----------
+
+    def rows_for_industry(self, industry: str, status: Optional[str] = None) -> List[dict]:
+        """Строки матрицы индустрии (как в competency_matrix.json), опционально по статусу."""
+        i = self._find("industry", industry)
+        if i is None:
+            return []
+        a = self._arrays
+        lo, hi = int(a["industry_row_offsets"][i]), int(a["industry_row_offsets"][i + 1])
+        rows = np.arange(lo, hi)
+        if status is not None:
+            rows = rows[a["row_status"][lo:hi] == _STATUS_CODE[status]]
+        return [
+            {
+                "industry": industry,
+                "competency": self._name("competency", int(a["row_competency"][r])),
+                "demand": int(a["row_demand"][r]),
+                "supply": int(a["row_supply"][r]),
+                "status": STATUSES[a["row_status"][r]],
+            }
+            for r in rows
+        ]
+
+    def gaps_for(self, industry: str) -> List[dict]:
+        """То же, что поле "gaps" индустрии в competency_gaps_and_redundancy.json."""
+        return [
+            {"competency": row["competency"], "demand": row["demand"]}
+            for row in self.rows_for_industry(industry, status="gap")
+        ]
+
+    def industries_demanding(self, competency: str) -> List[Tuple[str, int]]:
+        """Индустрии, где компетенция есть в вакансиях: [(индустрия, demand)], по убыванию спроса."""
+        c = self._find("competency", competency)
+        if c is None:
+            return []
+        a = self._arrays
+        lo, hi = int(a["competency_row_offsets"][c]), int(a["competency_row_offsets"][c + 1])
+        rows = a["competency_rows"][lo:hi]
+        demand = a["row_demand"][rows]
+        rows, demand = rows[demand > 0], demand[demand > 0]
+        result = [(self._name("industry", int(a["row_industry"][r])), int(d)) for r, d in zip(rows, demand)]
+        return sorted(result, key=lambda item: -item[1])
+
+    # ---------- ресурсы ----------
+
+    def close(self):
+        self._arrays = {}
+        if getattr(self, "_mm", None) is not None:
+            self._mm.close()
+            self._mm = None
+        if getattr(self, "_file", None) is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,363 @@
+# src/pipeline_dag.py
+"""
+Граф этапов пайплайна с пропуском неизменившихся этапов.
+
+Этап объявляет входы и выходы (файлы или папки), модули, от кода которых
+зависит результат, и параметры конфигурации. Отпечаток этапа — sha256 от
+содержимого входов, исходников модулей (вместе со всеми модулями проекта,
+которые они импортируют, в том числе внутри функций) и конфигурации. Если отпечаток
+совпадает с записанным в прошлый раз, а выходы на месте и не менялись,
+этап пропускается.
+
+Зависимости между этапами выводятся из путей: этап B ждёт этап A, если
+какой-то вход B — выход A (или лежит внутри папки-выхода A).
+
+LLM-этапы (kind="llm") выполняются по одному в основном процессе — им нужен
+GPU. Готовые к запуску CPU-этапы тем временем идут параллельно в пуле
+процессов (spawn: дочерний процесс не наследует потоки и CUDA-контекст
+родителя), поэтому функции этапов должны быть функциями уровня модуля.
+
+Хэши файлов кэшируются по (размер, mtime), чтобы не перечитывать большие
+входы при каждом запуске; состояние — в data/derived/.pipeline_state.json.
+"""
+import ast
+import hashlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+from record_io import load_json, write_json
+from stage_profiler import RunProfiler
+
+STATE_PATH = "data/derived/.pipeline_state.json"
+# 0 — по числу ядер; 1 — всё последовательно в текущем процессе
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "0"))
+# модули из этой папки, импортированные кодом этапа, тоже входят в его отпечаток
+LOCAL_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_module_cache: Dict[str, tuple] = {}  # путь -> (размер, mtime_ns, sha256, импорты)
+
+
+class Stage:
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], object],
+        inputs: Sequence[str] = (),
+        outputs: Sequence[str] = (),
+        code: Sequence[str] = (),
+        config: Optional[dict] = None,
+        kind: str = "cpu",
+    ):
+        if kind not in ("cpu", "llm"):
+            raise ValueError(f"{name}: kind должен быть cpu или llm, а не {kind!r}")
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)      # имена модулей: их исходники входят в отпечаток
+        self.config = config or {}  # JSON-совместимые параметры, влияющие на результат
+        self.kind = kind
+
+
+# ---------- хэши ----------
+
+class FileHasher:
+    """sha256 файлов и папок с кэшем по (размер, mtime_ns)."""
+
+    def __init__(self, cache: Optional[dict] = None):
+        self.cache: Dict[str, list] = cache or {}
+
+    def file(self, path: str) -> str:
+        st = os.stat(path)
+        cached = self.cache.get(path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.cache[path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def path(self, path: str) -> Optional[str]:
+        """Файл — его хэш; папка — хэш списка (имя, хэш) всех файлов; нет пути — None."""
+        if os.path.isfile(path):
+            return self.file(path)
+        if not os.path.isdir(path):
+            return None
+        h = hashlib.sha256()
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".tmp"):
+                    continue
+                full = os.path.join(root, name)
+                h.update(os.path.relpath(full, path).encode("utf-8"))
+                h.update(self.file(full).encode("ascii"))
+        return h.hexdigest()
+
+
+def _module_origin(module: str) -> str:
+    spec = importlib.util.find_spec(module)
+    if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+        raise ValueError(f"Не найден исходник модуля {module!r}")
+    return spec.origin
+
+
+def _local_module_path(module: str) -> Optional[str]:
+    # только модули проекта (src/): изменения numpy, django и т.п. отпечаток не отслеживает
+    base = os.path.join(LOCAL_ROOT, *module.split("."))
+    for path in (base + ".py", os.path.join(base, "__init__.py")):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def _scan_module(path: str):
+    """(sha256 исходника, имена импортируемых модулей) — с кэшем по (размер, mtime_ns)."""
+    st = os.stat(path)
+    cached = _module_cache.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2], cached[3]
+    with open(path, "rb") as f:
+        raw = f.read()
+    names = set()
+    # ast.walk видит и ленивые импорты внутри функций — в этом проекте их много
+    for node in ast.walk(ast.parse(raw, filename=path)):
+        if isinstance(node, ast.Import):
+            found = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            # from pkg import name: name может оказаться подмодулем
+            found = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+        else:
+            continue
+        for name in found:
+            parts = name.split(".")
+            names.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    digest = hashlib.sha256(raw).hexdigest()
+    _module_cache[path] = (st.st_size, st.st_mtime_ns, digest, sorted(names))
+    return digest, _module_cache[path][3]
+
+
+def code_hashes(modules: Iterable[str]) -> Dict[str, str]:
+    """Хэши исходников модулей и всех модулей проекта, которые они импортируют (транзитивно)."""
+    hashes: Dict[str, str] = {}
+    todo = [(m, _module_origin(m)) for m in modules]
+    while todo:
+        module, path = todo.pop()
+        if module in hashes:
+            continue
+        hashes[module], imports = _scan_module(path)
+        for name in imports:
+            if name not in hashes:
+                local = _local_module_path(name)
+                if local is not None:
+                    todo.append((name, local))
+    return hashes
+
+
+def stage_fingerprint(stage: Stage, hasher: FileHasher) -> str:
+    payload = {
+        "inputs": {p: hasher.path(p) for p in stage.inputs},
+        "code": code_hashes(stage.code),
+        "config": stage.config,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# ---------- граф ----------
+
+def _produces(output: str, path: str) -> bool:
+    output = os.path.normpath(output)
+    path = os.path.normpath(path)
+    return path == output or path.startswith(output + os.sep)
+
+
+def stage_dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Имена этапов должны быть уникальны")
+    deps: Dict[str, List[str]] = {}
+    for stage in stages:
+        deps[stage.name] = [
+            other.name for other in stages
+            if other is not stage and any(_produces(o, i) for o in other.outputs for i in stage.inputs)
+        ]
+    # проверка на циклы: снимаем этапы без незавершённых зависимостей
+    left = dict(deps)
+    while left:
+        free = [n for n, d in left.items() if not any(x in left for x in d)]
+        if not free:
+            raise ValueError(f"Цикл в графе этапов: {sorted(left)}")
+        for n in free:
+            del left[n]
+    return deps
+
+
+def _run_stage(name: str, func: Callable[[], object], profile: Optional[tuple] = None):
+    """
+    Выполняет этап; profile — (run, modes, out_dir, run_id) профайлера запуска.
+    Возвращает (секунды, запись профиля или None) — в пуле профиль снимается в самом воркере.
+    """
+    profiler = RunProfiler(profile[0], profile[1], profile[2], profile[3]) if profile else None
+    start = time.perf_counter()
+    if profiler is not None:
+        with profiler.stage(name):
+            func()
+    else:
+        func()
+    return time.perf_counter() - start, (profiler.stages[0] if profiler is not None else None)
+
+
+# ---------- запуск ----------
+
+def run_pipeline(
+    stages: List[Stage],
+    state_path: str = STATE_PATH,
+    force: Iterable[str] = (),
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+    profiler: Optional[RunProfiler] = None,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+) -> Dict[str, str]:
+    """
+    Выполняет этапы, которые устарели. force — имена этапов для обязательного
+    перезапуска ("all" — все); dry_run — только показать план.
+    profiler — stage_profiler.RunProfiler: замеры по каждому выполненному этапу.
+    progress(готово этапов, всего, сообщение) — после каждого этапа и перед
+    запуском этапа в основном процессе; исключение из него останавливает запуск
+    (этапы, уже отданные в пул, досчитываются).
+    Возвращает {этап: "run" | "skip" | "failed" | "blocked"}.
+    """
+    profile = None
+    if profiler is not None and profiler.enabled:
+        profile = (profiler.run, profiler.modes, profiler.out_dir, profiler.run_id)
+    deps = stage_dependencies(stages)
+    by_name = {s.name: s for s in stages}
+    force = set(force)
+    unknown = force - set(by_name) - {"all"}
+    if unknown:
+        raise ValueError(f"Неизвестные этапы: {sorted(unknown)}")
+
+    state = (load_json(state_path) or {}) if os.path.exists(state_path) else {}
+    records: Dict[str, dict] = state.get("stages", {})
+    hasher = FileHasher(state.get("file_hashes"))
+
+    def up_to_date(stage: Stage, fingerprint: str) -> bool:
+        if "all" in force or stage.name in force:
+            return False
+        record = records.get(stage.name)
+        if not record or record.get("fingerprint") != fingerprint:
+            return False
+        return all(hasher.path(o) is not None and hasher.path(o) == record["outputs"].get(o) for o in stage.outputs)
+
+    def save_state():
+        write_json(state_path, {"stages": records, "file_hashes": hasher.cache}, compact=True)
+
+    result: Dict[str, str] = {}
+    fingerprints: Dict[str, str] = {}
+
+    def report(message: str):
+        if progress is not None:
+            progress(len(result), len(stages), message)
+
+    def finish(stage: Stage, outcome):
+        seconds, profile_record = outcome
+        if profiler is not None:
+            profiler.add(profile_record)
+        records[stage.name] = {
+            "fingerprint": fingerprints[stage.name],
+            "outputs": {o: hasher.path(o) for o in stage.outputs},
+            "seconds": round(seconds, 3),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        result[stage.name] = "run"
+        save_state()
+        print(f"[OK] Этап {stage.name}: {seconds:.1f} s")
+        report(f"{stage.name}: готово")
+
+    def ready(name: str) -> bool:
+        return name not in result and all(result.get(d) in ("run", "skip") for d in deps[name])
+
+    if dry_run:
+        # без запуска нельзя знать, изменятся ли выходы предков: этап после
+        # перезапускаемого помечается как "run" (возможно, лишний)
+        for stage in stages:
+            stale_dep = any(result[d] == "run" for d in deps[stage.name])
+            if stale_dep or not up_to_date(stage, stage_fingerprint(stage, hasher)):
+                result[stage.name] = "run"
+            else:
+                result[stage.name] = "skip"
+            print(f"[INFO] {stage.name:<16} {result[stage.name]}")
+        return result
+
+    workers = workers if workers is not None else PIPELINE_WORKERS
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) if workers > 1 else None
+    running = {}  # future -> Stage
+    failed = None
+    try:
+        while True:
+            # этапы, чьи зависимости готовы: отпечаток считается по уже обновлённым входам
+            for stage in stages:
+                if not ready(stage.name) or stage in running.values() or failed:
+                    continue
+                fingerprints[stage.name] = stage_fingerprint(stage, hasher)
+                if up_to_date(stage, fingerprints[stage.name]):
+                    result[stage.name] = "skip"
+                    print(f"[INFO] Этап {stage.name}: без изменений, пропускаем")
+                    report(f"{stage.name}: без изменений")
+                    continue
+                if stage.kind == "cpu" and pool is not None:
+                    print(f"[INFO] Этап {stage.name}: запуск в пуле")
+                    running[pool.submit(_run_stage, stage.name, stage.func, profile)] = stage
+
+            # LLM-этап (или любой этап без пула) — в основном процессе, пока CPU-этапы считаются в пуле
+            inline = next(
+                (s for s in stages if ready(s.name) and s not in running.values() and s.name in fingerprints and not failed),
+                None,
+            )
+            if inline is not None:
+                print(f"[INFO] Этап {inline.name}: запуск")
+                report(f"{inline.name}: выполняется")
+                try:
+                    # в основном процессе замер пишет сам профайлер запуска — и для упавшего этапа тоже
+                    start = time.perf_counter()
+                    with profiler.stage(inline.name) if profiler is not None else nullcontext():
+                        inline.func()
+                    finish(inline, (time.perf_counter() - start, None))
+                except Exception as e:
+                    result[inline.name] = "failed"
+                    failed = e
+                continue
+
+            if not running:
+                break
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    finish(stage, future.result())
+                except Exception as e:
+                    result[stage.name] = "failed"
+                    failed = failed or e
+    finally:
+        if pool is not None:
+            # при остановке (ошибка, отмена через progress) этапы из очереди пула не запускаем
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    for stage in stages:
+        result.setdefault(stage.name, "blocked")
+    if failed is not None:
+        blocked = [n for n, r in result.items() if r == "blocked"]
+        print(f"[WARN] Пайплайн остановлен, не запускались: {', '.join(blocked) or '-'}")
+        raise failed
+    return result
@@ -0,0 +1,226 @@
+# src/plot_jobs.py
+"""
+Графики отчёта (data/derived/plots) как независимые задания.
+
+PlotJob — имя файла, вид графика и данные для него; render_jobs рисует
+задания в пуле процессов (бэкенд Agg, без окна) и пропускает те, у которых
+данные не изменились: хэш (вид, данные, версия оформления) каждого
+нарисованного файла лежит в viz_dir/.plot_hashes.json.
+
+Так и общие графики, и наборы по индустриям (десятки файлов) перерисовываются
+только когда меняются их счётчики, а при перерисовке — параллельно.
+"""
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from record_io import load_json, write_json
+
+HASHES_FILE = ".plot_hashes.json"
+# 0 — по числу ядер; 1 — рисовать в текущем процессе
+PLOT_WORKERS = int(os.getenv("PLOT_WORKERS", "0"))
+# менять при правке оформления графиков: старые картинки перерисуются
+PLOT_STYLE_VERSION = 1
+# больше стольких точек MATCH — плотный режим (гексбины + подписи только топа)
+MATCH_SCATTER_DENSE_THRESHOLD = int(os.getenv("PLOT_SCATTER_DENSE_THRESHOLD", "300"))
+MATCH_SCATTER_TOP_LABELS = int(os.getenv("PLOT_SCATTER_TOP_LABELS", "25"))
+
+
+class PlotJob:
+    def __init__(self, filename: str, kind: str, data: dict):
+        self.filename = filename  # относительно viz_dir
+        self.kind = kind          # ключ в RENDERERS
+        self.data = data          # только JSON-совместимые значения — по ним считается хэш
+
+    def fingerprint(self) -> str:
+        payload = {"kind": self.kind, "data": self.data, "style": PLOT_STYLE_VERSION}
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def industry_slug(industry: str) -> str:
+    """Имя файла для индустрии: "AI/EdTech" -> "AI_EdTech-<хэш>" (хэш — от коллизий после замены)."""
+    slug = re.sub(r"[^\w.-]+", "_", industry).strip("_") or "industry"
+    return f"{slug[:60]}-{hashlib.sha1(industry.encode('utf-8')).hexdigest()[:8]}"
+
+
+def jitter_points(xs, ys, x_amount=0.25, y_amount=0.08):
+    """
+    Совпадающие точки раскладываются по эллипсу вокруг своего места:
+    k-я из n точек группы (в порядке входа) — под углом 2πk/n; одиночные не двигаются.
+    Группировка и смещения — массивами numpy, без цикла по точкам.
+    """
+    import numpy as np
+
+    xs2 = np.asarray(xs, dtype=float)
+    ys2 = np.asarray(ys, dtype=float)
+    if len(xs2) == 0:
+        return [], []
+
+    # точка (x, y) как комплексное число: одномерный unique в разы быстрее unique(axis=0)
+    _, group, sizes = np.unique(xs2 + 1j * ys2, return_inverse=True, return_counts=True)
+    group = group.reshape(-1)
+    # номер точки внутри группы: стабильная сортировка по группе сохраняет порядок входа
+    order = np.argsort(group, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    rank = np.empty(len(group), dtype=np.int64)
+    rank[order] = np.arange(len(group)) - starts[group[order]]
+
+    n = sizes[group]
+    angle = 2 * np.pi * rank / n
+    moved = n > 1
+    xs2 = np.where(moved, xs2 + x_amount * np.cos(angle), xs2)
+    ys2 = np.where(moved, ys2 + y_amount * np.sin(angle), ys2)
+    return xs2.tolist(), ys2.tolist()
+
+
+# ---------- отрисовка (выполняется в воркерах) ----------
+
+def _render_top_bar(plt, path: str, data: dict):
+    skills, counts = zip(*data["items"])
+    plt.figure(figsize=(12, 6))
+    plt.barh(skills, counts)
+    plt.gca().invert_yaxis()
+    plt.title(data["title"])
+    plt.xlabel(data["xlabel"])
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _render_match_scatter(plt, path: str, data: dict):
+    xs, ys, labels = data["xs"], data["ys"], data["labels"]
+    if len(xs) > data.get("dense_threshold", MATCH_SCATTER_DENSE_THRESHOLD):
+        return _render_match_density(plt, path, data)
+
+    plt.figure(figsize=(14, 12))
+    xs_jit, ys_jit = jitter_points(xs, ys, x_amount=0.5, y_amount=0.4)
+    plt.scatter(xs_jit, ys_jit, alpha=0.7)
+    for label, sx, sy in zip(labels, xs_jit, ys_jit):
+        plt.annotate(label, (sx, sy), textcoords="offset points", xytext=(3, 3),
+                     fontsize=14, alpha=0.85)
+    plt.xlabel("Сколько раз встречается в проектах (supply)", fontsize=30)
+    plt.ylabel("Сколько раз встречается в вакансиях (demand)", fontsize=30)
+    plt.title("Компетенции со статусом MATCH (есть в обоих случаях)", fontsize=30, pad=20)
+    plt.grid(True, linestyle="--", alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _render_match_density(plt, path: str, data: dict):
+    """
+    Плотный режим: тысячи точек и подписей нечитаемы и рисуются минутами.
+    Точки сводятся в гексагональные ячейки (цвет — число компетенций, лог-шкала),
+    поверх — только top_labels компетенций с наибольшим спросом (при равенстве — предложением).
+    """
+    import numpy as np
+
+    xs = np.asarray(data["xs"], dtype=float)
+    ys = np.asarray(data["ys"], dtype=float)
+    labels = data["labels"]
+    top_n = data.get("top_labels", MATCH_SCATTER_TOP_LABELS)
+
+    plt.figure(figsize=(14, 12))
+    # счётчики >= 1 и с тяжёлым хвостом — обе оси логарифмические
+    hb = plt.hexbin(xs, ys, gridsize=60, bins="log", xscale="log", yscale="log", mincnt=1, cmap="Blues")
+    plt.colorbar(hb, label="компетенций в ячейке")
+
+    top = np.lexsort((-xs, -ys))[:top_n]
+    plt.scatter(xs[top], ys[top], color="tab:red", s=20, zorder=3)
+    for i in top.tolist():
+        plt.annotate(labels[i], (xs[i], ys[i]), textcoords="offset points", xytext=(3, 3),
+                     fontsize=12, alpha=0.85)
+
+    plt.xlabel("Сколько раз встречается в проектах (supply)", fontsize=30)
+    plt.ylabel("Сколько раз встречается в вакансиях (demand)", fontsize=30)
+    plt.title(f"MATCH: {len(xs)} компетенций, подписаны топ-{min(top_n, len(xs))} по спросу", fontsize=22, pad=20)
+    plt.grid(True, linestyle="--", alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def _render_industry_overview(plt, path: str, data: dict):
+    """Набор по индустрии: топ вакансий и топ проектов рядом, в заголовке — число дефицитов."""
+    fig, axes = plt.subplots(1, 2, figsize=(16, 7))
+    panels = (
+        (axes[0], data["vacancies"], "Вакансии", "tab:blue"),
+        (axes[1], data["projects"], "Учебные проекты", "tab:orange"),
+    )
+    for ax, items, title, color in panels:
+        if items:
+            skills, counts = zip(*items)
+            ax.barh(skills, counts, color=color)
+            ax.invert_yaxis()
+        else:
+            ax.text(0.5, 0.5, "нет данных", ha="center", va="center", transform=ax.transAxes)
+            ax.set_yticks([])
+        ax.set_title(title)
+        ax.set_xlabel("Количество упоминаний")
+    fig.suptitle(f"{data['industry']}: дефицитных компетенций — {data['gaps']}")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+RENDERERS = {
+    "top_bar": _render_top_bar,
+    "match_scatter": _render_match_scatter,
+    "industry_overview": _render_industry_overview,
+}
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render(viz_dir: str, filename: str, kind: str, data: dict) -> str:
+    _init_worker()
+    import matplotlib.pyplot as plt
+
+    path = os.path.join(viz_dir, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    RENDERERS[kind](plt, path, data)
+    return filename
+
+
+# ---------- запуск ----------
+
+def render_jobs(jobs: List[PlotJob], viz_dir: str, workers: Optional[int] = None, force: bool = False) -> Dict[str, int]:
+    """
+    Рисует задания, данные которых изменились с прошлого раза (или файла нет).
+    force=True — перерисовать всё. Возвращает {"rendered": N, "skipped": M}.
+    """
+    os.makedirs(viz_dir, exist_ok=True)
+    hashes_path = os.path.join(viz_dir, HASHES_FILE)
+    previous = (load_json(hashes_path) or {}) if os.path.exists(hashes_path) else {}
+
+    hashes = {job.filename: job.fingerprint() for job in jobs}
+    todo = [
+        job for job in jobs
+        if force
+        or previous.get(job.filename) != hashes[job.filename]
+        or not os.path.exists(os.path.join(viz_dir, job.filename))
+    ]
+
+    workers = workers if workers is not None else PLOT_WORKERS
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        for job in todo:
+            _render(viz_dir, job.filename, job.kind, job.data)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            futures = [pool.submit(_render, viz_dir, job.filename, job.kind, job.data) for job in todo]
+            for future in futures:
+                future.result()
+
+    # хэши старых файлов, которые в этот раз не строились, не храним
+    write_json(hashes_path, hashes)
+    print(f"[INFO] Plots: перерисовано {len(todo)}, без изменений {len(jobs) - len(todo)} -> {viz_dir}")
+    return {"rendered": len(todo), "skipped": len(jobs) - len(todo)}
@@ -0,0 +1,259 @@
+# src/record_io.py
+"""
+Чтение и запись коллекций записей (вакансии, проекты, строки матрицы) для всех этапов.
+
+- iter_records(path) — записи по одной: NDJSON (.ndjson/.jsonl) построчно,
+  JSON-массив (.json) — целиком через быстрый кодек, а большие файлы —
+  инкрементальным разбором, не держа весь текст и весь список в памяти.
+- RecordWriter / write_records — потоковая запись: JSON-массив с indent=2
+  (байт в байт как json.dump(..., ensure_ascii=False, indent=2)), компактный
+  JSON-массив или NDJSON.
+- Сжатие — по расширению: .gz (gzip), .zst (пакет zstandard, если установлен).
+- Если установлен orjson, он используется для разбора и компактной записи.
+
+Компактный режим по умолчанию включается переменной PIPELINE_COMPACT_JSON=1:
+файлы, которые читают только следующие этапы, незачем красиво форматировать.
+"""
+import gzip
+import io
+import json
+import os
+from typing import Any, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен
+    orjson = None
+
+COMPACT_DEFAULT = os.getenv("PIPELINE_COMPACT_JSON", "0") == "1"
+# JSON-массивы крупнее этого разбираются инкрементально, а не одним loads
+STREAM_THRESHOLD_BYTES = int(os.getenv("PIPELINE_STREAM_THRESHOLD_MB", "64")) * 1024 * 1024
+_CHUNK_SIZE = 1 << 16
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+
+# ---------- файлы и кодек ----------
+
+def _split_compression(path: str):
+    lower = path.lower()
+    for suffix in (".gz", ".zst"):
+        if lower.endswith(suffix):
+            return path[: -len(suffix)], suffix
+    return path, None
+
+
+def is_ndjson(path: str) -> bool:
+    return _split_compression(path)[0].lower().endswith(NDJSON_SUFFIXES)
+
+
+def open_text(path: str, mode: str = "r", like: Optional[str] = None):
+    """
+    open() с прозрачным сжатием по расширению; mode — "r" или "w".
+    like — путь, по расширению которого выбирать сжатие (для временных файлов).
+    """
+    _, compression = _split_compression(like or path)
+    if compression == ".gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if compression == ".zst":
+        try:
+            import zstandard
+        except ImportError as e:
+            raise ImportError(f"Для {path} нужен пакет zstandard (pip install zstandard)") from e
+        if mode == "r":
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        else:
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def dumps_compact(obj: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            # нестроковые ключи, большие int и т.п. — пусть разбирается stdlib
+            pass
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps_pretty(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+# ---------- чтение ----------
+
+def load_json(path: str) -> Any:
+    """Весь документ (stats.json, состояние и т.п.); пустой файл — None."""
+    with open_text(path, "r") as f:
+        content = f.read()
+    return loads(content) if content.strip() else None
+
+
+def _iter_json_array(f) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(_CHUNK_SIZE)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            fill()
+
+    skip_ws()
+    if pos >= len(buf):
+        return  # пустой файл — пустая коллекция
+    if buf[pos] != "[":
+        raise ValueError("Ожидался JSON-массив записей")
+    pos += 1
+
+    first = True
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("Неожиданный конец JSON-массива")
+        if buf[pos] == "]":
+            return
+        if not first:
+            if buf[pos] != ",":
+                raise ValueError(f"Ожидалась ',' в JSON-массиве, встречено {buf[pos]!r}")
+            pos += 1
+            skip_ws()
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()  # объект не поместился в буфер — дочитываем
+                continue
+            # число на границе буфера могло оборваться ("12|34") — убеждаемся, что за ним что-то есть
+            if end == len(buf) and not eof:
+                fill()
+                continue
+            break
+        pos = end
+        first = False
+        yield obj
+
+
+def iter_records(path: str) -> Iterator[Any]:
+    """Записи файла по одной; пустой файл — пустая коллекция."""
+    if is_ndjson(path):
+        with open_text(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield loads(line)
+        return
+
+    if _split_compression(path)[1] is None and os.path.getsize(path) <= STREAM_THRESHOLD_BYTES:
+        data = load_json(path)
+        if data is None:
+            return
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: ожидался JSON-массив записей")
+        yield from data
+        return
+
+    with open_text(path, "r") as f:
+        yield from _iter_json_array(f)
+
+
+def load_records(path: str) -> list:
+    return list(iter_records(path))
+
+
+# ---------- запись ----------
+
+class RecordWriter:
+    """
+    with RecordWriter("out.json") as w:
+        for rec in records:
+            w.write(rec)
+
+    Формат — по расширению (.ndjson/.jsonl — построчно, иначе JSON-массив),
+    compact=True — без отступов. Файл пишется во временный и подменяется
+    целиком при успешном закрытии.
+    """
+
+    def __init__(self, path: str, compact: Optional[bool] = None):
+        self.path = path
+        self.compact = COMPACT_DEFAULT if compact is None else compact
+        self.ndjson = is_ndjson(path)
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+        self._f = None
+
+    def __enter__(self):
+        self._f = open_text(self._tmp_path, "w", like=self.path)
+        return self
+
+    def write(self, obj: Any):
+        f = self._f
+        if self.ndjson:
+            f.write(dumps_compact(obj))
+            f.write("\n")
+        elif self.compact:
+            f.write("[" if self.count == 0 else ",")
+            f.write(dumps_compact(obj))
+        else:
+            # как json.dump(list, indent=2): элемент с отступом 2, разделитель ",\n"
+            f.write("[\n" if self.count == 0 else ",\n")
+            f.write("\n".join("  " + line for line in dumps_pretty(obj).split("\n")))
+        self.count += 1
+
+    def write_all(self, records: Iterable[Any]):
+        for obj in records:
+            self.write(obj)
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None and not self.ndjson:
+                if self.count == 0:
+                    self._f.write("[]")
+                else:
+                    self._f.write("]" if self.compact else "\n]")
+        finally:
+            self._f.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.remove(self._tmp_path)
+        return False
+
+
+def write_records(path: str, records: Iterable[Any], compact: Optional[bool] = None) -> int:
+    """Записывает коллекцию потоково; возвращает число записей."""
+    with RecordWriter(path, compact) as w:
+        w.write_all(records)
+    return w.count
+
+
+def write_json(path: str, obj: Any, compact: Optional[bool] = None):
+    """Один документ (stats.json, сводки): indent=2 или компактно."""
+    compact = COMPACT_DEFAULT if compact is None else compact
+    tmp_path = path + ".tmp"
+    with open_text(tmp_path, "w", like=path) as f:
+        f.write(dumps_compact(obj) if compact else dumps_pretty(obj))
+    os.replace(tmp_path, path)
@@ -0,0 +1,191 @@
+# src/report_bundle.py
+"""
+Готовый набор файлов отчёта для веб-страницы статистики (Фаза 5).
+
+Страница не должна читать stats.json, competency_matrix.json и рекомендации
+целиком на каждый запрос. build_report_bundle после этапа 4 раскладывает всё
+в data/derived/report:
+
+    manifest.json                — список индустрий (имя, slug, шард, кратко цифры),
+                                   общие графики и хэши всех файлов набора
+    industries/<slug>.<хэш>.json — всё по одной индустрии: топы, дефициты,
+                                   избыточности, совпадения, рекомендация, ссылка на график
+    plots/...<хэш>.png           — копии графиков из data/derived/plots
+
+В имени файла — начало его sha256, поэтому файл не перезаписывается никогда:
+новое содержимое — новое имя. Манифест подменяется атомарно (tmp + os.replace)
+после записи всех файлов, а файлы, на которые он больше не ссылается, удаляются
+только после подмены — веб всегда видит согласованный набор. Страница
+подгружает только выбранную индустрию, и браузер может кэшировать файлы
+набора без перепроверки.
+"""
+import hashlib
+import os
+import shutil
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from plot_jobs import industry_slug
+from record_io import dumps_pretty, load_json
+
+BUNDLE_DIR = "data/derived/report"
+MANIFEST_NAME = "manifest.json"
+BUNDLE_VERSION = 2
+# сколько символов sha256 входит в имя файла набора
+HASH_IN_NAME = 16
+
+
+def _sha256_bytes(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _addressed(rel: str, digest: str) -> str:
+    """"industries/it.json" -> "industries/it.<хэш>.json": имя меняется вместе с содержимым."""
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{digest[:HASH_IN_NAME]}{ext}"
+
+
+def _write_addressed(bundle_dir: str, rel: str, raw: bytes) -> Tuple[str, str]:
+    digest = _sha256_bytes(raw)
+    rel = _addressed(rel, digest)
+    path = os.path.join(bundle_dir, rel)
+    # файл с таким именем уже содержит ровно эти байты
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(raw)
+        os.replace(path + ".tmp", path)
+    return rel, digest
+
+
+def _copy_addressed(src: str, bundle_dir: str, rel: str) -> Tuple[str, str]:
+    digest = _sha256_file(src)
+    rel = _addressed(rel, digest)
+    dst = os.path.join(bundle_dir, rel)
+    if not os.path.exists(dst):
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copyfile(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+    return rel, digest
+
+
+def _remove_unreferenced(bundle_dir: str, files: Dict[str, str]) -> int:
+    removed = 0
+    for root, _, names in os.walk(bundle_dir):
+        for name in names:
+            rel = os.path.relpath(os.path.join(root, name), bundle_dir).replace(os.sep, "/")
+            if rel != MANIFEST_NAME and rel not in files:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def build_report_bundle(
+    stats: dict,
+    industry_summaries: List[dict],
+    recommendations: Optional[Dict[str, str]] = None,
+    plots_dir: str = "data/derived/plots",
+    bundle_dir: str = BUNDLE_DIR,
+) -> dict:
+    """
+    stats — результат compute_stats, industry_summaries — сводки build_matrices,
+    recommendations — {индустрия: текст} из generate_recommendations.
+    Возвращает манифест.
+    """
+    recommendations = recommendations or {}
+    old_manifest = load_manifest(bundle_dir) or {}
+
+    files: Dict[str, str] = {}
+    summaries = {entry["industry"]: entry for entry in industry_summaries}
+
+    # ---------- графики ----------
+    global_plots = []
+    for name in sorted(os.listdir(plots_dir)) if os.path.isdir(plots_dir) else []:
+        if name.endswith(".png"):
+            rel, digest = _copy_addressed(os.path.join(plots_dir, name), bundle_dir, f"plots/{name}")
+            files[rel] = digest
+            global_plots.append(rel)
+
+    # ---------- шарды индустрий ----------
+    industries = []
+    for industry in sorted(set(stats) | set(summaries)):
+        slug = industry_slug(industry)
+        entry = stats.get(industry, {})
+        summary = summaries.get(industry, {})
+
+        plot = None
+        plot_src = os.path.join(plots_dir, "industries", f"{slug}.png")
+        if os.path.exists(plot_src):
+            plot, digest = _copy_addressed(plot_src, bundle_dir, f"plots/industries/{slug}.png")
+            files[plot] = digest
+
+        shard = {
+            "industry": industry,
+            "top_industry_competencies": entry.get("top_industry_competencies", []),
+            "top_project_competencies": entry.get("top_project_competencies", []),
+            "gaps": summary.get("gaps", entry.get("gaps", [])),
+            "redundancies": summary.get("redundancies", []),
+            "matches": summary.get("matches", []),
+            "total_demand_competencies": summary.get("total_demand_competencies", 0),
+            "total_supply_competencies": summary.get("total_supply_competencies", 0),
+            "recommendation": recommendations.get(industry),
+            "plot": plot,
+        }
+        rel, digest = _write_addressed(bundle_dir, f"industries/{slug}.json", dumps_pretty(shard).encode("utf-8"))
+        files[rel] = digest
+        industries.append({
+            "industry": industry,
+            "slug": slug,
+            "shard": rel,
+            "sha256": digest,
+            "gaps": len(shard["gaps"]),
+            "matches": len(shard["matches"]),
+            "redundancies": len(shard["redundancies"]),
+        })
+
+    # ---------- манифест ----------
+    changed = len(set(files) - set(old_manifest.get("files", {})))
+    if old_manifest.get("version") == BUNDLE_VERSION and old_manifest.get("files") == files:
+        manifest = old_manifest  # ничего не изменилось — сохраняем и generated_at
+    else:
+        manifest = {
+            "version": BUNDLE_VERSION,
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "industries": industries,
+            "global_plots": global_plots,
+            "files": files,
+        }
+        manifest_path = os.path.join(bundle_dir, MANIFEST_NAME)
+        os.makedirs(bundle_dir, exist_ok=True)
+        with open(manifest_path + ".tmp", "wb") as f:
+            f.write(dumps_pretty(manifest).encode("utf-8"))
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    # файлы прошлых наборов удаляются только после подмены манифеста
+    removed = _remove_unreferenced(bundle_dir, files)
+    print(
+        f"[INFO] Report bundle: {len(industries)} индустрий, новых файлов {changed}, "
+        f"удалено {removed} -> {bundle_dir}"
+    )
+    return manifest
+
+
+def load_manifest(bundle_dir: str = BUNDLE_DIR) -> Optional[dict]:
+    path = os.path.join(bundle_dir, MANIFEST_NAME)
+    return load_json(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    build_report_bundle(
+        load_json("data/derived/stats.json") or {},
+        load_json("data/derived/competency_gaps_and_redundancy.json") or [],
+        load_json("data/derived/recommendations_new.json") or {},
+    )
@@ -1,51 +1,259 @@
 # src/run_phase1_analysis.py
-from analyze_vacancies_llm import analyze_vacancies
-from analyze_projects_llm import analyze_projects
-from build_competency_matrix import build_matrices
-from generate_stats_and_reports import compute_stats, generate_recommendations
-# from filter_competency_matrix import main as filter_matrix
-from llm_client import reset_llama
+"""
+Фаза 1: разметка вакансий и проектов, матрица, статистика, отчёт.
 
-def main():
+Этапы объявлены графом (pipeline_dag): у каждого — входы, выходы, модули
+и параметры, от которых зависит результат. Этап, у которого ничего из
+этого не менялось с прошлого запуска, пропускается: после правки белого
+списка пересчитываются только матрица, статистика и отчёт, без LLM.
 
-    # 1) вакансии
-    analyze_vacancies(
-        "data/processed/vacancies_processed.json",
-        "data/derived/industry_competencies_llm.json",
-    )
+    python run_phase1_analysis.py                 # устаревшие этапы
+    python run_phase1_analysis.py --dry-run       # только план
+    python run_phase1_analysis.py --force vacancies
+    python run_phase1_analysis.py --refresh-recommendations FinTech   # заново, мимо кэша
+    python run_phase1_analysis.py --profile       # + отчёт data/derived/profiles/phase1-*.json
+"""
+import argparse
+import functools
+import os
+from typing import Callable, Dict, Optional, Sequence
+
+from analyze_projects_llm import MAX_NEW_TOKENS as PROJ_MAX_NEW_TOKENS
+from analyze_vacancies_llm import MAX_NEW_TOKENS as VAC_MAX_NEW_TOKENS
+from build_competency_matrix import STATE_PATH
+from competency_aggregates import STATS_COUNTS_PATH
+from competency_canon import EXTRA_ALIASES_PATH
+from demand_timeseries import RAW_DIR
+from llm_client import LLM_BACKEND, MODEL_NAME
+from llm_metrics import write_summary
+from matrix_index import INDEX_PATH
+from pipeline_dag import Stage, run_pipeline
+from record_io import load_json
+from report_bundle import BUNDLE_DIR
+from stage_profiler import RunProfiler
+from vocab_registry import VOCAB_PATH
+
+# >1 — делить LLM-этапы на несколько процессов (по одному на GPU)
+NUM_SHARDS = int(os.getenv("LLM_NUM_SHARDS", "1"))
+# путь к обученному competency_classifier (без расширения) — уверенные вакансии размечает он, а не LLM
+CLASSIFIER_PATH = os.getenv("COMPETENCY_CLASSIFIER_PATH") or None
+
+VACANCIES_INPUT = "data/processed/vacancies_processed.json"
+PROJECTS_INPUT = "data/projects_with_industries_full.json"
+WHITELIST = "data/whitelist_competencies.json"
+
+VACANCY_LABELS = "data/derived/industry_competencies_llm.json"
+PROJECT_LABELS = "data/derived/project_competencies_llm_clean_updated.json"
+MATRIX = "data/derived/competency_matrix.json"
+GAPS = "data/derived/competency_gaps_and_redundancy.json"
+MATRIX_FILTERED = "data/derived/competency_matrix_filtered.json"
+SIMILARITY = "data/derived/industry_similarity.json"
+STATS = "data/derived/stats.json"
+PLOTS_DIR = "data/derived/plots"
+RECOMMENDATIONS = "data/derived/recommendations_new.json"
+CUBE = "data/derived/demand_cube.json"
+DEMAND_IDS = "data/derived/industry_competencies.ids.npz"
+SUPPLY_IDS = "data/derived/project_competencies.ids.npz"
+
+LLM_CONFIG = {"model": MODEL_NAME, "backend": LLM_BACKEND, "model_path": os.getenv("LLM_MODEL_PATH")}
+
+
+# ---------- этапы (функции уровня модуля — CPU-этапы запускаются в пуле процессов) ----------
+
+def stage_vacancies():
+    from analyze_vacancies_llm import analyze_vacancies
+    from llm_client import reset_llama
+
+    analyze_vacancies(VACANCIES_INPUT, VACANCY_LABELS, num_shards=NUM_SHARDS, classifier_path=CLASSIFIER_PATH)
     reset_llama()
     print("Анализ вакансий закончен")
-    # 2) проекты
-    analyze_projects(
-        "data/projects_with_industries_full.json",
-        "data/derived/project_competencies_llm_clean_updated.json",
-    )
+
+
+def stage_demand_cube():
+    from demand_timeseries import update_cube
+
+    # спрос по неделям: добавляем в куб только новые выгрузки из data/raw
+    update_cube(labels_path=VACANCY_LABELS)
+
+
+def stage_projects():
+    from analyze_projects_llm import analyze_projects
+    from llm_client import reset_llama
+
+    analyze_projects(PROJECTS_INPUT, PROJECT_LABELS, num_shards=NUM_SHARDS)
     reset_llama()
     print("Анализ проектов закончен")
-    # 3) матрица спрос/предложение
-    build_matrices(
-        "data/derived/industry_competencies_llm.json",
-        "data/derived/project_competencies_llm_clean_updated.json",
-        "data/derived/competency_matrix.json",
-        "data/derived/competency_gaps_and_redundancy.json",
+
+
+def stage_encode():
+    from vocab_registry import encode_stage_outputs
+
+    # единственное чтение разметки для анализа: общий словарь id, корпуса в виде
+    # массивов id (по ним stage_analysis строит матрицу) и счётчики для stats.json
+    encode_stage_outputs(
+        VACANCY_LABELS, PROJECT_LABELS, DEMAND_IDS, SUPPLY_IDS, VOCAB_PATH, stats_output=STATS_COUNTS_PATH
     )
-    print("Матрицы построены")
-    # 3.1) фильтрация матрицы по белому списку
-    # filter_matrix()  # создаст competency_matrix_filtered.json
-    print("Матрицы отфильтрованы")
-    # 4) статистика + рекомендации
-    stats = compute_stats(
-        "data/derived/industry_competencies_llm.json",
-        "data/derived/project_competencies_llm_clean_updated.json",
-        "data/derived/competency_gaps_and_redundancy.json",
-        "data/derived/stats.json",
+
+
+def stage_analysis():
+    from build_competency_matrix import build_matrices
+    from competency_aggregates import CorpusAggregates
+    from competency_similarity import build_similarity
+    from generate_stats_and_reports import compute_stats
+
+    # разметка не перечитывается: счётчики — из массивов id и файла счётчиков этапа encode
+    aggregates = CorpusAggregates.from_encoded(DEMAND_IDS, SUPPLY_IDS, VOCAB_PATH, STATS_COUNTS_PATH)
+    _, industry_summaries = build_matrices(
+        VACANCY_LABELS,
+        PROJECT_LABELS,
+        MATRIX,
+        GAPS,
+        state_output=STATE_PATH,  # для последующих apply_delta без пересборки
+        index_output=INDEX_PATH,  # бинарный индекс для быстрых запросов (веб, отчёты)
+        # фильтрация матрицы по белому списку — в том же проходе
+        whitelist_path=WHITELIST,
+        filtered_output=MATRIX_FILTERED,
+        aggregates=aggregates,
+        # строки матрицы — по массивам id этапа encode (classify_encoded)
+        encoded=(DEMAND_IDS, SUPPLY_IDS, VOCAB_PATH),
     )
-    print("Статистика собрана")
-    generate_recommendations(
-        stats,
-        "data/derived/competency_gaps_and_redundancy.json",
-        "data/derived/recommendations_new.json",
+    print("Матрицы построены и отфильтрованы")
+    # сходство спроса и предложения между индустриями
+    build_similarity(VACANCY_LABELS, PROJECT_LABELS, SIMILARITY, aggregates=aggregates)
+    compute_stats(
+        VACANCY_LABELS,
+        PROJECT_LABELS,
+        GAPS,
+        STATS,
+        viz_dir=PLOTS_DIR,
+        aggregates=aggregates,
+        gaps_info=industry_summaries,
+        per_industry_plots=True,  # data/derived/plots/industries/*.png
     )
+    print("Статистика собрана")
+
+
+def stage_recommendations(refresh: Sequence[str] = ()):
+    from generate_stats_and_reports import generate_recommendations
+
+    # refresh — индустрии, которым ответ генерируется заново, даже если он есть в кэше ("all" — всем)
+    force_refresh = True if "all" in refresh else list(refresh)
+    generate_recommendations(load_json(STATS), GAPS, RECOMMENDATIONS, force_refresh=force_refresh)
     print("Рекомендации сгенерированы")
+
+
+def stage_report():
+    from report_bundle import build_report_bundle
+
+    # набор отчёта для веб-страницы: шарды по индустриям + графики + манифест
+    build_report_bundle(load_json(STATS), load_json(GAPS), load_json(RECOMMENDATIONS), plots_dir=PLOTS_DIR)
+
+
+def build_stages(refresh_recommendations: Sequence[str] = ()):
+    canon = ["competency_canon", EXTRA_ALIASES_PATH]
+    return [
+        Stage(
+            "vacancies", stage_vacancies, kind="llm",
+            inputs=[VACANCIES_INPUT, canon[1]] + ([CLASSIFIER_PATH + ".npz", CLASSIFIER_PATH + ".json"] if CLASSIFIER_PATH else []),
+            outputs=[VACANCY_LABELS],
+            code=["analyze_vacancies_llm", "llm_prompts", "llm_utils", "competency_classifier", canon[0]],
+            config={**LLM_CONFIG, "max_new_tokens": VAC_MAX_NEW_TOKENS, "classifier": CLASSIFIER_PATH},
+        ),
+        Stage(
+            "demand_cube", stage_demand_cube,
+            inputs=[RAW_DIR, VACANCY_LABELS],
+            outputs=[CUBE],
+            code=["demand_timeseries"],
+        ),
+        Stage(
+            "projects", stage_projects, kind="llm",
+            inputs=[PROJECTS_INPUT, canon[1]],
+            outputs=[PROJECT_LABELS],
+            code=["analyze_projects_llm", "llm_prompts", "llm_utils", canon[0]],
+            config={**LLM_CONFIG, "max_new_tokens": PROJ_MAX_NEW_TOKENS},
+        ),
+        Stage(
+            "encode", stage_encode,
+            inputs=[VACANCY_LABELS, PROJECT_LABELS],
+            outputs=[DEMAND_IDS, SUPPLY_IDS, VOCAB_PATH, STATS_COUNTS_PATH],
+            code=["vocab_registry", "competency_aggregates"],
+        ),
+        Stage(
+            "analysis", stage_analysis,
+            inputs=[DEMAND_IDS, SUPPLY_IDS, VOCAB_PATH, STATS_COUNTS_PATH, WHITELIST, canon[1]],
+            outputs=[MATRIX, GAPS, MATRIX_FILTERED, STATE_PATH, INDEX_PATH, SIMILARITY, STATS, PLOTS_DIR],
+            code=[
+                "competency_aggregates", "build_competency_matrix", "competency_matrix_sparse", "vocab_registry",
+                "filter_competency_matrix", "matrix_index",
+                "competency_similarity", "generate_stats_and_reports", "plot_jobs", canon[0],
+            ],
+            config={key: os.getenv(key) for key in ("PLOT_SCATTER_DENSE_THRESHOLD", "PLOT_SCATTER_TOP_LABELS")},
+        ),
+        Stage(
+            "recommendations", functools.partial(stage_recommendations, tuple(refresh_recommendations)), kind="llm",
+            inputs=[STATS, GAPS],
+            outputs=[RECOMMENDATIONS],
+            code=["generate_stats_and_reports", "llm_prompts"],
+            config=LLM_CONFIG,
+        ),
+        Stage(
+            "report", stage_report,
+            inputs=[STATS, GAPS, RECOMMENDATIONS, PLOTS_DIR],
+            outputs=[BUNDLE_DIR],
+            code=["report_bundle"],
+        ),
+    ]
+
+
+def run_phase1(
+    force: Sequence[str] = (),
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+    profile: bool = False,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+    refresh_recommendations: Sequence[str] = (),
+) -> Dict[str, str]:
+    """
+    Запуск графа этапов из кода (фоновые задачи веба); progress — см. pipeline_dag.run_pipeline.
+    refresh_recommendations — индустрии (или "all"), чьи рекомендации перегенерировать мимо кэша:
+    этап recommendations тогда перезапускается, даже если его входы не менялись.
+    """
+    stages = build_stages(refresh_recommendations)
+    if refresh_recommendations:
+        force = list(force) + ["recommendations"]
+    profiler = RunProfiler.from_env("phase1", force=profile)
+    try:
+        result = run_pipeline(
+            stages, force=force, dry_run=dry_run, workers=workers, profiler=profiler, progress=progress
+        )
+    finally:
+        if not dry_run:
+            profiler.write()
+    if not dry_run and any(result[s.name] == "run" for s in stages if s.kind == "llm"):
+        # сводка по токенам/скорости LLM за этот запуск
+        write_summary()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="перезапустить этапы (all — все)")
+    parser.add_argument("--dry-run", action="store_true", help="показать, какие этапы устарели, и выйти")
+    parser.add_argument("--workers", type=int, default=None, help="процессов для CPU-этапов (1 — последовательно)")
+    parser.add_argument("--profile", action="store_true", help="замеры по этапам (см. stage_profiler, PIPELINE_PROFILE)")
+    parser.add_argument(
+        "--refresh-recommendations", nargs="+", default=[], metavar="INDUSTRY",
+        help="перегенерировать рекомендации этих индустрий мимо кэша (all — всех)",
+    )
+    args = parser.parse_args()
+    run_phase1(
+        force=args.force,
+        dry_run=args.dry_run,
+        workers=args.workers,
+        profile=args.profile,
+        refresh_recommendations=args.refresh_recommendations,
+    )
+
+
 if __name__ == "__main__":
     main()
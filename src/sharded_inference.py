@@ -0,0 +1,152 @@
+# src/sharded_inference.py
+"""
+Data-parallel инференс: промпты делятся на N шардов, каждый шард
+обрабатывает отдельный процесс со своим LlamaClient (своя GPU или свой бэкенд).
+
+Шарды балансируются по длине промптов (жадный LPT: самый длинный промпт —
+в наименее загруженный шард), результаты собираются в исходном порядке.
+
+Процессы запускаются через spawn: CUDA не переживает fork, а окружение
+(CUDA_VISIBLE_DEVICES, LLM_BACKEND, LLM_MODEL_PATH, ...) нужно выставить
+до того, как воркер импортирует torch/vllm.
+"""
+import heapq
+import multiprocessing as mp
+import os
+import queue
+import traceback
+from typing import Dict, List, Optional, Sequence
+
+from llm_metrics import METRICS_PATH, RUN_ID, merge_shard_metrics
+
+
+def shard_metrics_path(metrics_path: str, shard: int) -> str:
+    """Файл метрик воркера: data/derived/llm_metrics.jsonl -> data/derived/llm_metrics.shard0.jsonl."""
+    root, ext = os.path.splitext(metrics_path)
+    return f"{root}.shard{shard}{ext}"
+
+
+def partition_by_length(prompts: Sequence[str], num_shards: int) -> List[List[int]]:
+    """
+    Индексы промптов по шардам так, чтобы суммарная длина шардов была близкой.
+    Внутри шарда индексы идут по возрастанию — порядок внутри файла сохраняется.
+    """
+    num_shards = max(1, min(num_shards, len(prompts)))
+    heap = [(0, shard) for shard in range(num_shards)]
+    shards: List[List[int]] = [[] for _ in range(num_shards)]
+
+    for idx in sorted(range(len(prompts)), key=lambda i: len(prompts[i]), reverse=True):
+        load, shard = heapq.heappop(heap)
+        shards[shard].append(idx)
+        heapq.heappush(heap, (load + len(prompts[idx]), shard))
+
+    return [sorted(s) for s in shards]
+
+
+def _shard_worker(shard_id, indices, prompts, adapter_dir, env, gen_kwargs, result_queue, metrics_path, run_id):
+    try:
+        os.environ.update(env or {})
+
+        # импорт только после выставления окружения
+        from llm_client import get_llama
+        from llm_metrics import InferenceMetrics
+
+        llama = get_llama(adapter_dir)
+        # свой файл на воркер (без гонок при записи), но run_id родителя — см. merge_shard_metrics
+        llama.metrics = InferenceMetrics(metrics_path, run_id=run_id)
+        texts = llama.generate(prompts, **gen_kwargs)
+        result_queue.put(("ok", shard_id, indices, texts, llama.last_call_metrics))
+    except Exception:
+        result_queue.put(("error", shard_id, indices, traceback.format_exc(), None))
+
+
+def generate_sharded(
+    prompts: List[str],
+    *,
+    num_workers: int,
+    adapter_dir: Optional[str] = None,
+    worker_env: Optional[List[Dict[str, str]]] = None,
+    metrics_path: Optional[str] = METRICS_PATH,
+    **gen_kwargs,
+) -> List[str]:
+    """
+    То же, что LlamaClient.generate(prompts, **gen_kwargs), но на num_workers процессах.
+
+    worker_env — окружение для каждого воркера. По умолчанию воркер i получает
+    CUDA_VISIBLE_DEVICES=i. Через него же можно развести воркеры по разным
+    бэкендам (LLM_BACKEND, LLM_MODEL_PATH).
+    metrics_path — основной JSONL метрик: метрики воркеров с RUN_ID этого процесса
+    сливаются в него после завершения, так что write_summary видит шардированные этапы.
+    """
+    if not prompts:
+        return []
+
+    shards = partition_by_length(prompts, num_workers)
+    if worker_env is None:
+        worker_env = [{"CUDA_VISIBLE_DEVICES": str(i)} for i in range(len(shards))]
+    if len(worker_env) < len(shards):
+        raise ValueError(f"worker_env задан для {len(worker_env)} воркеров, а шардов {len(shards)}")
+
+    shard_paths = [shard_metrics_path(metrics_path, i) if metrics_path else None for i in range(len(shards))]
+    for path in shard_paths:
+        if path and os.path.exists(path):
+            os.remove(path)  # остаток упавшего прошлого запуска
+
+    ctx = mp.get_context("spawn")
+    result_queue = ctx.Queue()
+    procs = []
+    for shard_id, indices in enumerate(shards):
+        p = ctx.Process(
+            target=_shard_worker,
+            args=(
+                shard_id,
+                indices,
+                [prompts[i] for i in indices],
+                adapter_dir,
+                worker_env[shard_id],
+                gen_kwargs,
+                result_queue,
+                shard_paths[shard_id],
+                RUN_ID,
+            ),
+            name=f"llm-shard-{shard_id}",
+        )
+        p.start()
+        procs.append(p)
+        print(f"[SHARD] Воркер {shard_id}: {len(indices)} промптов, env={worker_env[shard_id]}")
+
+    results: List[Optional[str]] = [None] * len(prompts)
+    errors = []
+    try:
+        # результаты читаем до join: большой ответ в очереди иначе блокирует выход воркера
+        pending = set(range(len(procs)))
+        while pending:
+            try:
+                status, shard_id, indices, payload, call_metrics = result_queue.get(timeout=5)
+            except queue.Empty:
+                # воркер мог упасть, не успев ничего положить в очередь (OOM, segfault)
+                dead = [i for i in pending if not procs[i].is_alive() and procs[i].exitcode != 0]
+                for i in dead:
+                    errors.append(f"шард {i}: процесс завершился с кодом {procs[i].exitcode}")
+                    pending.discard(i)
+                continue
+            pending.discard(shard_id)
+            if status != "ok":
+                errors.append(f"шард {shard_id}:\n{payload}")
+                continue
+            for idx, text in zip(indices, payload):
+                results[idx] = text
+            if call_metrics:
+                print(
+                    f"[SHARD] Воркер {shard_id} готов: {call_metrics['requests']} запросов, "
+                    f"{call_metrics['wall_s']} c, {call_metrics['gen_tokens_per_s']} ток/с"
+                )
+    finally:
+        for p in procs:
+            p.join()
+        if metrics_path:
+            merge_shard_metrics(shard_paths, metrics_path)
+
+    if errors:
+        raise RuntimeError("Ошибка в шардированном инференсе:\n" + "\n".join(errors))
+    return results
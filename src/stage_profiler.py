@@ -0,0 +1,310 @@
+# src/stage_profiler.py
+"""
+Профилирование этапов пайплайна (run_phase1_analysis, main_collect).
+
+Включается переменной PIPELINE_PROFILE (или флагом --profile):
+    PIPELINE_PROFILE=1                       — время и память по этапам
+    PIPELINE_PROFILE=1,cprofile              — + cProfile каждого этапа (.prof и топ функций)
+    PIPELINE_PROFILE=1,tracemalloc           — + пик и топ мест выделения памяти Python
+Без неё profiler.stage(...) ничего не делает.
+
+По каждому этапу: wall, CPU процесса и дочерних процессов, RSS в начале
+и в конце, пиковый RSS (процесс + дочерние, фоновые замеры). Отчёт —
+data/derived/profiles/<run>-<время>.json, рядом .prof-файлы cProfile.
+
+Сравнение двух запусков:
+    python stage_profiler.py compare data/derived/profiles/a.json data/derived/profiles/b.json
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from record_io import load_json, write_json
+
+try:
+    import psutil
+except ImportError:  # без psutil RSS читается из /proc (только Linux), дочерние процессы не учитываются
+    psutil = None
+
+PROFILE_DIR = "data/derived/profiles"
+MODES = ("cprofile", "tracemalloc")
+SAMPLE_INTERVAL = 0.05
+TOP_N = 20
+
+
+def profile_modes_from_env() -> Optional[List[str]]:
+    """None — профилирование выключено; иначе список доп. режимов (cprofile, tracemalloc)."""
+    raw = os.getenv("PIPELINE_PROFILE", "").strip()
+    if raw in ("", "0"):
+        return None
+    modes = [m.strip() for m in raw.split(",") if m.strip() and m.strip() != "1"]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        raise ValueError(f"PIPELINE_PROFILE: неизвестные режимы {sorted(unknown)} (есть {', '.join(MODES)})")
+    return modes
+
+
+# ---------- память ----------
+
+def current_rss() -> int:
+    """RSS процесса и его дочерних процессов, байты."""
+    if psutil is not None:
+        proc = psutil.Process()
+        total = proc.memory_info().rss
+        for child in proc.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass  # процесс успел завершиться
+        return total
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss — пик за всё время процесса (в КБ на Linux), лучше, чем ничего
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class _PeakSampler(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = current_rss()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss())
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+def _mb(n: int) -> float:
+    return round(n / (1024 * 1024), 1)
+
+
+# ---------- отчёты cProfile / tracemalloc ----------
+
+def _cprofile_top(profile: cProfile.Profile) -> List[dict]:
+    stats = pstats.Stats(profile, stream=io.StringIO()).sort_stats("cumulative")
+    rows = []
+    for func in stats.fcn_list[:TOP_N]:
+        cc, nc, tt, ct, _ = stats.stats[func]
+        filename, line, name = func
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({name})",
+            "calls": nc,
+            "tottime_s": round(tt, 4),
+            "cumtime_s": round(ct, 4),
+        })
+    return rows
+
+
+def _tracemalloc_top(snapshot: tracemalloc.Snapshot) -> List[dict]:
+    snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),))
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:TOP_N]
+    ]
+
+
+# ---------- профайлер запуска ----------
+
+class RunProfiler:
+    """
+    profiler = RunProfiler("phase1", modes=[])   # modes=None — выключен
+    with profiler.stage("analysis"):
+        ...
+    profiler.write()
+    """
+
+    def __init__(self, run: str, modes: Optional[Sequence[str]] = None, out_dir: str = PROFILE_DIR, run_id: Optional[str] = None):
+        self.enabled = modes is not None
+        self.run = run
+        self.modes = list(modes or [])
+        self.out_dir = out_dir
+        self.run_id = run_id or f"{run}-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.stages: List[dict] = []
+
+    @classmethod
+    def from_env(cls, run: str, force: bool = False) -> "RunProfiler":
+        modes = profile_modes_from_env()
+        return cls(run, modes if modes is not None else ([] if force else None))
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        record = {"stage": name, "status": "ok"}
+        sampler = _PeakSampler()
+        record["rss_start_mb"] = _mb(sampler.peak)
+        sampler.start()
+        profile = cProfile.Profile() if "cprofile" in self.modes else None
+        trace = "tracemalloc" in self.modes and not tracemalloc.is_tracing()
+        if trace:
+            tracemalloc.start()
+
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        except BaseException:
+            record["status"] = "failed"
+            raise
+        finally:
+            if profile is not None:
+                profile.disable()
+            record["wall_s"] = round(time.perf_counter() - start, 3)
+            after_self = resource.getrusage(resource.RUSAGE_SELF)
+            after_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+            record["cpu_s"] = round(
+                (after_self.ru_utime - usage_self.ru_utime) + (after_self.ru_stime - usage_self.ru_stime), 3
+            )
+            # дочерние процессы учитываются, только когда они завершились (пулы, шарды LLM)
+            record["cpu_children_s"] = round(
+                (after_children.ru_utime - usage_children.ru_utime) + (after_children.ru_stime - usage_children.ru_stime), 3
+            )
+            record["peak_rss_mb"] = _mb(sampler.stop())
+            record["rss_end_mb"] = _mb(current_rss())
+
+            if trace:
+                _, peak = tracemalloc.get_traced_memory()
+                record["tracemalloc"] = {"peak_mb": _mb(peak), "top": _tracemalloc_top(tracemalloc.take_snapshot())}
+                tracemalloc.stop()
+            if profile is not None:
+                os.makedirs(self.out_dir, exist_ok=True)
+                prof_path = os.path.join(self.out_dir, f"{self.run_id}.{name}.prof")
+                profile.dump_stats(prof_path)
+                record["cprofile"] = {"file": prof_path, "top": _cprofile_top(profile)}
+            self.stages.append(record)
+            print(
+                f"[BENCH] {name}: wall {record['wall_s']:.2f} s, cpu {record['cpu_s']:.2f} s, "
+                f"peak RSS {record['peak_rss_mb']} MB"
+            )
+
+    def add(self, record: dict):
+        """Запись этапа, снятая в другом процессе (пул pipeline_dag)."""
+        if self.enabled and record:
+            self.stages.append(record)
+
+    def report(self) -> dict:
+        return {
+            "run": self.run,
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "argv": sys.argv,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "modes": self.modes,
+            "stages": self.stages,
+        }
+
+    def write(self) -> Optional[str]:
+        if not self.enabled:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f"{self.run_id}.json")
+        write_json(path, self.report())
+        print(f"[INFO] Profile report saved to: {path}")
+        return path
+
+
+# ---------- сравнение ----------
+
+METRICS = ("wall_s", "cpu_s", "cpu_children_s", "peak_rss_mb")
+
+
+def compare_reports(base: dict, new: dict) -> List[dict]:
+    """Строки по этапам (в порядке нового запуска, затем пропавшие): значения и разница."""
+    def by_stage(report):
+        # этап мог выполняться несколько раз — суммируем время, пик берём максимальный
+        result: Dict[str, dict] = {}
+        for rec in report.get("stages", []):
+            agg = result.setdefault(rec["stage"], {m: 0.0 for m in METRICS})
+            for m in METRICS:
+                value = rec.get(m, 0.0)
+                agg[m] = max(agg[m], value) if m == "peak_rss_mb" else agg[m] + value
+        return result
+
+    a, b = by_stage(base), by_stage(new)
+    rows = []
+    for stage in list(b) + [s for s in a if s not in b]:
+        row = {"stage": stage}
+        for m in METRICS:
+            old, cur = a.get(stage, {}).get(m), b.get(stage, {}).get(m)
+            row[m] = {
+                "base": old,
+                "new": cur,
+                "delta": round(cur - old, 3) if old is not None and cur is not None else None,
+                "ratio": round(cur / old, 3) if old and cur is not None else None,
+            }
+        rows.append(row)
+    return rows
+
+
+def _format_compare(rows: List[dict]) -> str:
+    def cell(v):
+        return "-" if v is None else f"{v:.2f}"
+
+    lines = [f"{'stage':<20}" + "".join(f"{m:>30}" for m in METRICS)]
+    for row in rows:
+        parts = []
+        for m in METRICS:
+            c = row[m]
+            ratio = f" (x{c['ratio']:.2f})" if c["ratio"] is not None else ""
+            parts.append(f"{cell(c['base']) + ' -> ' + cell(c['new']) + ratio:>30}")
+        lines.append(f"{row['stage']:<20}" + "".join(parts))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    cmp_parser = sub.add_parser("compare", help="сравнить два отчёта")
+    cmp_parser.add_argument("base")
+    cmp_parser.add_argument("new")
+    cmp_parser.add_argument("--json", action="store_true", help="вывести строки сравнения как JSON")
+    list_parser = sub.add_parser("list", help="отчёты в папке профилей")
+    list_parser.add_argument("--dir", default=PROFILE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        rows = compare_reports(load_json(args.base), load_json(args.new))
+        print(json.dumps(rows, ensure_ascii=False, indent=2) if args.json else _format_compare(rows))
+    else:
+        names = sorted(n for n in os.listdir(args.dir) if n.endswith(".json")) if os.path.isdir(args.dir) else []
+        for name in names:
+            report = load_json(os.path.join(args.dir, name))
+            total = sum(rec.get("wall_s", 0) for rec in report.get("stages", []))
+            print(f"{name:<50} {len(report.get('stages', [])):>3} этапов, {total:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# src/tests/conftest.py
+# модули пайплайна — плоские скрипты в src/, импортируются по имени (как при запуске из src/)
+import os
+import sys
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,37 @@
+# src/tests/test_competency_aggregates.py
+import json
+
+from competency_aggregates import CorpusAggregates, aggregate_inputs
+from vocab_registry import encode_stage_outputs
+
+VACANCIES = [
+    {"vacancy_id": "1", "industry": "IT", "competencies": ["Python", "SQL", "Python"]},
+    {"vacancy_id": "2", "industry": "Финтех", "competencies": "Excel, SQL"},
+    {"vacancy_id": "3", "industry": None, "competencies": [{"name": "Git"}, "-", "Docker"]},
+    {"vacancy_id": "4", "industry": "Медицина", "competencies": []},
+]
+PROJECTS = [
+    {"project_id": 1, "industry": "IT/Финтех", "competencies": ["SQL", "Python"]},
+    {"project_id": 2, "industry": "", "competencies": ["Docker"]},
+    {"project_id": 3, "industry": "EdTech", "competencies": None},
+]
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_from_encoded_matches_single_pass(tmp_path):
+    vacancies = _write(tmp_path / "vacancies.json", VACANCIES)
+    projects = _write(tmp_path / "projects.json", PROJECTS)
+    paths = [str(tmp_path / name) for name in ("demand.ids.npz", "supply.ids.npz", "vocab.txt", "counts.json")]
+    encode_stage_outputs(vacancies, projects, *paths[:3], stats_output=paths[3])
+
+    expected = aggregate_inputs(vacancies, projects)
+    got = CorpusAggregates.from_encoded(*paths)
+    for key in ("demand", "supply", "industry_counts", "project_counts"):
+        assert dict(getattr(got, key)) == dict(getattr(expected, key)), key
+    assert got.global_industry.most_common() == expected.global_industry.most_common()
+    assert got.global_project.most_common() == expected.global_project.most_common()
+    assert (got.n_vacancies, got.n_projects) == (4, 3)
@@ -0,0 +1,29 @@
+# src/tests/test_competency_canon.py
+import json
+
+import competency_canon
+from competency_canon import canonicalize, canonicalize_list, split_competency_string
+
+
+def test_split_returns_fresh_list():
+    first = split_competency_string("Python, SQL/Go")
+    assert first == ["Python", "SQL", "Go"]
+    first.append("мусор")
+    # кэш хранит кортеж — изменение результата не портит следующий вызов
+    assert split_competency_string("Python, SQL/Go") == ["Python", "SQL", "Go"]
+
+
+def test_canonicalize_list_merges_aliases():
+    assert canonicalize_list(["js, Python", "JavaScript", "python"]) == ["JavaScript", "Python"]
+
+
+def test_extra_aliases_path_does_not_depend_on_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert competency_canon.EXTRA_ALIASES_PATH.startswith(competency_canon.os.path.dirname(competency_canon.__file__))
+
+    path = tmp_path / "aliases.json"
+    path.write_text(json.dumps({"aliases": {"постгрес": "PostgreSQL"}}, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(competency_canon, "ALIASES", dict(competency_canon.ALIASES))
+    assert competency_canon.load_extra_aliases(str(path)) == 1
+    assert canonicalize("Постгрес") == "PostgreSQL"
+    canonicalize.cache_clear()
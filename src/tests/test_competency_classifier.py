@@ -0,0 +1,59 @@
+# src/tests/test_competency_classifier.py
+import numpy as np
+
+from competency_classifier import CompetencyClassifier, _features, route_vacancies
+
+TOY = [
+    ("Backend разработчик python django rest", ["Python", "Django"]),
+    ("Python разработчик django orm", ["Python", "Django"]),
+    ("Разработчик на python и django", ["Python", "Django"]),
+    ("Аналитик sql postgres отчёты", ["SQL"]),
+    ("SQL аналитик postgres витрины", ["SQL"]),
+    ("Аналитик данных sql запросы", ["SQL"]),
+    ("Дизайнер figma прототипы интерфейсов", ["Figma"]),
+    ("UI дизайнер figma макеты", ["Figma"]),
+    ("Продуктовый дизайнер figma", ["Figma"]),
+]
+
+
+def _samples():
+    return [(_features(text, "IT", "vacancy"), labels) for text, labels in TOY]
+
+
+def _train():
+    return CompetencyClassifier.train(_samples(), min_label_count=2, min_feature_df=1, epochs=300, lr=0.1, threshold=0.8)
+
+
+def test_fit_predict_toy_corpus():
+    clf = _train()
+    assert clf.labels == ["Django", "Figma", "Python", "SQL"]
+
+    preds = clf.predict([feats for feats, _ in _samples()])
+    for (comps, confident), (_, gold) in zip(preds, _samples()):
+        assert confident
+        assert sorted(comps) == sorted(gold)
+
+    new = clf.predict([_features("Ищем python django разработчика", "IT", "vacancy")])
+    assert sorted(new[0][0]) == ["Django", "Python"]
+
+
+def test_unknown_text_goes_to_llm():
+    clf = _train()
+    vacancies = [
+        {"title": "Аналитик", "description": "sql postgres", "industry": "IT"},
+        {"title": "Водитель", "description": "категория C", "industry": "IT"},
+    ]
+    labelled, to_llm, report = route_vacancies(clf, vacancies)
+    assert labelled == {0: ["SQL"]}
+    assert to_llm == [1]
+    assert report["llm_traffic_saved"] == 0.5
+
+
+def test_save_load_roundtrip(tmp_path):
+    clf = _train()
+    path = str(tmp_path / "clf")
+    clf.save(path)
+    loaded = CompetencyClassifier.load(path)
+    feats = [feats for feats, _ in _samples()]
+    assert loaded.labels == clf.labels
+    assert np.allclose(loaded.predict_proba(feats), clf.predict_proba(feats))
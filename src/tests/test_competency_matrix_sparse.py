@@ -0,0 +1,69 @@
+# src/tests/test_competency_matrix_sparse.py
+import json
+
+from build_competency_matrix import build_matrices
+from competency_matrix_sparse import classify_encoded_files
+from vocab_registry import Vocabulary, encode_stage_outputs
+
+VACANCIES = [
+    {"vacancy_id": "1", "industry": "IT", "competencies": ["Python", "SQL", "Python"]},
+    {"vacancy_id": "2", "industry": "IT", "competencies": "Docker, Kubernetes"},
+    {"vacancy_id": "3", "industry": "Финтех", "competencies": ["SQL", "-", "", None, "Excel"]},
+    {"vacancy_id": "4", "industry": None, "competencies": ["Коммуникация"]},
+    {"vacancy_id": "5", "industry": "Ритейл", "competencies": "-"},
+    {"vacancy_id": "6", "industry": "ai", "competencies": ["python", "ML"]},
+]
+PROJECTS = [
+    {"project_id": 1, "industry": "IT/Финтех", "competencies": ["Python", "Excel"]},
+    {"project_id": 2, "industry": "AI/EdTech", "competencies": ["ML", "Python"]},
+    {"project_id": 3, "industry": " / ", "competencies": ["Figma"]},
+    {"project_id": 4, "industry": "IT", "competencies": []},
+    {"project_id": 5, "industry": "Ритейл", "competencies": ["Коммуникация", "Коммуникация"]},
+]
+
+
+def _inputs(tmp_path):
+    industry_input = tmp_path / "vacancies.json"
+    project_input = tmp_path / "projects.json"
+    industry_input.write_text(json.dumps(VACANCIES, ensure_ascii=False), encoding="utf-8")
+    project_input.write_text(json.dumps(PROJECTS, ensure_ascii=False), encoding="utf-8")
+    return str(industry_input), str(project_input)
+
+
+def _build(tmp_path, name, **kwargs):
+    industry_input, project_input = _inputs(tmp_path)
+    matrix, gaps = tmp_path / f"{name}_matrix.json", tmp_path / f"{name}_gaps.json"
+    result = build_matrices(industry_input, project_input, str(matrix), str(gaps), **kwargs)
+    return result, matrix.read_bytes(), gaps.read_bytes()
+
+
+def _encode(tmp_path, vocab_path):
+    industry_input, project_input = _inputs(tmp_path)
+    demand_ids, supply_ids = str(tmp_path / "d.ids.npz"), str(tmp_path / "s.ids.npz")
+    encode_stage_outputs(industry_input, project_input, demand_ids, supply_ids, vocab_path)
+    return demand_ids, supply_ids, vocab_path
+
+
+def test_encoded_path_matches_counters(tmp_path):
+    python_result, python_matrix, python_gaps = _build(tmp_path, "python")
+    encoded = _encode(tmp_path, str(tmp_path / "vocab.txt"))
+    sparse_result, sparse_matrix, sparse_gaps = _build(tmp_path, "sparse", encoded=encoded)
+
+    assert sparse_result == python_result
+    assert sparse_matrix == python_matrix
+    assert sparse_gaps == python_gaps
+
+    rows = {(r["industry"], r["competency"]): r for r in python_result[0]}
+    assert rows[("IT", "Python")] == {"industry": "IT", "competency": "Python", "demand": 2, "supply": 1, "status": "match"}
+    assert rows[("Unknown", "Figma")]["status"] == "redundant"
+    assert rows[("Финтех", "SQL")]["status"] == "gap"
+
+
+def test_encoded_files_with_persisted_vocab(tmp_path):
+    vocab_path = str(tmp_path / "vocab.txt")
+    # словарь прошлых запусков: лишние и иначе упорядоченные имена не меняют вывод
+    Vocabulary(["Zeta", "ML", "Удалённая", "Python"], ["Zz", "IT", "Архив"]).save(vocab_path)
+    encoded = _encode(tmp_path, vocab_path)
+
+    python_result, _, _ = _build(tmp_path, "python")
+    assert classify_encoded_files(*encoded) == python_result
@@ -0,0 +1,63 @@
+# src/tests/test_competency_synonyms.py
+from collections import Counter
+
+import pytest
+
+from competency_synonyms import find_synonym_pairs, match_key, resolve_synonyms
+
+COUNTS = Counter({
+    "PostgreSQL": 50, "Postgres": 5, "Постгрес": 2, "PostgreSQL DB": 3,
+    "Python": 40, "Go": 10, "C#": 9, "C": 4, "Docker": 20, "Kubernetes": 11,
+})
+
+
+def test_match_key_transliterates_and_drops_generic_suffix():
+    assert match_key("Постгрес") == "postgres"
+    assert match_key("PostgreSQL DB") == "postgresql"
+
+
+def test_variants_merge_into_most_frequent_spelling():
+    result = resolve_synonyms(COUNTS)
+    assert result["aliases"] == {"Postgres": "PostgreSQL", "PostgreSQL DB": "PostgreSQL", "Постгрес": "PostgreSQL"}
+    assert result["merged_away"] == 3
+    assert result["groups"][0]["canonical"] == "PostgreSQL"
+
+
+def test_short_and_unrelated_names_are_left_alone():
+    names = sorted(COUNTS)
+    merged = {names[i] for i, j, _ in find_synonym_pairs(names)} | {names[j] for i, j, _ in find_synonym_pairs(names)}
+    assert merged.isdisjoint({"Go", "C#", "C", "Docker", "Kubernetes", "Python"})
+
+
+@pytest.mark.parametrize("a, b", [
+    ("работа с кредиторской задолженностью", "работа с дебиторской задолженностью"),
+    ("тестирование", "A/B-тестирование"),
+    ("Power", "Power BI"),
+    ("консультация пациентов", "консультация клиентов"),
+    ("администрирование сайта", "администрирование"),
+    ("администрирование 1С", "администрирование"),
+    ("разработка предложений", "разработка веб-приложения"),
+    ("Scala", "Scalable"),
+    ("Swift", "SwiftUI"),
+])
+def test_different_competencies_are_not_merged(a, b):
+    assert find_synonym_pairs([a, b]) == []
+    assert resolve_synonyms(Counter({a: 5, b: 3}))["aliases"] == {}
+
+
+@pytest.mark.parametrize("a, b", [
+    ("консультация клиентов", "консультациям клиентов"),
+    ("ведение проекта", "ведение проектов"),
+    ("Node.js", "NodeJs"),
+    ("разработка на 1С", "разработка на 1C"),
+    ("Python", "Python 3.13"),
+])
+def test_spelling_and_inflection_variants_merge(a, b):
+    assert resolve_synonyms(Counter({a: 5, b: 3}))["aliases"] == {b: a}
+
+
+def test_no_transitive_chains():
+    # "Postgress" похож на "Postgres", но не на канон "PostgreSQL" — в группу не попадает
+    result = resolve_synonyms(Counter({"PostgreSQL": 10, "Postgres": 5, "Postgress": 1}))
+    assert result["aliases"] == {"Postgres": "PostgreSQL"}
+    assert all(a["score"] is not None for g in result["groups"] for a in g["aliases"])
@@ -0,0 +1,51 @@
+# src/tests/test_filter_competency_matrix.py
+from collections import Counter
+
+from build_competency_matrix import classify_matrix
+from filter_competency_matrix import filter_counters, filter_rows, whitelist_matcher
+
+
+def _row(industry, comp, d, s, status):
+    return {"industry": industry, "competency": comp, "demand": d, "supply": s, "status": status}
+
+
+def test_aliases_merge_into_canonical_row():
+    rows = [
+        _row("IT", "JS", 2, 0, "gap"),
+        _row("IT", "JavaScript", 1, 0, "gap"),
+        _row("IT", "Python", 3, 1, "match"),
+        _row("IT", "javascript", 0, 4, "redundant"),
+        _row("IT", "Excel", 1, 0, "gap"),
+        _row("Финтех", "js", 0, 1, "redundant"),
+        _row("Финтех", "postgresql", 2, 0, "gap"),
+    ]
+    match = whitelist_matcher(["JavaScript", "Python", "postgres", "PostgreSQL"])
+
+    assert list(filter_rows(rows, match)) == [
+        _row("IT", "JavaScript", 3, 4, "match"),
+        _row("IT", "Python", 3, 1, "match"),
+        _row("Финтех", "JavaScript", 0, 1, "redundant"),
+        _row("Финтех", "PostgreSQL", 2, 0, "gap"),
+    ]
+
+
+def test_canonical_rows_are_passed_through():
+    rows = [_row("IT", "Python", 3, 1, "match"), _row("IT", "SQL", 0, 2, "redundant")]
+    kept = list(filter_rows(rows, whitelist_matcher(["python", "sql"])))
+    assert kept == rows
+    assert all(a is b for a, b in zip(kept, rows))
+
+
+def test_filtered_counters_give_filtered_rows():
+    demand = {
+        "IT": Counter({"JS": 2, "JavaScript": 1, "Python": 3, "Excel": 1}),
+        "Финтех": Counter({"postgresql": 2}),
+        "Ритейл": Counter({"Excel": 4}),
+    }
+    supply = {"IT": Counter({"javascript": 4, "Python": 1}), "Финтех": Counter({"js": 1})}
+    match = whitelist_matcher(["JavaScript", "Python", "PostgreSQL"])
+
+    rows, _ = classify_matrix(demand, supply)
+    filtered, _ = classify_matrix(filter_counters(demand, match), filter_counters(supply, match))
+    assert filtered == list(filter_rows(rows, match))
+    assert {row["industry"] for row in filtered} == {"IT", "Финтех"}
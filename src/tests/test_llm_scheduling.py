@@ -0,0 +1,24 @@
+# src/tests/test_llm_scheduling.py
+import pytest
+
+from llm_client import StubLlamaClient, plan_order
+
+LENGTHS = [5, 300, 40, 310, 6, 35]
+
+
+def test_plan_order():
+    assert plan_order(LENGTHS, "fifo") == [0, 1, 2, 3, 4, 5]
+    assert plan_order(LENGTHS, "sorted") == [3, 1, 2, 5, 4, 0]
+    # корзины 256-511, 32-63, 4-7; внутри корзины — порядок файла
+    assert plan_order(LENGTHS, "bucketed") == [1, 3, 2, 5, 0, 4]
+    assert plan_order([], "bucketed") == []
+    with pytest.raises(ValueError):
+        plan_order(LENGTHS, "waves")
+
+
+def test_stub_restores_original_order(tmp_path):
+    llama = StubLlamaClient(metrics_path=str(tmp_path / "metrics.jsonl"))
+    prompts = [("Описание: " + " ".join(f"слово{i}x{n}" for i in range(n))) for n in LENGTHS]
+    expected = llama.generate(prompts, schedule="fifo")
+    for schedule in ("sorted", "bucketed"):
+        assert llama.generate(prompts, schedule=schedule) == expected
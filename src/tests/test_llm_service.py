@@ -0,0 +1,67 @@
+# src/tests/test_llm_service.py
+import asyncio
+
+import pytest
+
+from llm_service import LLMService
+
+TIMEOUT = 5
+
+
+class EchoBackend:
+    def generate(self, prompts, stage=None, **params):
+        return [p.upper() for p in prompts]
+
+
+def _flaky_factory():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("модель не загрузилась")
+        return EchoBackend()
+
+    return factory, calls
+
+
+def test_backend_factory_error_fails_requests_and_worker_survives():
+    factory, calls = _flaky_factory()
+    service = LLMService(factory, batch_window_ms=50)
+    try:
+        failed = [service.submit("a"), service.submit("b")]
+        for future in failed:
+            with pytest.raises(RuntimeError, match="не загрузилась"):
+                future.result(timeout=TIMEOUT)
+
+        # обработчик очереди жив, следующий батч загружает модель заново
+        assert service.submit("c").result(timeout=TIMEOUT) == "C"
+        assert len(calls) == 2
+    finally:
+        service.stop()
+
+
+def test_agenerate_raises_instead_of_hanging():
+    def factory():
+        raise RuntimeError("нет GPU")
+
+    service = LLMService(factory)
+
+    async def call():
+        return await asyncio.wait_for(service.agenerate("x"), TIMEOUT)
+
+    try:
+        with pytest.raises(RuntimeError, match="нет GPU"):
+            asyncio.run(call())
+    finally:
+        service.stop()
+
+
+def test_stop_shuts_down_executor_and_restart_works():
+    service = LLMService(EchoBackend)
+    assert service.submit("a").result(timeout=TIMEOUT) == "A"
+    executor = service._executor
+    service.stop()
+    assert executor._shutdown
+    assert service.submit("b").result(timeout=TIMEOUT) == "B"
+    service.stop()
@@ -0,0 +1,86 @@
+# src/tests/test_matrix_delta.py
+import json
+import os
+
+from build_competency_matrix import MatrixState, _industry_file, apply_delta, build_matrices, export_matrices
+
+VACANCIES = [
+    {"vacancy_id": "1", "industry": "IT", "competencies": ["Python", "SQL"]},
+    {"vacancy_id": "2", "industry": "IT", "competencies": ["Python", "Docker"]},
+    {"vacancy_id": "3", "industry": "Финтех", "competencies": ["SQL", "Excel"]},
+    {"vacancy_id": "4", "industry": "Ритейл", "competencies": ["Коммуникация"]},
+    {"vacancy_id": "5", "industry": "Логистика", "competencies": ["Excel"]},
+]
+PROJECTS = [
+    {"project_id": 1, "industry": "IT/Финтех", "competencies": ["Python", "Excel"]},
+    {"project_id": 2, "industry": "Ритейл", "competencies": ["Figma"]},
+]
+
+
+def _write(path, records):
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def _build(tmp_path, name, vacancies, projects, state_output=None):
+    out = tmp_path / name
+    out.mkdir()
+    matrix, gaps = str(out / "matrix.json"), str(out / "gaps.json")
+    build_matrices(
+        _write(out / "vacancies.json", vacancies),
+        _write(out / "projects.json", projects),
+        matrix,
+        gaps,
+        state_output=state_output,
+    )
+    return matrix, gaps
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_apply_delta_equals_full_rebuild(tmp_path):
+    state_path = str(tmp_path / "state")
+    matrix, gaps = _build(tmp_path, "base", VACANCIES, PROJECTS, state_output=state_path)
+    untouched = os.path.join(state_path, _industry_file("Ритейл"))
+    before = os.stat(untouched).st_mtime_ns
+    matrix_before = _read(matrix)
+
+    added = [
+        {"vacancy_id": "6", "industry": "IT", "competencies": ["Kubernetes", "Python"]},
+        {"vacancy_id": "7", "industry": "EdTech", "competencies": ["Методология"]},
+    ]
+    removed = [VACANCIES[2], VACANCIES[4]]  # Логистика исчезает целиком, у Финтеха остаётся только предложение
+    apply_delta(added, removed, "demand", state_path=state_path)
+    # сама дельта пишет только файлы затронутых индустрий, общая матрица — по запросу
+    assert _read(matrix) == matrix_before
+    export_matrices(state_path, matrix, gaps)
+
+    vacancies = [v for v in VACANCIES if v not in removed] + added
+    full_matrix, full_gaps = _build(tmp_path, "full", vacancies, PROJECTS)
+    assert _read(matrix) == _read(full_matrix)
+    assert _read(gaps) == _read(full_gaps)
+
+    # незатронутая индустрия не перезаписывалась, исчезнувшая удалена
+    assert os.stat(untouched).st_mtime_ns == before
+    assert not os.path.exists(os.path.join(state_path, _industry_file("Логистика")))
+
+    # supply-дельта поверх сохранённого состояния, индустрии проекта через "/"
+    extra = {"project_id": 3, "industry": "EdTech/Ритейл", "competencies": ["Методология"]}
+    apply_delta([extra], [PROJECTS[0]], "supply", state_path=state_path)
+    export_matrices(state_path, matrix, gaps)
+    full_matrix, full_gaps = _build(tmp_path, "full2", vacancies, [PROJECTS[1], extra])
+    assert _read(matrix) == _read(full_matrix)
+    assert _read(gaps) == _read(full_gaps)
+
+
+def test_load_reads_only_touched_industries(tmp_path):
+    state_path = str(tmp_path / "state")
+    _build(tmp_path, "base", VACANCIES, PROJECTS, state_output=state_path)
+
+    state = MatrixState.load(state_path)
+    touched = state.apply_delta([{"industry": "IT", "competencies": ["Go"]}], kind="demand")
+    assert touched == {("IT", "Go")}
+    assert [industry for industry, record in state._industries.items() if record is not None] == ["IT"]
@@ -0,0 +1,91 @@
+# src/tests/test_pipeline_dag.py
+import os
+
+import pipeline_dag
+from pipeline_dag import FileHasher, Stage, code_hashes, run_pipeline, stage_fingerprint
+
+
+class Graph:
+    """Два этапа: raw -> upper -> count; calls — сколько раз этап выполнялся."""
+
+    def __init__(self, tmp_path, config=None):
+        self.raw = str(tmp_path / "raw.txt")
+        self.upper = str(tmp_path / "upper.txt")
+        self.count = str(tmp_path / "count.txt")
+        self.state = str(tmp_path / "state.json")
+        self.config = config or {"mode": "upper"}
+        self.calls = {"upper": 0, "count": 0}
+
+    def _upper(self):
+        self.calls["upper"] += 1
+        with open(self.raw, encoding="utf-8") as f, open(self.upper, "w", encoding="utf-8") as out:
+            out.write(f.read().upper())
+
+    def _count(self):
+        self.calls["count"] += 1
+        with open(self.upper, encoding="utf-8") as f, open(self.count, "w", encoding="utf-8") as out:
+            out.write(str(len(f.read())))
+
+    def run(self, **kwargs):
+        stages = [
+            Stage("upper", self._upper, inputs=[self.raw], outputs=[self.upper], code=["record_io"], config=self.config),
+            Stage("count", self._count, inputs=[self.upper], outputs=[self.count]),
+        ]
+        # workers=1 — этапы в текущем процессе (методы не нужно передавать в пул)
+        return run_pipeline(stages, state_path=self.state, workers=1, **kwargs)
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_skip_and_rerun_on_input_change(tmp_path):
+    g = Graph(tmp_path)
+    _write(g.raw, "abc")
+    assert g.run() == {"upper": "run", "count": "run"}
+    assert g.run() == {"upper": "skip", "count": "skip"}
+
+    _write(g.raw, "abcd")
+    assert g.run() == {"upper": "run", "count": "run"}
+    assert g.calls == {"upper": 2, "count": 2}
+
+    # тот же результат при другом входе — следующий этап не перезапускается
+    _write(g.raw, "ABCD")
+    assert g.run() == {"upper": "run", "count": "skip"}
+
+
+def test_rerun_on_config_change_force_and_output_change(tmp_path):
+    g = Graph(tmp_path)
+    _write(g.raw, "abc")
+    g.run()
+
+    g.config = {"mode": "upper", "version": 2}
+    assert g.run() == {"upper": "run", "count": "skip"}
+
+    assert g.run(force=["count"]) == {"upper": "skip", "count": "run"}
+
+    _write(g.count, "испорчен")
+    assert g.run() == {"upper": "skip", "count": "run"}
+    os.remove(g.upper)
+    assert g.run() == {"upper": "run", "count": "skip"}
+
+    assert g.run(dry_run=True) == {"upper": "skip", "count": "skip"}
+    assert g.calls == {"upper": 3, "count": 3}
+
+
+def test_fingerprint_follows_local_imports(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline_dag, "LOCAL_ROOT", str(tmp_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _write(tmp_path / "dag_stage_mod.py", "import json\nfrom dag_helper_mod import helper\n")
+    _write(tmp_path / "dag_helper_mod.py", "def helper():\n    from dag_lazy_mod import VALUE\n    return VALUE\n")
+    _write(tmp_path / "dag_lazy_mod.py", "VALUE = 1\n")
+
+    stage = Stage("s", lambda: None, code=["dag_stage_mod"])
+    assert sorted(code_hashes(stage.code)) == ["dag_helper_mod", "dag_lazy_mod", "dag_stage_mod"]
+    before = stage_fingerprint(stage, FileHasher())
+
+    # правка модуля, импортированного лениво через промежуточный, меняет отпечаток
+    _write(tmp_path / "dag_lazy_mod.py", "VALUE = 2\n")
+    os.utime(tmp_path / "dag_lazy_mod.py", ns=(1, 1))  # другой mtime — кэш разбора не мешает
+    assert stage_fingerprint(stage, FileHasher()) != before
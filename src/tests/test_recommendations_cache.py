@@ -0,0 +1,64 @@
+# src/tests/test_recommendations_cache.py
+import json
+
+import pytest
+
+import llm_client
+from generate_stats_and_reports import generate_recommendations
+
+STATS = {
+    "IT": {"top_industry_competencies": [["Python", 3]], "top_project_competencies": [["SQL", 1]]},
+    "Финтех": {"top_industry_competencies": [["Excel", 2]], "top_project_competencies": [["Excel", 1]]},
+}
+GAPS = {
+    "IT": {"gaps": [{"competency": "Python", "demand": 3}], "redundancies": []},
+    "Финтех": {"gaps": [{"competency": "Excel", "demand": 2}], "redundancies": []},
+}
+
+
+class CountingLlama:
+    def __init__(self):
+        self.prompts = []
+
+    def generate(self, prompts, **params):
+        self.prompts.extend(prompts)
+        return [f"ответ {len(self.prompts)}" for _ in prompts]
+
+
+@pytest.fixture
+def llama(monkeypatch):
+    client = CountingLlama()
+    monkeypatch.setattr(llm_client, "get_llama", lambda: client)
+    return client
+
+
+def _run(tmp_path, **kwargs):
+    gaps_path = tmp_path / "gaps.json"
+    gaps_path.write_text(json.dumps(GAPS, ensure_ascii=False), encoding="utf-8")
+    return generate_recommendations(
+        STATS,
+        str(gaps_path),
+        str(tmp_path / "reco.json"),
+        log_path=str(tmp_path / "reco_log.txt"),
+        cache_path=str(tmp_path / "cache.json"),
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("content", ["", '{"IT": {"fingerprint": "ab'])
+def test_empty_or_truncated_cache_is_regenerated(tmp_path, llama, content):
+    (tmp_path / "cache.json").write_text(content, encoding="utf-8")
+    assert set(_run(tmp_path)) == {"IT", "Финтех"}
+    assert len(llama.prompts) == 2
+    assert set(json.loads((tmp_path / "cache.json").read_text(encoding="utf-8"))) == {"IT", "Финтех"}
+
+
+def test_force_refresh_single_industry(tmp_path, llama):
+    first = _run(tmp_path)
+    assert _run(tmp_path) == first
+    assert len(llama.prompts) == 2
+
+    second = _run(tmp_path, force_refresh=["Финтех"])
+    assert len(llama.prompts) == 3
+    assert second["IT"] == first["IT"]
+    assert second["Финтех"] != first["Финтех"]
@@ -0,0 +1,82 @@
+# src/tests/test_record_io.py
+import gzip
+import json
+
+import pytest
+
+import record_io
+from record_io import iter_records, load_json, write_json, write_records
+
+RECORDS = [
+    {"vacancy_id": "1", "industry": "IT", "competencies": ["Python", "SQL"]},
+    {"vacancy_id": "2", "industry": "Финтех", "title": "Аналитик [junior], \"data\"", "competencies": []},
+    {"vacancy_id": "3", "industry": None, "salary": 123456789, "rate": -0.25, "remote": True},
+    {"vacancy_id": "4", "text": "строка с \\ и\nпереводом, ] } ,", "nested": {"a": [1, [2, {}]]}},
+]
+
+SUFFIXES = [".json", ".json.gz", ".ndjson", ".jsonl.gz", ".json.zst", ".ndjson.zst"]
+
+
+def _path(tmp_path, suffix):
+    if suffix.endswith(".zst"):
+        pytest.importorskip("zstandard")
+    return str(tmp_path / f"records{suffix}")
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+@pytest.mark.parametrize("compact", [False, True])
+def test_round_trip(tmp_path, suffix, compact):
+    path = _path(tmp_path, suffix)
+    assert write_records(path, iter(RECORDS), compact=compact) == len(RECORDS)
+    assert list(iter_records(path)) == RECORDS
+
+
+@pytest.mark.parametrize("suffix", SUFFIXES)
+def test_empty_collection(tmp_path, suffix):
+    path = _path(tmp_path, suffix)
+    write_records(path, [])
+    assert list(iter_records(path)) == []
+
+
+def test_pretty_array_matches_json_dump(tmp_path):
+    path = tmp_path / "records.json"
+    write_records(str(path), RECORDS, compact=False)
+    assert path.read_text(encoding="utf-8") == json.dumps(RECORDS, ensure_ascii=False, indent=2)
+
+    write_json(str(path), {"total": 4, "records": RECORDS}, compact=False)
+    assert load_json(str(path)) == {"total": 4, "records": RECORDS}
+
+
+def test_gzip_is_real_gzip(tmp_path):
+    path = tmp_path / "records.json.gz"
+    write_records(str(path), RECORDS)
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert json.load(f) == RECORDS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+@pytest.mark.parametrize("compact", [False, True])
+def test_incremental_json_array(tmp_path, monkeypatch, chunk_size, compact):
+    # порог 0 — любой массив разбирается инкрементально, мелкий буфер режет объекты и числа
+    monkeypatch.setattr(record_io, "STREAM_THRESHOLD_BYTES", 0)
+    monkeypatch.setattr(record_io, "_CHUNK_SIZE", chunk_size)
+    records = RECORDS + [12345, "хвост", [1.5, None]]
+    path = str(tmp_path / "records.json")
+    write_records(path, records, compact=compact)
+    assert list(iter_records(path)) == records
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("  [ \n ]  ")
+    assert list(iter_records(path)) == []
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("")
+    assert list(iter_records(path)) == []
+
+
+def test_incremental_rejects_broken_array(tmp_path, monkeypatch):
+    monkeypatch.setattr(record_io, "STREAM_THRESHOLD_BYTES", 0)
+    path = tmp_path / "records.json"
+    for text in ('{"a": 1}', '[{"a": 1} {"b": 2}]', '[{"a": 1},'):
+        path.write_text(text, encoding="utf-8")
+        with pytest.raises(ValueError):
+            list(iter_records(str(path)))
@@ -0,0 +1,53 @@
+# src/tests/test_report_bundle.py
+import os
+
+from report_bundle import MANIFEST_NAME, build_report_bundle, load_manifest
+
+STATS = {
+    "IT": {"top_industry_competencies": [["Python", 3]], "top_project_competencies": [["Python", 1]]},
+    "Финтех": {"top_industry_competencies": [["SQL", 2]], "top_project_competencies": []},
+}
+SUMMARIES = [
+    {"industry": "IT", "gaps": [{"competency": "SQL", "demand": 1}], "redundancies": [], "matches": [],
+     "total_demand_competencies": 2, "total_supply_competencies": 1},
+]
+
+
+def _files_on_disk(bundle_dir):
+    found = set()
+    for root, _, names in os.walk(bundle_dir):
+        for name in names:
+            found.add(os.path.relpath(os.path.join(root, name), bundle_dir).replace(os.sep, "/"))
+    return found
+
+
+def test_bundle_is_content_addressed_and_swapped(tmp_path):
+    plots, bundle = tmp_path / "plots", str(tmp_path / "report")
+    plots.mkdir()
+    (plots / "global.png").write_bytes(b"png-1")
+    # файл прежнего формата (без хэша в имени) должен исчезнуть
+    os.makedirs(os.path.join(bundle, "industries"))
+    with open(os.path.join(bundle, "industries", "it.json"), "w") as f:
+        f.write("{}")
+
+    first = build_report_bundle(STATS, SUMMARIES, {"IT": "учить SQL"}, plots_dir=str(plots), bundle_dir=bundle)
+    assert _files_on_disk(bundle) == set(first["files"]) | {MANIFEST_NAME}
+    for rel, digest in first["files"].items():
+        assert digest[:16] in rel
+    shard = first["industries"][0]["shard"]
+    assert shard.startswith("industries/") and shard != "industries/it.json"
+
+    # без изменений — тот же манифест (и generated_at), файлы не трогаются
+    mtimes = {rel: os.stat(os.path.join(bundle, rel)).st_mtime_ns for rel in first["files"]}
+    again = build_report_bundle(STATS, SUMMARIES, {"IT": "учить SQL"}, plots_dir=str(plots), bundle_dir=bundle)
+    assert again == first
+    assert {rel: os.stat(os.path.join(bundle, rel)).st_mtime_ns for rel in first["files"]} == mtimes
+
+    # изменились рекомендация и график: новые имена, старые файлы удалены после подмены манифеста
+    (plots / "global.png").write_bytes(b"png-2")
+    second = build_report_bundle(STATS, SUMMARIES, {"IT": "учить Go"}, plots_dir=str(plots), bundle_dir=bundle)
+    assert second["industries"][0]["shard"] != shard
+    assert second["global_plots"] != first["global_plots"]
+    assert second["industries"][1]["shard"] == first["industries"][1]["shard"]  # Финтех не менялся
+    assert load_manifest(bundle) == second
+    assert _files_on_disk(bundle) == set(second["files"]) | {MANIFEST_NAME}
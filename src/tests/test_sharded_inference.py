@@ -0,0 +1,53 @@
+# src/tests/test_sharded_inference.py
+import json
+
+import llm_metrics
+from llm_client import StubLlamaClient
+from sharded_inference import generate_sharded, partition_by_length, shard_metrics_path
+
+STUB_ENV = {"LLM_BACKEND": "stub"}
+
+
+def _prompts():
+    # разная длина — чтобы LPT перемешал индексы между шардами
+    return [f"Описание: {' '.join(f'слово{i}_{j}' for j in range(1 + (i * 7) % 13))}" for i in range(23)]
+
+
+def test_partition_covers_every_prompt_once():
+    prompts = _prompts()
+    shards = partition_by_length(prompts, 3)
+    assert sorted(i for shard in shards for i in shard) == list(range(len(prompts)))
+    assert all(shard == sorted(shard) for shard in shards)
+
+
+def test_sharded_matches_unsharded_in_order(tmp_path):
+    prompts = _prompts()
+    expected = StubLlamaClient(metrics_path=None).generate(prompts, max_new_tokens=8, stage="test")
+
+    metrics_path = str(tmp_path / "llm_metrics.jsonl")
+    got = generate_sharded(
+        prompts,
+        num_workers=3,
+        worker_env=[STUB_ENV] * 3,
+        metrics_path=metrics_path,
+        max_new_tokens=8,
+        stage="test",
+    )
+    assert got == expected
+
+    # метрики воркеров слиты в основной файл под run_id родителя, файлы шардов удалены
+    records = [json.loads(line) for line in open(metrics_path, encoding="utf-8")]
+    assert {r["run_id"] for r in records} == {llm_metrics.RUN_ID}
+    assert sum(r["type"] == "request" for r in records) == len(prompts)
+    assert sum(r["type"] == "shard_call" for r in records) == 3
+    assert not any((tmp_path / shard_metrics_path("llm_metrics.jsonl", i)).exists() for i in range(3))
+
+    summary = llm_metrics.stage_summary(metrics_path, llm_metrics.RUN_ID)
+    assert summary["test"]["requests"] == len(prompts)
+
+
+def test_sharded_with_more_workers_than_prompts(tmp_path):
+    prompts = _prompts()[:2]
+    expected = StubLlamaClient(metrics_path=None).generate(prompts, stage="test")
+    got = generate_sharded(prompts, num_workers=4, worker_env=[STUB_ENV] * 4, metrics_path=None, stage="test")
+    assert got == expected
@@ -0,0 +1,260 @@
+# src/vocab_registry.py
+"""
+Общий словарь компетенций и индустрий со стабильными целочисленными id.
+
+Этапы (матрица, статистика, фильтр, нормализаторы) таскают одни и те же
+строки тысячами копий и заново их хэшируют. Здесь каждой строке один раз
+выдаётся id (только добавление — уже выданные id не меняются между запусками),
+а корпус кодируется в массивы id (CSR: offsets + ids), которые можно
+агрегировать NumPy-операциями и передавать между этапами в .npz.
+
+Формат словаря на диске (читается одним read):
+    #rh-ai-vocab v1 competencies=<N> industries=<M>
+    <N строк компетенций, строка i — id i>
+    <M строк индустрий>
+"""
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from build_competency_matrix import normalize_competencies
+from record_io import iter_records
+
+VOCAB_PATH = "data/derived/vocab.txt"
+VOCAB_HEADER = "#rh-ai-vocab v1"
+
+# строки хранятся построчно, поэтому обратный слэш, перевод строки и возврат каретки экранируются
+_ESCAPES = {"\\": "\\\\", "\n": "\\n", "\r": "\\r"}
+_ESCAPE_RE = re.compile(r"[\\\n\r]")
+_UNESCAPES = {"\\": "\\", "n": "\n", "r": "\r"}
+_UNESCAPE_RE = re.compile(r"\\(.)")
+
+
+def _escape(name: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES[m.group()], name)
+
+
+def _unescape(line: str) -> str:
+    if "\\" not in line:
+        return line
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(1)), line)
+
+
+class _Table:
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names: Optional[List[str]] = None):
+        self.names: List[str] = list(names or [])
+        self.ids: Dict[str, int] = {n: i for i, n in enumerate(self.names)}
+
+    def add(self, name: str) -> int:
+        idx = self.ids.get(name)
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self.ids[name] = idx
+        return idx
+
+    def __len__(self):
+        return len(self.names)
+
+
+class Vocabulary:
+    def __init__(self, competencies: Optional[List[str]] = None, industries: Optional[List[str]] = None):
+        self.competencies = _Table(competencies)
+        self.industries = _Table(industries)
+
+    # ---------- строки <-> id ----------
+
+    def competency_id(self, name: str) -> int:
+        return self.competencies.add(name)
+
+    def industry_id(self, name: str) -> int:
+        return self.industries.add(name)
+
+    def competency_name(self, idx: int) -> str:
+        return self.competencies.names[idx]
+
+    def industry_name(self, idx: int) -> str:
+        return self.industries.names[idx]
+
+    def competency_mask(self, names: Iterable[str]) -> np.ndarray:
+        """Булева маска по id компетенций (например, для белого списка)."""
+        mask = np.zeros(len(self.competencies), dtype=bool)
+        for n in names:
+            idx = self.competencies.ids.get(n)
+            if idx is not None:
+                mask[idx] = True
+        return mask
+
+    # ---------- диск ----------
+
+    def save(self, path: str = VOCAB_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        header = f"{VOCAB_HEADER} competencies={len(self.competencies)} industries={len(self.industries)}"
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join([header] + [_escape(n) for n in self.competencies.names + self.industries.names]))
+            f.write("\n")
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = VOCAB_PATH) -> "Vocabulary":
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8", newline="\n") as f:
+            lines = f.read().split("\n")
+
+        header = lines[0]
+        if not header.startswith(VOCAB_HEADER):
+            raise ValueError(f"{path}: не похоже на файл словаря ({header[:40]!r})")
+        sizes = dict(part.split("=") for part in header[len(VOCAB_HEADER):].split())
+        n_comp, n_ind = int(sizes["competencies"]), int(sizes["industries"])
+        names = [_unescape(line) for line in lines[1:1 + n_comp + n_ind]]
+        return cls(names[:n_comp], names[n_comp:])
+
+
+class EncodedCorpus:
+    """
+    Корпус в виде id: для записи r
+      индустрии — industry_ids[industry_offsets[r]:industry_offsets[r+1]]
+      компетенции — competency_ids[competency_offsets[r]:competency_offsets[r+1]]
+    """
+
+    def __init__(self, industry_offsets, industry_ids, competency_offsets, competency_ids):
+        self.industry_offsets = np.asarray(industry_offsets, dtype=np.int64)
+        self.industry_ids = np.asarray(industry_ids, dtype=np.int32)
+        self.competency_offsets = np.asarray(competency_offsets, dtype=np.int64)
+        self.competency_ids = np.asarray(competency_ids, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.industry_offsets) - 1
+
+    def pairs(self):
+        """
+        Все пары (индустрия, компетенция) корпуса: каждая компетенция записи
+        засчитывается каждой индустрии записи. Возвращает два массива одной длины.
+        """
+        n_ind = np.diff(self.industry_offsets)
+        n_comp = np.diff(self.competency_offsets)
+        per_record = n_ind * n_comp
+        total = int(per_record.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+
+        record = np.repeat(np.arange(len(self)), per_record)
+        # позиция пары внутри своей записи: 0 .. n_ind*n_comp-1
+        local = np.arange(total) - np.repeat(np.cumsum(per_record) - per_record, per_record)
+        comp_count = n_comp[record]
+        ind = self.industry_ids[self.industry_offsets[record] + local // comp_count]
+        comp = self.competency_ids[self.competency_offsets[record] + local % comp_count]
+        return ind, comp
+
+    def save(self, path: str):
+        np.savez_compressed(
+            path,
+            industry_offsets=self.industry_offsets,
+            industry_ids=self.industry_ids,
+            competency_offsets=self.competency_offsets,
+            competency_ids=self.competency_ids,
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "EncodedCorpus":
+        data = np.load(path)
+        return cls(
+            data["industry_offsets"],
+            data["industry_ids"],
+            data["competency_offsets"],
+            data["competency_ids"],
+        )
+
+
+def split_industries(raw_industry: Any) -> List[str]:
+    """Как в build_supply_by_industry: "AI/EdTech" -> ["AI", "EdTech"]."""
+    industries = [part.strip() for part in str(raw_industry or "Unknown").split("/") if part.strip()]
+    return industries or ["Unknown"]
+
+
+def encode_records(
+    records: Iterable[Dict[str, Any]],
+    vocab: Vocabulary,
+    split_industry: bool = False,
+) -> EncodedCorpus:
+    """
+    split_industry=False — как спрос (вакансии): индустрия одна, как есть;
+    split_industry=True  — как предложение (проекты): индустрии через "/".
+    """
+    ind_offsets, ind_ids = [0], []
+    comp_offsets, comp_ids = [0], []
+    # горячий цикл: словари и методы — в локальные имена
+    comp_get, comp_add = vocab.competencies.ids.get, vocab.competencies.add
+    ind_add = vocab.industries.add
+    for item in records:
+        if split_industry:
+            ind_ids.extend([ind_add(i) for i in split_industries(item.get("industry"))])
+        else:
+            ind_ids.append(ind_add(item.get("industry") or "Unknown"))
+        ind_offsets.append(len(ind_ids))
+
+        for c in normalize_competencies(item.get("competencies")):
+            idx = comp_get(c)
+            comp_ids.append(comp_add(c) if idx is None else idx)
+        comp_offsets.append(len(comp_ids))
+
+    return EncodedCorpus(ind_offsets, ind_ids, comp_offsets, comp_ids)
+
+
+def encode_file(path: str, vocab: Vocabulary, split_industry: bool = False) -> EncodedCorpus:
+    return encode_records(iter_records(path), vocab, split_industry)
+
+
+def _tee(records: Iterable[Dict[str, Any]], consume) -> Iterable[Dict[str, Any]]:
+    for item in records:
+        consume(item)
+        yield item
+
+
+def encode_stage_outputs(
+    industry_input: str,
+    project_input: str,
+    demand_output: str = "data/derived/industry_competencies.ids.npz",
+    supply_output: str = "data/derived/project_competencies.ids.npz",
+    vocab_path: str = VOCAB_PATH,
+    stats_output: Optional[str] = None,
+) -> Vocabulary:
+    """
+    Кодирует результаты analyze_* в id и дополняет общий словарь.
+    stats_output — в том же проходе записать счётчики stats.json
+    (competency_aggregates.CorpusAggregates.save_stats).
+    """
+    vocab = Vocabulary.load(vocab_path)
+    before = (len(vocab.competencies), len(vocab.industries))
+
+    vacancies, projects = iter_records(industry_input), iter_records(project_input)
+    if stats_output:
+        from competency_aggregates import CorpusAggregates
+
+        agg = CorpusAggregates()
+        vacancies, projects = _tee(vacancies, agg.add_vacancy_stats), _tee(projects, agg.add_project_stats)
+
+    encode_records(vacancies, vocab, split_industry=False).save(demand_output)
+    encode_records(projects, vocab, split_industry=True).save(supply_output)
+    vocab.save(vocab_path)
+    if stats_output:
+        agg.save_stats(stats_output)
+
+    print(
+        f"[INFO] Словарь: {len(vocab.competencies)} компетенций (+{len(vocab.competencies) - before[0]}), "
+        f"{len(vocab.industries)} индустрий (+{len(vocab.industries) - before[1]}) -> {vocab_path}"
+    )
+    return vocab
+
+
+if __name__ == "__main__":
+    encode_stage_outputs(
+        "data/derived/industry_competencies_llm_clean_updated.json",
+        "data/derived/project_competencies_llm_clean_updated.json",
+    )